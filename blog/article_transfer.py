@@ -0,0 +1,225 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :article_transfer
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 14:20
+"""
+# 文章导入导出使用NDJSON格式,每行一条记录,kind为category/image/article,依次输出分类、图片、文章
+import base64
+import json
+import mimetypes
+import re
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from blog import search
+from blog.caches import invalidate_article_details, invalidate_category_tree
+from blog.generations import bump_generations, ARTICLES, CATEGORIES, IMAGES
+from blog.images import extract_base64_images_batch, sync_articles_images
+from blog.models import ArticleModel, CategoryModel, ImageModel, MemberModel, summarize_content, ArticleContentModel, \
+    ArticleRevisionModel
+from blog.runtime_settings import runtime_settings
+from blog.snapshots import snapshot_publisher
+from riyueweiyi import settings
+
+# 图片导出方式: inline为把本站图片以base64内嵌到文章内容,hash为保留图片地址并单独导出图片记录
+IMAGE_MODES = ("inline", "hash")
+MEDIA_SOURCE_PATTERN = re.compile('src="{}(article_images/[^"]+)"'.format(re.escape(settings.MEDIA_URL)))
+ARTICLE_FIELDS = ["title", "content_summary", "author_id", "type_id", "release_date", "modification_date"]
+
+
+def iterate_batches(queryset, batch_size: int):
+    """
+    按主键分批读取,避免一次性载入全部记录
+    """
+    last_id = 0
+    while batch := list(queryset.filter(id__gt=last_id).order_by("id")[:batch_size]):
+        yield from batch
+        last_id = batch[-1].id
+
+
+def category_names(categories: dict, category_id: int) -> list:
+    """
+    分类从根到自身的名称列表,导入时按名称路径匹配分类
+    """
+    names = []
+    while category_id is not None:
+        name, category_id = categories[category_id]
+        names.insert(0, name)
+    return names
+
+
+def inline_media(content: str) -> str:
+    def replace(match):
+        path = match.group(1)
+        if not default_storage.exists(path):
+            return match.group()
+        with default_storage.open(path) as file:
+            data = base64.b64encode(file.read()).decode()
+        return 'src="data:{};base64,{}"'.format(mimetypes.guess_type(path)[0] or "image/jpeg", data)
+
+    return MEDIA_SOURCE_PATTERN.sub(replace, content)
+
+
+def export_records(images: str = "inline", batch_size: int = 100):
+    """
+    逐条生成导出记录,文章按主键分批读取
+    """
+    categories = {category_id: (name, parent_id) for category_id, name, parent_id in
+                  CategoryModel.objects.values_list("id", "name", "parent_id")}
+    # 父分类先于子分类输出
+    for names in sorted((category_names(categories, category_id) for category_id in categories), key=len):
+        yield {"kind": "category", "names": names}
+    if images == "hash":
+        for image in iterate_batches(ImageModel.objects.only("id", "path", "digest", "width", "height"), batch_size):
+            yield {"kind": "image", "path": image.path.name, "digest": image.digest, "width": image.width,
+                   "height": image.height}
+    authors = dict(MemberModel.objects.values_list("id", "username"))
+    for article in iterate_batches(ArticleModel.objects.select_related("body"), batch_size):
+        yield {
+            "kind": "article",
+            "title": article.title,
+            "content": inline_media(article.content) if images == "inline" else article.content,
+            "category": category_names(categories, article.type_id),
+            "author": authors.get(article.author_id),
+            "release_date": article.release_date.isoformat(),
+            "modification_date": article.modification_date.isoformat(),
+        }
+
+
+def read_records(lines):
+    """
+    逐行解析NDJSON,空行跳过
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"第{number}行不是有效的json: {e}")
+
+
+class ArticleImporter:
+    """
+    流式导入文章,分类和作者使用预先构建的查找表,图片和文章分批在独立事务中批量写入
+    分类名称全局唯一,同名分类已存在于其他位置时沿用该分类,层级不一致的记录在warnings中
+    """
+
+    def __init__(self, batch_size: int = 100, update: bool = False):
+        self.batch_size = batch_size
+        self.update = update
+        self.stats = {"categories": 0, "mismatched": 0, "images": 0, "created": 0, "updated": 0, "skipped": 0}
+        self.warnings = []
+        rows = {category_id: (name, parent_id) for category_id, name, parent_id in
+                CategoryModel.objects.values_list("id", "name", "parent_id")}
+        self.categories = {tuple(category_names(rows, category_id)): category_id for category_id in rows}
+        self.category_paths = {category_id: key for key, category_id in self.categories.items()}
+        self.category_ids = {key[-1]: category_id for key, category_id in self.categories.items()}
+        self.authors = dict(MemberModel.objects.values_list("username", "id"))
+        self.images, self.articles = [], []
+
+    def run(self, records) -> dict:
+        for record in records:
+            kind = record.get("kind")
+            if kind == "category":
+                self.category_id(record["names"])
+            elif kind == "image":
+                self.images.append(record)
+                if len(self.images) >= self.batch_size:
+                    self.flush_images()
+            elif kind == "article":
+                # 文章引用的图片记录需先写入
+                self.flush_images()
+                self.articles.append(record)
+                if len(self.articles) >= self.batch_size:
+                    self.flush_articles()
+        self.flush_images()
+        self.flush_articles()
+        invalidate_category_tree()
+        return self.stats
+
+    def category_id(self, names: list) -> int:
+        parent_id = None
+        for depth in range(1, len(names) + 1):
+            if (key := tuple(names[:depth])) not in self.categories:
+                if (category_id := self.category_ids.get(key[-1])) is not None:
+                    # 同名分类已存在于其他位置,新建会违反名称唯一约束,沿用已有分类且不调整其层级
+                    self.warnings.append("分类{}已存在于{},与导入的{}层级不一致,已沿用现有分类".format(
+                        key[-1], "/".join(self.category_paths[category_id]), "/".join(key)))
+                    self.stats["mismatched"] += 1
+                else:
+                    category = CategoryModel(name=key[-1], parent_id=parent_id)
+                    category.save()
+                    category_id = self.category_ids[key[-1]] = category.id
+                    self.category_paths[category_id] = key
+                    self.stats["categories"] += 1
+                self.categories[key] = category_id
+            parent_id = self.categories[key]
+        return parent_id
+
+    def flush_images(self) -> None:
+        if not self.images:
+            return
+        records, self.images = self.images, []
+        existing = set(ImageModel.objects.filter(path__in=[record["path"] for record in records])
+                       .values_list("path", flat=True))
+        images = [ImageModel(path=record["path"], digest=record.get("digest"), width=record.get("width"),
+                             height=record.get("height")) for record in records if record["path"] not in existing]
+        with transaction.atomic():
+            ImageModel.objects.bulk_create(images, ignore_conflicts=True)
+            bump_generations([IMAGES])
+        self.stats["images"] += len(images)
+
+    def flush_articles(self) -> None:
+        if not self.articles:
+            return
+        # 同一批中标题重复时以后出现的为准
+        records = list({record["title"]: record for record in self.articles}.values())
+        self.articles = []
+        contents = [record["content"] for record in records]
+        if runtime_settings.get("IMAGE_SAVE_IS_FILE"):
+            # 整批文章的内嵌图片合并后交给进程池并行处理
+            contents = extract_base64_images_batch(contents)
+        existing = dict(ArticleModel.objects.filter(title__in=[record["title"] for record in records])
+                        .values_list("title", "id"))
+        created, updated = [], []
+        for record, content in zip(records, contents):
+            article = ArticleModel(
+                id=existing.get(record["title"]), title=record["title"], content=content,
+                content_summary=summarize_content(content), author_id=self.authors.get(record.get("author")),
+                type_id=self.category_id(record["category"]),
+                release_date=parse_datetime(record["release_date"]),
+                modification_date=parse_datetime(record["modification_date"]))
+            if article.id is None:
+                created.append(article)
+            elif self.update:
+                updated.append(article)
+            else:
+                self.stats["skipped"] += 1
+        with transaction.atomic():
+            ArticleModel.objects.bulk_create(created)
+            previous = {}
+            if updated:
+                invalidate_article_details([article.id for article in updated])
+                ArticleModel.objects.bulk_update(updated, ARTICLE_FIELDS)
+                previous = dict(ArticleContentModel.objects.filter(article_id__in=[article.id for article in updated])
+                                .values_list("article_id", "content"))
+            # 内容表按文章id批量写入,已存在的更新内容,内容变化同样记录修订
+            ArticleContentModel.objects.bulk_create(
+                [ArticleContentModel(article_id=article.id, content=article.content) for article in created + updated],
+                update_conflicts=True, unique_fields=["article"], update_fields=["content"])
+            ArticleRevisionModel.record([(article.id, article.content, previous.get(article.id))
+                                         for article in created + updated])
+            # 批量写入不触发模型信号,检索索引和图片关联在同一事务中维护,更新前的分类未知,全部文章列表失效
+            bump_generations([ARTICLES, CATEGORIES])
+            for article in created + updated:
+                search.index_article(article.id, article.title, article.content)
+            sync_articles_images(created + updated)
+            snapshot_publisher.schedule(article_ids=[article.id for article in created + updated], summaries=True)
+        self.stats["created"] += len(created)
+        self.stats["updated"] += len(updated)
@@ -0,0 +1,74 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :authentication
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/18 21:05
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import Token
+
+from riyueweiyi import settings
+
+
+class VerifiedTokenCache:
+    """
+    已验证token的有界LRU缓存,key为token的sha256摘要,token过期(exp)后自动失效
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.tokens = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(raw_token) -> str:
+        return hashlib.sha256(raw_token if isinstance(raw_token, bytes) else raw_token.encode()).hexdigest()
+
+    def get(self, raw_token) -> Optional[Token]:
+        key = self.key(raw_token)
+        with self.lock:
+            if (entry := self.tokens.get(key)) is None:
+                return None
+            expires_at, token = entry
+            if expires_at <= time.time():
+                del self.tokens[key]
+                return None
+            self.tokens.move_to_end(key)
+            return token
+
+    def set(self, raw_token, token: Token) -> None:
+        if self.max_size <= 0 or "exp" not in token.payload:
+            return
+        with self.lock:
+            self.tokens[self.key(raw_token)] = (token.payload["exp"], token)
+            self.tokens.move_to_end(self.key(raw_token))
+            while len(self.tokens) > self.max_size:
+                self.tokens.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.tokens.clear()
+
+
+verified_tokens = VerifiedTokenCache(settings.JWT_VERIFIED_CACHE_SIZE)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    带已验证token缓存的JWT认证,同一token在有效期内重复请求时跳过签名校验与解码
+    """
+
+    def get_validated_token(self, raw_token) -> Token:
+        if (token := verified_tokens.get(raw_token)) is not None:
+            return token
+        token = super().get_validated_token(raw_token)
+        verified_tokens.set(raw_token, token)
+        return token
@@ -0,0 +1,10 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :__init__.py
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 15:40
+"""
+# 接口基准测试: dataset生成可复现的测试数据,runner在进程内逐个请求全部接口并统计延迟、吞吐量、SQL次数和内存峰值
+# 通过 manage.py benchmark 执行,测试数据写入临时数据库,不影响正式数据
@@ -0,0 +1,110 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :dataset
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 15:45
+"""
+import base64
+import datetime
+import random
+from io import BytesIO
+
+from PIL import Image
+from django.utils import timezone
+
+from blog.article_transfer import ArticleImporter
+from blog.models import MemberModel
+
+# 生成正文使用的词表,检索场景从中取词
+WORDS = ["日月", "为易", "博客", "文章", "分类", "图片", "检索", "缓存", "数据库", "接口", "性能", "测试",
+         "Django", "Python", "SQLite", "部署", "优化", "索引", "并发", "压缩"]
+PUNCTUATION = ["，", "。", "；", "！"]
+USERNAME = "benchmark"
+PASSWORD = "benchmark-password"
+
+
+class DatasetOptions:
+    """
+    测试数据规模,相同的参数和种子生成完全相同的数据
+    """
+
+    def __init__(self, seed: int = 1, articles: int = 200, body_size: int = 3000, images: int = 1,
+                 image_size: int = 640, category_depth: int = 3, category_width: int = 3):
+        self.seed = seed
+        self.articles = articles
+        self.body_size = body_size
+        self.images = images
+        self.image_size = image_size
+        self.category_depth = category_depth
+        self.category_width = category_width
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def category_paths(depth: int, width: int) -> list:
+    """
+    每层width个子分类、共depth层的分类树,返回全部分类的名称路径,分类名称全局唯一
+    """
+    paths, level = [], [([], ())]
+    for _ in range(depth):
+        # 名称带上各层序号,如"分类1-2-3"
+        level = [(names + ["分类" + "-".join(map(str, indices + (index + 1,)))], indices + (index + 1,))
+                 for names, indices in level for index in range(width)]
+        paths += [names for names, _ in level]
+    return paths
+
+
+def random_text(rng: random.Random, size: int) -> str:
+    parts, length = [], 0
+    while length < size:
+        sentence = "".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))) + rng.choice(PUNCTUATION)
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)[:size]
+
+
+def random_image(rng: random.Random, size: int) -> str:
+    # 随机色块组成的png,保证每张图片内容不同
+    image = Image.new("RGB", (size, size * 3 // 4), tuple(rng.randrange(256) for _ in range(3)))
+    for _ in range(8):
+        x, y = rng.randrange(size), rng.randrange(size * 3 // 4)
+        image.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, x + size // 8, y + size // 8))
+    output = BytesIO()
+    image.save(output, format="PNG")
+    return base64.b64encode(output.getvalue()).decode()
+
+
+def article_records(options: DatasetOptions):
+    rng = random.Random(options.seed)
+    categories = category_paths(options.category_depth, options.category_width)
+    for names in categories:
+        yield {"kind": "category", "names": names}
+    now = timezone.now()
+    for index in range(options.articles):
+        paragraphs = [f"<p>{random_text(rng, options.body_size // max(options.images + 1, 1))}</p>"]
+        for _ in range(options.images):
+            paragraphs.append('<img src="data:image/png;base64,{}">'.format(random_image(rng, options.image_size)))
+            paragraphs.append(f"<p>{random_text(rng, options.body_size // (options.images + 1))}</p>")
+        # 发布时间分布在过去一年,少量为定时发布的未来文章
+        release_date = now - datetime.timedelta(seconds=rng.randrange(-7 * 86400, 365 * 86400))
+        yield {
+            "kind": "article",
+            "title": f"测试文章{index + 1}",
+            "content": "".join(paragraphs),
+            "category": rng.choice(categories),
+            "author": USERNAME,
+            "release_date": release_date.isoformat(),
+            "modification_date": release_date.isoformat(),
+        }
+
+
+def generate_dataset(options: DatasetOptions) -> dict:
+    """
+    写入测试数据,文章和内嵌图片走批量导入流程
+    """
+    if not MemberModel.objects.filter(username=USERNAME).exists():
+        MemberModel.objects.create_superuser(USERNAME, "benchmark@example.com", PASSWORD)
+    return ArticleImporter(batch_size=50).run(article_records(options))
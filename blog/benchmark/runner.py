@@ -0,0 +1,221 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :runner
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 16:10
+"""
+import contextlib
+import json
+import logging
+import os
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+from itertools import count
+
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.benchmark.dataset import USERNAME
+from blog.models import ArticleModel, CategoryModel, ImageModel, MemberModel
+from blog.serializers import LoginVerificationSerializer
+
+# 场景默认视为正常的状态码,其他状态码说明测试的是错误页面,结果中单独标记
+SUCCESS_STATUSES = (200, 201, 204, 304)
+
+
+class Scenario:
+    """
+    单个接口的测试场景,path、data、headers可为按迭代序号生成的函数
+    prepare在计时前执行,用于预先创建删除类场景需要的数据,返回值替换path函数的参数
+    expected为该场景正常的状态码
+    """
+
+    def __init__(self, name: str, method: str, path, data=None, headers=None, auth: bool = False, prepare=None,
+                 expected=SUCCESS_STATUSES):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.headers = headers
+        self.auth = auth
+        self.prepare = prepare
+        self.expected = expected
+
+    @staticmethod
+    def resolve(value, argument):
+        return value(argument) if callable(value) else value
+
+
+def percentile(values: list, rate: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(rate * len(ordered)) - 1))]
+
+
+def create_articles(context: dict, amount: int) -> list:
+    category_id = context["category_ids"][0]
+    return [ArticleModel.objects.create(title=f"待删除{next(context['sequence'])}", content="<p>待删除</p>",
+                                        type_id=category_id).id for _ in range(amount)]
+
+
+def build_context() -> dict:
+    now = timezone.now()
+    published = list(ArticleModel.objects.filter(release_date__lt=now).order_by("-release_date", "-id")
+                     .values_list("id", "title", "type_id"))
+    return {
+        "articles": published,
+        "category_ids": list(CategoryModel.objects.order_by("id").values_list("id", flat=True)),
+        "image_id": ImageModel.objects.order_by("id").values_list("id", flat=True).first(),
+        "sequence": count(1),
+    }
+
+
+def build_scenarios(context: dict, client: Client) -> list:
+    articles, categories = context["articles"], context["category_ids"]
+    article = lambda i: articles[i % len(articles)]
+    first_page = client.get("/api/article_summary/").json()
+    cursor = (first_page.get("next") or "").split("/api/article_summary/", 1)[-1]
+    etag = client.get(f"/api/article/{articles[0][0]}").get("ETag")
+    with_content = {"title": None, "content": "<p>基准测试更新</p>", "type": None}
+    return [
+        Scenario("login", "post", "/api/login_verification/",
+                 data={"username": USERNAME, "password": "benchmark-password"}),
+        Scenario("article_detail", "get", lambda i: f"/api/article/{article(i)[0]}"),
+        Scenario("article_detail_not_modified", "get", f"/api/article/{articles[0][0]}",
+                 headers={"HTTP_IF_NONE_MATCH": etag}),
+        Scenario("article_root_list", "get", "/api/article_root/", auth=True),
+        Scenario("article_root_list_fields", "get", "/api/article_root/?fields=id,title,type,release_date", auth=True),
+        Scenario("article_root_detail", "get", lambda i: f"/api/article_root/{article(i)[0]}", auth=True),
+        # 图片场景在写入场景之前执行,article_update替换文章内容后图片不再被引用而被删除
+        Scenario("image_list", "get", "/api/image/"),
+        # 首次请求生成衍生图,之后重定向到已生成的文件
+        Scenario("image_derivative", "get", f"/api/image_derivative/{context['image_id']}/400.webp", expected=(302,)),
+        Scenario("article_create", "post", "/api/article_root/", auth=True,
+                 data=lambda i: {"title": f"基准测试{next(context['sequence'])}", "content": "<p>基准测试</p>",
+                                 "type": [categories[0]]}),
+        Scenario("article_update", "put", lambda i: f"/api/article_root/{article(i)[0]}", auth=True,
+                 data=lambda i: dict(with_content, title=article(i)[1], type=article(i)[2])),
+        Scenario("article_delete", "delete", lambda article_id: f"/api/article_root/{article_id}", auth=True,
+                 prepare=lambda iterations: create_articles(context, iterations)),
+        Scenario("article_bulk_delete", "post", "/api/article_root/bulk_delete/", auth=True,
+                 prepare=lambda iterations: [create_articles(context, 5) for _ in range(iterations)],
+                 data=lambda ids: {"ids": ids}),
+        Scenario("article_summary", "get", "/api/article_summary/"),
+        Scenario("article_summary_cursor", "get", f"/api/article_summary/{cursor}"),
+        Scenario("article_summary_category", "get", lambda i: f"/api/article_summary/?category={categories[0]}"),
+        Scenario("article_summary_root", "get", "/api/article_summary_root/", auth=True),
+        Scenario("article_popular", "get", "/api/article_popular/"),
+        Scenario("article_search", "get", "/api/article_search/?q=数据库"),
+        Scenario("category_list", "get", "/api/category/"),
+        Scenario("category_create", "post", "/api/category/", auth=True,
+                 data=lambda i: {"name": f"基准分类{next(context['sequence'])}", "parent": [categories[0]]}),
+        Scenario("category_update", "put", f"/api/category/{categories[-1]}", auth=True,
+                 data={"name": "基准分类更新", "parent": None}),
+        Scenario("category_delete", "delete", lambda category_id: f"/api/category/{category_id}", auth=True,
+                 prepare=lambda iterations: [CategoryModel.objects.create(name=f"待删除{next(context['sequence'])}").id
+                                             for _ in range(iterations)]),
+        Scenario("category_summary", "get", "/api/category_summary/"),
+        Scenario("category_tree", "get", "/api/category_tree/"),
+        Scenario("setting_image", "get", "/api/setting_image/", auth=True),
+        Scenario("change_image_compressibility", "post", "/api/change_image_compressibility/", auth=True,
+                 data={"image_compressibility": 80}),
+        Scenario("change_image_save_method", "post", "/api/change_image_save_method/", auth=True,
+                 data={"image_save_is_file": True}),
+        Scenario("delete_unused_files", "post", "/api/delete_unused_files/?dry_run=1", auth=True),
+    ]
+
+
+def request(client: Client, scenario: Scenario, argument, auth_headers: dict):
+    headers = dict(auth_headers if scenario.auth else {}, **(Scenario.resolve(scenario.headers, argument) or {}))
+    path = Scenario.resolve(scenario.path, argument)
+    data = Scenario.resolve(scenario.data, argument)
+    if data is None:
+        return getattr(client, scenario.method)(path, **headers)
+    return getattr(client, scenario.method)(path, json.dumps(data), content_type="application/json", **headers)
+
+
+def run_scenario(client: Client, scenario: Scenario, iterations: int, warmup: int, auth_headers: dict) -> dict:
+    # 每次迭代的参数: 删除类场景为预先创建的记录,其余为迭代序号
+    arguments = scenario.prepare(iterations + warmup + 1) if scenario.prepare else list(range(iterations + warmup + 1))
+    statuses = Counter()
+    for argument in arguments[:warmup]:
+        request(client, scenario, argument, auth_headers)
+    # 计时循环不做任何额外统计,SQL次数和内存峰值另取一次请求测量
+    latencies = []
+    started = time.perf_counter()
+    for argument in arguments[warmup:warmup + iterations]:
+        begin = time.perf_counter()
+        response = request(client, scenario, argument, auth_headers)
+        latencies.append(time.perf_counter() - begin)
+        statuses[response.status_code] += 1
+    elapsed = time.perf_counter() - started
+    with contextlib.ExitStack() as stack:
+        captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+        tracemalloc.start()
+        request(client, scenario, arguments[-1], auth_headers)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "queries": sum(len(context.captured_queries) for context in captured),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "status": {str(status): total for status, total in sorted(statuses.items())},
+        "unexpected": sum(total for status, total in statuses.items() if status not in scenario.expected),
+    }
+
+
+def run_benchmark(iterations: int = 50, warmup: int = 3, only: list = None, log=None) -> dict:
+    """
+    在进程内依次请求全部接口,返回 {场景名: 统计结果}
+    """
+    # 出错的接口记录为500状态码,不中断测试
+    client = Client(raise_request_exception=False)
+    user = MemberModel.objects.get(username=USERNAME)
+    auth_headers = {"HTTP_AUTHORIZATION": "Bearer " + str(LoginVerificationSerializer.get_token(user).access_token)}
+    context = build_context()
+    results = {}
+    # 视图中的调试输出和请求日志不计入结果展示
+    request_logger = logging.getLogger("django.request")
+    level, request_logger.level = request_logger.level, logging.CRITICAL
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for scenario in build_scenarios(context, client):
+                if only and scenario.name not in only:
+                    continue
+                results[scenario.name] = run_scenario(client, scenario, iterations, warmup, auth_headers)
+                if log:
+                    log(scenario.name, results[scenario.name])
+    finally:
+        request_logger.level = level
+    return results
+
+
+def unexpected_results(results: dict) -> list:
+    """
+    返回了非预期状态码的场景,这些场景的延迟测量的是错误页面
+    """
+    return [f"{name}: {result['status']}" for name, result in results.items() if result.get("unexpected")]
+
+
+def compare_results(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    与基线对比,p95延迟超出基线threshold比例或SQL次数增加的场景视为退化
+    """
+    regressions = []
+    for name, result in current.items():
+        if (previous := baseline.get(name)) is None:
+            continue
+        if result["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result["queries"] > previous["queries"]:
+            regressions.append(f"{name}: SQL次数 {previous['queries']} -> {result['queries']}")
+    return regressions
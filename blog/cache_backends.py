@@ -0,0 +1,259 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :cache_backends
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/18 22:10
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+MAGIC = b"RYWYCACHE1"
+# 文件头: 魔数 + 布局摘要,布局变化时重新初始化
+FILE_HEADER = struct.Struct("10s32s")
+# 槽位头: key哈希, 过期时间(0为永不过期), 最后访问时间, 值长度
+SLOT_HEADER = struct.Struct("16sddI")
+EMPTY_KEY = b"\x00" * 16
+# 默认分级: (单个槽位容量, 槽位数),合计约58MB
+DEFAULT_SLABS = ((1024, 2048), (16 * 1024, 512), (256 * 1024, 64), (4 * 1024 * 1024, 8))
+DEFAULT_WAYS = 8
+
+
+class Slab:
+    """
+    同一容量的一组槽位,按组相联方式组织:key哈希决定所在组,组内按最后访问时间淘汰
+    """
+
+    def __init__(self, offset: int, capacity: int, count: int, ways: int):
+        self.capacity = capacity
+        self.ways = min(ways, count)
+        self.sets = count // self.ways
+        self.slot_size = SLOT_HEADER.size + capacity
+        self.offset = offset
+        self.size = self.sets * self.ways * self.slot_size
+
+    def slots(self, key_hash: bytes):
+        start = self.offset + int.from_bytes(key_hash[:8], "little") % self.sets * self.ways * self.slot_size
+        return range(start, start + self.ways * self.slot_size, self.slot_size)
+
+
+class SharedMemoryCache(BaseCache):
+    """
+    基于mmap文件的跨进程共享缓存,同一主机上的uwsgi进程共用一份数据
+    固定内存预算,按值大小分级存放,支持过期时间、组内LRU淘汰和原子自增
+    LOCATION为缓存文件路径,建议放在/dev/shm下
+    OPTIONS: SLABS为[(槽位容量, 槽位数)], WAYS为组相联路数
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.path = location
+        self.slabs, offset = [], FILE_HEADER.size
+        for capacity, count in options.get("SLABS", DEFAULT_SLABS):
+            slab = Slab(offset, capacity, count, options.get("WAYS", DEFAULT_WAYS))
+            self.slabs.append(slab)
+            offset += slab.size
+        self.file_size = offset
+        self.layout = hashlib.sha256(repr([(s.capacity, s.sets, s.ways) for s in self.slabs]).encode()).digest()
+        self._pid = None
+        self._file = None
+        self._map = None
+        self._thread_lock = threading.Lock()
+
+    def _open(self):
+        # flock锁与打开的文件描述绑定,fork后的子进程需重新打开文件,否则与父进程共享同一把锁
+        if self._pid == os.getpid():
+            return
+        if self._file is not None:
+            self._map.close()
+            self._file.close()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o660), "r+b")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        try:
+            self._file.seek(0)
+            header = self._file.read(FILE_HEADER.size)
+            if os.fstat(self._file.fileno()).st_size != self.file_size or header != FILE_HEADER.pack(MAGIC, self.layout):
+                # 新文件或布局变化,清空后按新布局初始化
+                self._file.truncate(0)
+                self._file.truncate(self.file_size)
+                self._file.seek(0)
+                self._file.write(FILE_HEADER.pack(MAGIC, self.layout))
+                self._file.flush()
+        finally:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._file.fileno(), self.file_size)
+        self._pid = os.getpid()
+
+    @contextmanager
+    def _lock(self):
+        with self._thread_lock:
+            self._open()
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                yield self._map
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _hash(key: str) -> bytes:
+        return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+    def _find(self, buffer, key_hash: bytes, now: float):
+        """
+        查找key所在槽位,过期的槽位顺带清空,返回(slab, 槽位偏移)或None
+        """
+        for slab in self.slabs:
+            for offset in slab.slots(key_hash):
+                slot_key, expires, _, _ = SLOT_HEADER.unpack_from(buffer, offset)
+                if slot_key == key_hash:
+                    if expires and expires <= now:
+                        SLOT_HEADER.pack_into(buffer, offset, EMPTY_KEY, 0, 0, 0)
+                        return None
+                    return slab, offset
+        return None
+
+    @staticmethod
+    def _victim(buffer, slab: Slab, key_hash: bytes, now: float) -> int:
+        # 优先使用空槽位或已过期槽位,否则淘汰组内最久未访问的槽位
+        victim, oldest = None, None
+        for offset in slab.slots(key_hash):
+            slot_key, expires, accessed, _ = SLOT_HEADER.unpack_from(buffer, offset)
+            if slot_key == EMPTY_KEY or (expires and expires <= now):
+                return offset
+            if oldest is None or accessed < oldest:
+                victim, oldest = offset, accessed
+        return victim
+
+    def _read(self, buffer, offset: int):
+        _, _, _, length = SLOT_HEADER.unpack_from(buffer, offset)
+        start = offset + SLOT_HEADER.size
+        return bytes(buffer[start:start + length])
+
+    def _write(self, buffer, key_hash: bytes, data: bytes, expires: float, now: float) -> bool:
+        if (found := self._find(buffer, key_hash, now)) is not None:
+            SLOT_HEADER.pack_into(buffer, found[1], EMPTY_KEY, 0, 0, 0)
+        for slab in self.slabs:
+            if len(data) <= slab.capacity:
+                offset = self._victim(buffer, slab, key_hash, now)
+                buffer[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(data)] = data
+                SLOT_HEADER.pack_into(buffer, offset, key_hash, expires, now, len(data))
+                return True
+        # 超过最大槽位容量的值不缓存
+        return False
+
+    def _expires(self, timeout) -> float:
+        expires = self.get_backend_timeout(timeout)
+        return 0.0 if expires is None else expires
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        data, key_hash, now = pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._hash(key), time.time()
+        with self._lock() as buffer:
+            if self._find(buffer, key_hash, now) is not None:
+                return False
+            return self._write(buffer, key_hash, data, self._expires(timeout), now)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        key_hash, now = self._hash(key), time.time()
+        with self._lock() as buffer:
+            if (found := self._find(buffer, key_hash, now)) is None:
+                return default
+            offset = found[1]
+            slot_key, expires, _, length = SLOT_HEADER.unpack_from(buffer, offset)
+            SLOT_HEADER.pack_into(buffer, offset, slot_key, expires, now, length)
+            data = self._read(buffer, offset)
+        return pickle.loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        data, key_hash, now = pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._hash(key), time.time()
+        with self._lock() as buffer:
+            self._write(buffer, key_hash, data, self._expires(timeout), now)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        key_hash, now = self._hash(key), time.time()
+        with self._lock() as buffer:
+            if (found := self._find(buffer, key_hash, now)) is None:
+                return False
+            slot_key, _, _, length = SLOT_HEADER.unpack_from(buffer, found[1])
+            SLOT_HEADER.pack_into(buffer, found[1], slot_key, self._expires(timeout), now, length)
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        key_hash, now = self._hash(key), time.time()
+        # 读取、累加、写回在同一把跨进程锁内完成,保证原子性,过期时间保持不变
+        with self._lock() as buffer:
+            if (found := self._find(buffer, key_hash, now)) is None:
+                raise ValueError("Key '%s' not found" % key)
+            _, expires, _, _ = SLOT_HEADER.unpack_from(buffer, found[1])
+            value = pickle.loads(self._read(buffer, found[1])) + delta
+            self._write(buffer, key_hash, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires, now)
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        key_hash, now = self._hash(key), time.time()
+        with self._lock() as buffer:
+            if (found := self._find(buffer, key_hash, now)) is None:
+                return False
+            SLOT_HEADER.pack_into(buffer, found[1], EMPTY_KEY, 0, 0, 0)
+            return True
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock() as buffer:
+            return self._find(buffer, self._hash(key), time.time()) is not None
+
+    def clear(self):
+        with self._lock() as buffer:
+            for slab in self.slabs:
+                for offset in range(slab.offset, slab.offset + slab.size, slab.slot_size):
+                    SLOT_HEADER.pack_into(buffer, offset, EMPTY_KEY, 0, 0, 0)
+
+    # flock在其他进程持锁时会等待,_open首次调用还要初始化文件,异步接口经sync_to_async在线程池中执行,
+    # 不阻塞事件循环; 映射和flock不依赖线程,无需像BaseCache默认实现那样排队到同一个线程
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return await sync_to_async(self.add, thread_sensitive=False)(key, value, timeout, version)
+
+    async def aget(self, key, default=None, version=None):
+        return await sync_to_async(self.get, thread_sensitive=False)(key, default, version)
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return await sync_to_async(self.set, thread_sensitive=False)(key, value, timeout, version)
+
+    async def atouch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return await sync_to_async(self.touch, thread_sensitive=False)(key, timeout, version)
+
+    async def aincr(self, key, delta=1, version=None):
+        return await sync_to_async(self.incr, thread_sensitive=False)(key, delta, version)
+
+    async def adelete(self, key, version=None):
+        return await sync_to_async(self.delete, thread_sensitive=False)(key, version)
+
+    async def ahas_key(self, key, version=None):
+        return await sync_to_async(self.has_key, thread_sensitive=False)(key, version)
+
+    async def aclear(self):
+        return await sync_to_async(self.clear, thread_sensitive=False)()
+
+    def close(self, **kwargs):
+        # 每个请求结束时django都会调用close,映射保持打开以便复用
+        pass
@@ -0,0 +1,248 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :caches
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/18 10:12
+"""
+import hashlib
+from functools import wraps
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Min
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+
+from blog.compression import ENCODINGS, compress
+from blog.generations import get_generations, aget_generations
+from blog.images import responsive_content
+from blog.instrumentation import timed
+from blog.json_backends import dumps
+from blog.models import ArticleModel, CategoryModel
+from blog.view_counts import view_counter
+from riyueweiyi import settings
+
+# 文章详情缓存时间(秒),版本号已包含在key中,过期时间只用于回收旧版本
+ARTICLE_DETAIL_CACHE_TIMEOUT = 60 * 60 * 24
+CATEGORY_TREE_CACHE_KEY = "category_tree"
+CATEGORY_TREE_CACHE_TIMEOUT = 60 * 60 * 24
+# 列表缓存时间(秒),分代计数已包含在key中,数据变化时旧缓存不再被读取
+LIST_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+# 版本信息之外顺带取出已写入数据库的阅读数,详情请求不必为阅读数单独查询
+VERSION_COLUMNS = ("modification_date", "type_id", "type__modification_date", "view_count__views")
+
+
+def version_date(modification_date, type_modification_date):
+    """
+    详情的版本时间: 文章与其分类修改时间中较晚的一个,详情中包含分类名称,分类修改后版本随之变化
+    """
+    return max(modification_date, type_modification_date)
+
+
+def remember_version(request: HttpRequest, pk, row: Optional[tuple]) -> None:
+    request.__dict__.setdefault("_article_versions", {})[pk] = (version_date(row[0], row[2]), row[1]) if row else None
+    request.__dict__.setdefault("_article_views", {})[pk] = (row[3] or 0) if row else 0
+
+
+def article_views(request: HttpRequest, pk) -> int:
+    """
+    文章阅读数: 数据库中的累计值加上本进程尚未写入的部分,需先调用aarticle_version
+    """
+    return request.__dict__.get("_article_views", {}).get(pk, 0) + view_counter.pending(pk)
+
+
+async def aarticle_version(request: HttpRequest, pk) -> Optional[tuple]:
+    """
+    查询已发布文章的版本信息(版本时间,分类id),只取轻量字段,同一请求内只查询一次
+    :return: (version_date, type_id)或None(文章不存在或未发布)
+    """
+    memo = request.__dict__.setdefault("_article_versions", {})
+    if pk not in memo:
+        remember_version(request, pk, await ArticleModel.objects.filter(id=pk, release_date__lt=timezone.now())
+                         .values_list(*VERSION_COLUMNS).afirst())
+    return memo[pk]
+
+
+def version_etag(pk, version: tuple) -> str:
+    modification_date, type_id = version
+    digest = hashlib.md5(f"{pk}:{modification_date.isoformat()}:{type_id}".encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def article_detail_cache_key(pk, modification_date, encoding: Optional[str] = None) -> str:
+    key = f"article_detail:{pk}:{modification_date.timestamp()}"
+    return f"{key}:{encoding}" if encoding else key
+
+
+def article_detail_cache_keys(pk, modification_date) -> list:
+    # 未压缩及各压缩格式的缓存
+    return [article_detail_cache_key(pk, modification_date, encoding) for encoding in (None, *ENCODINGS)]
+
+
+def get_article_detail(pk, modification_date, encoding: Optional[str] = None) -> tuple:
+    """
+    获取文章详情的json,按文章版本缓存,命中时不再查询和序列化content
+    encoding为客户端接受的压缩格式,压缩结果同样按版本缓存,每个版本只压缩一次
+    :return: (响应内容, 实际使用的压缩格式),内容过短不压缩时压缩格式为None
+    """
+    if encoding and (encoded := cache.get(article_detail_cache_key(pk, modification_date, encoding))) is not None:
+        return encoded
+    cache_key = article_detail_cache_key(pk, modification_date)
+    if (payload := cache.get(cache_key)) is None:
+        article = ArticleModel.objects.select_related("type", "body").get(id=pk)
+        with timed("image"):
+            content = responsive_content(article.content)
+        with timed("serialize"):
+            payload = dumps({
+                "id": article.id,
+                "title": article.title,
+                "content": content,
+                "type": article.type.name if article.type else None,
+                "release_date": article.release_date,
+                "author": article.author_id,
+                "modification_date": article.modification_date
+            })
+        cache.set(cache_key, payload, ARTICLE_DETAIL_CACHE_TIMEOUT)
+    if not encoding:
+        return payload, None
+    encoded = (payload, None)
+    if len(payload) >= settings.COMPRESSION_MIN_LENGTH:
+        with timed("compress"):
+            encoded = (compress(force_bytes(payload), encoding), encoding)
+    # 内容过短时同样缓存未压缩的结果,避免每次请求重新判断
+    cache.set(article_detail_cache_key(pk, modification_date, encoding), encoded, ARTICLE_DETAIL_CACHE_TIMEOUT)
+    return encoded
+
+
+async def aget_article_detail(pk, modification_date, encoding: Optional[str] = None) -> tuple:
+    """
+    get_article_detail的异步版本,缓存命中时不离开事件循环,未命中时在线程中查询、序列化并压缩
+    """
+    if (cached := await cache.aget(article_detail_cache_key(pk, modification_date, encoding))) is not None:
+        return cached if encoding else (cached, None)
+    return await sync_to_async(get_article_detail)(pk, modification_date, encoding)
+
+
+def invalidate_article_detail(pk) -> None:
+    """
+    文章保存或删除前调用,删除当前版本的详情缓存
+    """
+    invalidate_article_details([pk])
+
+
+def invalidate_article_details(pks) -> None:
+    """
+    批量删除文章前调用,一次查询删除多篇文章的详情缓存
+    """
+    cache.delete_many([key for pk, modification_date, type_modification_date in
+                       ArticleModel.objects.filter(id__in=pks).values_list("id", "modification_date",
+                                                                           "type__modification_date")
+                       for key in article_detail_cache_keys(pk, version_date(modification_date,
+                                                                             type_modification_date))])
+
+
+def build_category_tree(now=None) -> list:
+    """
+    一次查询取出全部分类及其已发布文章数,在内存中组装为嵌套树
+    article_count为分类自身的文章数,total_count包含全部子孙分类
+    """
+    now = now or timezone.now()
+    categories = list(CategoryModel.objects.annotate(
+        article_count=Count("articlemodel", filter=Q(articlemodel__release_date__lt=now))
+    ).order_by("path").values("id", "name", "parent_id", "article_count"))
+    nodes, roots = {}, []
+    for category in categories:
+        node = {"id": category["id"], "name": category["name"], "article_count": category["article_count"],
+                "total_count": category["article_count"], "children": []}
+        nodes[category["id"]] = node
+        # 按路径排序保证父分类先于子分类出现
+        parent = nodes.get(category["parent_id"])
+        (parent["children"] if parent else roots).append(node)
+    # 路径倒序即子分类先于父分类,逐级累加子孙文章数
+    for category in reversed(categories):
+        if parent := nodes.get(category["parent_id"]):
+            parent["total_count"] += nodes[category["id"]]["total_count"]
+    return roots
+
+
+def get_category_tree() -> list:
+    if (tree := cache.get(CATEGORY_TREE_CACHE_KEY)) is None:
+        now = timezone.now()
+        tree = build_category_tree(now)
+        # 存在定时发布的文章时,缓存最迟在其发布时失效,保证文章数及时更新
+        cache.set(CATEGORY_TREE_CACHE_KEY, tree, release_timeout(ArticleModel.objects.all(), now,
+                                                                 CATEGORY_TREE_CACHE_TIMEOUT))
+    return tree
+
+
+def invalidate_category_tree() -> None:
+    """
+    事务提交后删除分类树缓存: 提交前删除时,其他请求可能读到提交前的旧分类树并重新写入缓存
+    """
+    transaction.on_commit(lambda: cache.delete(CATEGORY_TREE_CACHE_KEY))
+
+
+def release_timeout(queryset, now, timeout: float) -> float:
+    """
+    queryset中有尚未发布的文章时,缓存时间截止到最近一篇的发布时间,届时缓存失效,文章随即出现
+    now需与查询已发布文章时使用的时间相同
+    """
+    if next_release := queryset.filter(release_date__gte=now).aggregate(
+            next_release=Min("release_date"))["next_release"]:
+        timeout = min(timeout, (next_release - now).total_seconds())
+    return timeout
+
+
+async def arelease_timeout(queryset, now, timeout: float) -> float:
+    if next_release := (await queryset.filter(release_date__gte=now).aaggregate(
+            next_release=Min("release_date")))["next_release"]:
+        timeout = min(timeout, (next_release - now).total_seconds())
+    return timeout
+
+
+def list_cache_key(request: HttpRequest, generations: tuple) -> str:
+    # 分页链接为包含域名的绝对地址,按完整请求地址区分
+    digest = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f"list:{digest}:{':'.join(map(str, generations))}"
+
+
+def get_list_data(request: HttpRequest, generation_names, build):
+    """
+    DRF列表视图的数据缓存,build返回序列化后的数据,依赖的数据未变化时不查询数据库
+    """
+    cache_key = list_cache_key(request, get_generations(generation_names))
+    if (data := cache.get(cache_key)) is None:
+        data = build()
+        cache.set(cache_key, data, LIST_CACHE_TIMEOUT)
+    return data
+
+
+def cache_list_response(generation_names):
+    """
+    异步列表视图的响应缓存,generation_names(request)返回响应所依赖数据的分代名称,数据变化时由信号将计数加一
+    只缓存GET/HEAD的200响应,视图可设置response.cache_timeout缩短缓存时间,快照生成时不读写缓存
+    """
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request: HttpRequest, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or getattr(request, "is_snapshot", False):
+                return await view(request, *args, **kwargs)
+            cache_key = list_cache_key(request, await aget_generations(generation_names(request)))
+            if (content := await cache.aget(cache_key)) is not None:
+                return HttpResponse(content, content_type="application/json")
+            response = await view(request, *args, **kwargs)
+            if response.status_code == 200:
+                await cache.aset(cache_key, response.content, getattr(response, "cache_timeout", LIST_CACHE_TIMEOUT))
+            return response
+
+        return wrapper
+
+    return decorator
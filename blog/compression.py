@@ -0,0 +1,71 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :compression
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 21:20
+"""
+import gzip
+from typing import Optional
+
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from riyueweiyi import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 全部压缩格式,按优先级排列,brotli需要安装brotli包
+ENCODINGS = ("br", "gzip")
+
+
+def available_encodings() -> tuple:
+    return ENCODINGS if brotli is not None else ("gzip",)
+
+
+def preferred_encoding(request: HttpRequest) -> Optional[str]:
+    """
+    根据Accept-Encoding选择压缩格式,q=0视为不接受,客户端均不接受时返回None
+    """
+    weights = {}
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        weight = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name.lower()] = weight
+    for encoding in available_encodings():
+        if weights.get(encoding, weights.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    # mtime固定为0,同一内容的压缩结果不变
+    return gzip.compress(content, settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def encoded_response(content, encoding: Optional[str], etag: Optional[str] = None,
+                     content_type: str = "application/json") -> HttpResponse:
+    """
+    返回已压缩的内容,压缩后的ETag改为弱校验,与django的GZipMiddleware一致
+    """
+    response = HttpResponse(content, status=200, content_type=content_type)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if etag:
+        response.headers["ETag"] = f"W/{etag}" if encoding and not etag.startswith("W/") else etag
+    return response
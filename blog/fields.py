@@ -0,0 +1,35 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :fields
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 22:45
+"""
+from django.db import models
+
+from blog.text_codec import compress_text, decompress_text
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    压缩保存的文本字段,写入时压缩为二进制,读取时解压,python中始终为str
+    启用压缩前保存的未压缩文本按原样读取
+    """
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return decompress_text(value) if value else ""
+
+    def get_prep_value(self, value):
+        if isinstance(value, str):
+            return compress_text(value)
+        return super().get_prep_value(value)
+
+    def value_to_string(self, obj):
+        # dumpdata等序列化时输出原文
+        return self.value_from_object(obj)
@@ -0,0 +1,107 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :file_cleanup
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 13:10
+"""
+import heapq
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.core.files.storage import default_storage
+from django.db import transaction, close_old_connections, DatabaseError
+
+from blog.models import ImageModel, ImageDerivativeModel
+from riyueweiyi import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FileRemovalWorker:
+    """
+    后台删除文件的工作线程,删除失败时按指数退避重试
+    删除排队期间同一图片可能被重新保存,删除前确认没有记录引用该文件
+    进程退出时尚未删除的文件成为孤立文件,由clean_media命令清理
+    """
+
+    def __init__(self, retries: int, retry_delay: float):
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+
+    def ensure_started(self) -> None:
+        # uwsgi在主进程加载应用后fork,线程不会被子进程继承,按进程号判断是否需要重新启动
+        with self.lock:
+            if self.thread is None or self.pid != os.getpid() or not self.thread.is_alive():
+                self.queue = queue.Queue()
+                self.thread = threading.Thread(target=self.run, name="file-removal", daemon=True)
+                self.pid = os.getpid()
+                self.thread.start()
+
+    def submit(self, paths) -> None:
+        if paths := [path for path in paths if path]:
+            self.ensure_started()
+            self.queue.put(paths)
+
+    def run(self) -> None:
+        pending = []  # (下次重试时间, 已尝试次数, 路径)
+        while True:
+            timeout = max(0.0, pending[0][0] - time.monotonic()) if pending else None
+            try:
+                paths = self.queue.get(timeout=timeout)
+                # 后台线程的数据库连接同样遵循CONN_MAX_AGE
+                close_old_connections()
+                for path in paths:
+                    self.remove(path, 0, pending)
+            except queue.Empty:
+                pass
+            while pending and pending[0][0] <= time.monotonic():
+                _, attempts, path = heapq.heappop(pending)
+                self.remove(path, attempts, pending)
+
+    def remove(self, path: str, attempts: int, pending: list) -> None:
+        try:
+            # transaction_mode为IMMEDIATE时检查与删除期间持有写锁,重新保存图片时在写入记录后的事务内写入文件,
+            # 两者不会交错: 要么这里看到新记录而保留文件,要么删除后文件再被重新写入
+            with transaction.atomic():
+                if not file_in_use(path):
+                    default_storage.delete(path)
+        except (OSError, DatabaseError) as e:
+            if attempts + 1 >= self.retries:
+                logger.error("删除文件%s失败,已重试%d次: %s", path, attempts, e)
+                return
+            heapq.heappush(pending, (time.monotonic() + self.retry_delay * 2 ** attempts, attempts + 1, path))
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        等待已提交的文件全部处理完毕(不含等待重试的文件),用于管理命令退出前
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.queue.empty():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+
+def file_in_use(path: str) -> bool:
+    return ImageModel.objects.filter(path=path).exists() or ImageDerivativeModel.objects.filter(path=path).exists()
+
+
+file_removal = FileRemovalWorker(settings.FILE_REMOVAL_RETRIES, settings.FILE_REMOVAL_RETRY_DELAY)
+
+
+def remove_files_on_commit(paths: list) -> None:
+    """
+    事务提交后把文件交给后台线程删除,事务回滚时文件保持不变
+    """
+    if paths:
+        transaction.on_commit(lambda: file_removal.submit(paths))
@@ -0,0 +1,81 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :generations
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/20 09:40
+"""
+# 缓存分代计数: 每类数据及每个分类各有一个计数,数据变化时加一
+# 列表缓存的key中带上所依赖数据的计数,计数变化后旧缓存不再被读取,由过期时间或LRU回收
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from blog.models import CategoryModel
+
+GENERATION_KEY = "generation:{}"
+# 文章列表均包含分类名称,分类的计数同时用于全部文章列表
+ARTICLES, CATEGORIES, IMAGES, VIEWS = "articles", "categories", "images", "views"
+
+
+def category_generation(category_id: int) -> str:
+    # 按分类筛选的文章列表(含子孙分类)
+    return f"category:{category_id}"
+
+
+def new_generation() -> int:
+    # 计数被淘汰后从当前时间重新开始,不会与淘汰前用过的值重复,也就不会读到淘汰前的旧缓存
+    return time.time_ns()
+
+
+def generation_keys(names) -> list:
+    return [GENERATION_KEY.format(name) for name in names]
+
+
+def get_generations(names) -> tuple:
+    keys = generation_keys(names)
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, new_generation(), None)
+            values[key] = cache.get(key)
+    return tuple(values[key] for key in keys)
+
+
+async def aget_generations(names) -> tuple:
+    keys = generation_keys(names)
+    values = await cache.aget_many(keys)
+    for key in keys:
+        if key not in values:
+            await cache.aadd(key, new_generation(), None)
+            values[key] = await cache.aget(key)
+    return tuple(values[key] for key in keys)
+
+
+def increase_generations(names) -> None:
+    for key in generation_keys(names):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_generation(), None)
+
+
+def bump_generations(names) -> None:
+    """
+    事务提交后计数加一: 提交前加一时,其他请求可能以新计数缓存提交前的旧数据
+    """
+    names = set(names)
+    transaction.on_commit(lambda: increase_generations(names))
+
+
+def article_generations(category_ids) -> set:
+    """
+    文章变化影响的分代: 全部文章,以及文章所在分类和其全部上级分类(按分类筛选的列表包含子孙分类的文章)
+    """
+    names = {ARTICLES}
+    for path in CategoryModel.objects.filter(id__in={category_id for category_id in category_ids if category_id}) \
+            .values_list("path", flat=True):
+        names.update(category_generation(int(category_id)) for category_id in path.split("/") if category_id)
+    return names
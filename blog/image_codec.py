@@ -0,0 +1,79 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :image_codec
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/18 17:10
+"""
+# 本模块只依赖Pillow,不导入django,供图片处理进程池的子进程直接调用
+import base64
+from io import BytesIO
+
+from PIL import Image, features
+
+# 衍生图格式对应的Pillow编码器名称及mime类型
+DERIVATIVE_FORMATS = {"avif": ("AVIF", "image/avif"), "webp": ("WEBP", "image/webp")}
+
+
+def compress_base64_image(image_data, quality=90):
+    # 将图像数据加载到 Pillow 图像对象
+    image = Image.open(BytesIO(image_data))
+    # 压缩图像
+    image = image.convert("RGB")  # 将图像转换为 RGB 模式
+    output = BytesIO()  # 创建一个字节流对象，用于保存压缩后的图像数据
+    image.save(output, format="JPEG", quality=quality)  # 保存图像到字节流，指定压缩质量
+
+    # 将压缩后的图像数据转换为 Base64 编码
+
+    return output
+
+
+def encode_base64_image(encoded: str, quality: int) -> bytes:
+    """
+    解码base64图片并重新压缩为jpeg,返回压缩后的字节
+    """
+    return compress_base64_image(base64.b64decode(encoded), quality=quality).getvalue()
+
+
+def supported_formats(formats) -> list:
+    """
+    过滤出当前Pillow支持编码的衍生图格式
+    """
+    return [fmt for fmt in formats if fmt in DERIVATIVE_FORMATS and features.check(fmt)]
+
+
+def make_derivative(image: Image.Image, width: int, fmt: str, quality: int) -> bytes:
+    """
+    按宽度等比缩放并编码为指定格式,不放大原图
+    """
+    if width < image.width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+    output = BytesIO()
+    image.save(output, format=DERIVATIVE_FORMATS[fmt][0], quality=quality)
+    return output.getvalue()
+
+
+def make_derivatives(image_data: bytes, widths, formats, quality: int) -> tuple:
+    """
+    为图片生成多宽度多格式的衍生图,只生成小于原图宽度的尺寸
+    :return: (原图宽度, 原图高度, [(宽度, 格式, 字节)])
+    """
+    image = Image.open(BytesIO(image_data)).convert("RGB")
+    derivatives = [(width, fmt, make_derivative(image, width, fmt, quality))
+                   for width in widths if width < image.width for fmt in formats]
+    return image.width, image.height, derivatives
+
+
+def encode_image_with_derivatives(source, quality: int, widths, formats) -> tuple:
+    """
+    解码压缩图片并生成衍生图,供进程池一次完成单张图片的全部处理
+    :param source: base64字符串,或已解码图片的临时文件路径(大请求体分离出的图片)
+    :return: (jpeg字节, 宽度, 高度, [(宽度, 格式, 字节)])
+    """
+    if isinstance(source, str):
+        compressed = encode_base64_image(source, quality)
+    else:
+        with open(source, "rb") as file:
+            compressed = compress_base64_image(file.read(), quality=quality).getvalue()
+    return (compressed,) + make_derivatives(compressed, widths, formats, quality)
@@ -0,0 +1,352 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :images
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/18 17:15
+"""
+import hashlib
+import multiprocessing
+import os
+import re
+import sys
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from urllib.parse import unquote
+
+from PIL import Image
+from django.core.files.storage import default_storage
+from django.db import transaction, models
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from blog.file_cleanup import remove_files_on_commit
+from blog.generations import bump_generations, IMAGES
+from blog.image_codec import encode_image_with_derivatives, supported_formats, make_derivative, \
+    DERIVATIVE_FORMATS
+from blog.instrumentation import timed
+from blog.models import ImageModel, ImageDerivativeModel
+from blog.parsers import SPOOLED_MIME
+from blog.runtime_settings import runtime_settings
+from blog.snapshots import atomic_write
+from riyueweiyi import settings
+
+# 匹配正则,限定在单个img标签内,避免跨标签吞掉前面已是地址的图片
+IMAGE_PATTERN = re.compile('<img[^>]*?src="data:image/([^;]+);base64,([^"]+)"[^>]*>')
+IMAGE_REPLACEMENT = '<img src="{}" />'
+# 匹配文章中已保存为文件的图片地址
+IMAGE_URL_PATTERN = re.compile('<img[^>]*?src="{}([^"]+)"'.format(re.escape(settings.MEDIA_URL)))
+# 匹配完整的本站图片标签,用于输出时改写为响应式图片
+IMAGE_TAG_PATTERN = re.compile('<img([^>]*?)src="{}(article_images/[^"]+)"([^>]*?)/?>'.format(
+    re.escape(settings.MEDIA_URL)))
+# 尚未生成的衍生图地址,首次访问时生成
+DERIVATIVE_LAZY_URL = "/api/image_derivative/{}/{}.{}"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def python_executable() -> str:
+    """
+    进程池使用的python解释器,uwsgi下sys.executable是uwsgi程序本身,改用同一环境中的python
+    """
+    if settings.IMAGE_PROCESS_PYTHON:
+        return settings.IMAGE_PROCESS_PYTHON
+    if os.path.basename(sys.executable).startswith("python"):
+        return sys.executable
+    return os.path.join(sys.exec_prefix, "bin", "python3")
+
+
+def get_image_pool() -> ProcessPoolExecutor:
+    """
+    进程内共享的有界图片处理进程池,首次使用时创建
+    进程池在请求中创建,此时进程内已有其他线程(uwsgi的threads、阅读数写入及文件删除的后台线程),
+    直接fork的子进程可能继承其他线程持有的锁(日志、导入锁等)而死锁,因此使用forkserver:
+    由单线程的服务进程fork出子进程,服务进程以python_executable()启动并预先导入只依赖Pillow的blog.image_codec
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context("forkserver")
+            context.set_executable(python_executable())
+            context.set_forkserver_preload(["blog.image_codec"])
+            _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_PROCESS_WORKERS, mp_context=context)
+        return _pool
+
+
+def reset_image_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def encode_images(encoded_images: list, quality: int) -> list:
+    """
+    批量解码压缩图片并生成响应式衍生图,多张图片时交给进程池并行处理,进程池异常时退回当前线程处理
+    :return: [(jpeg字节, 宽度, 高度, [(宽度, 格式, 字节)])]
+    """
+    widths, formats = settings.IMAGE_DERIVATIVE_WIDTHS, supported_formats(settings.IMAGE_DERIVATIVE_FORMATS)
+    args = (encoded_images, [quality] * len(encoded_images), [widths] * len(encoded_images),
+            [formats] * len(encoded_images))
+    with timed("image"):
+        if len(encoded_images) < 2 or settings.IMAGE_PROCESS_WORKERS < 1:
+            return list(map(encode_image_with_derivatives, *args))
+        try:
+            return list(get_image_pool().map(encode_image_with_derivatives, *args))
+        except BrokenProcessPool:
+            reset_image_pool()
+            return list(map(encode_image_with_derivatives, *args))
+
+
+def save_file(path: str, data: bytes) -> str:
+    """
+    文件名由内容哈希决定,先写临时文件再改名为确定的文件名,并发保存同一图片时不会像storage.save那样另存为重命名的副本
+    已存在的文件同样重新写入: 该文件可能属于刚删除的记录,正排队等待后台线程删除
+    """
+    atomic_write(default_storage.path(path), data)
+    return path
+
+
+def derivative_path(path: str, width: int, fmt: str) -> str:
+    return "{}-{}.{}".format(path.rsplit(".", 1)[0], width, fmt)
+
+
+def image_digest(encoded: str) -> str:
+    """
+    按base64原文计算内容哈希,未变化的图片无需解码即可命中已保存的文件
+    """
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def image_path(digest: str) -> str:
+    return 'article_images/{}/{}.jpeg'.format(digest[:2], digest)
+
+
+def split_base64_images(content: str, encoded_images: dict, spooled_images: list = None) -> list:
+    """
+    单次扫描文章中的base64图片,返回以(哈希,)占位的内容片段,待保存的图片按哈希记入encoded_images
+    :param spooled_images: SpooledJSONParser从请求体中分离出的图片,content中对应位置为占位符
+    """
+    parts, position = [], 0
+    for match in IMAGE_PATTERN.finditer(content):
+        parts.append(content[position:match.start()])
+        mime, encoded = match.groups()
+        if mime == SPOOLED_MIME and spooled_images is not None:
+            # 已解码到临时文件的图片,交给进程池时只传递文件路径
+            spooled = spooled_images[int(encoded)]
+            digest, source = spooled.digest, spooled.path
+        else:
+            digest, source = image_digest(encoded), encoded
+        # 记录哈希占位,图片保存后填入替换后的img标签
+        parts.append((digest,))
+        encoded_images.setdefault(digest, source)
+        position = match.end()
+    parts.append(content[position:])
+    return parts
+
+
+def save_base64_images(encoded_images: dict) -> dict:
+    """
+    按内容哈希去重保存图片,已保存过的图片直接复用,新图片交给进程池并行处理后在同一事务中批量写入
+    :return: {哈希: 图片路径}
+    """
+    saved_paths = dict(ImageModel.objects.filter(digest__in=encoded_images).values_list("digest", "path"))
+    if missing := [digest for digest in encoded_images if digest not in saved_paths]:
+        compressed_images = dict(zip(missing, encode_images([encoded_images[digest] for digest in missing],
+                                                            runtime_settings.get("IMAGE_COMPRESSIBILITY"))))
+        with transaction.atomic():
+            # 并发保存同一图片时以先写入的记录为准
+            ImageModel.objects.bulk_create([ImageModel(path=image_path(digest), digest=digest, width=width,
+                                                       height=height)
+                                            for digest, (_, width, height, _) in compressed_images.items()],
+                                           ignore_conflicts=True)
+            # 批量写入不触发模型信号
+            bump_generations([IMAGES])
+            rows = {digest: (image_id, path) for digest, image_id, path in
+                    ImageModel.objects.filter(digest__in=missing).values_list("digest", "id", "path")}
+            derivatives = []
+            for digest, (compressed_data, _, _, resized) in compressed_images.items():
+                image_id, path = rows[digest]
+                saved_paths[digest] = path
+                if path != image_path(digest):
+                    # 早期按其他文件名保存的记录,沿用其文件
+                    continue
+                # 文件在记录写入后、事务内写入,与后台线程删除前的检查互斥,见file_cleanup.FileRemovalWorker
+                save_file(path, compressed_data)
+                derivatives.extend(
+                    ImageDerivativeModel(image_id=image_id, width=derivative_width, format=fmt,
+                                         path=save_file(derivative_path(path, derivative_width, fmt), data))
+                    for derivative_width, fmt, data in resized)
+            ImageDerivativeModel.objects.bulk_create(derivatives, ignore_conflicts=True)
+    return saved_paths
+
+
+def extract_base64_images_batch(contents: list, spooled_images: list = None) -> list:
+    """
+    提取多篇文章中的base64图片,全部图片合并为一批并行处理,返回替换为图片地址后的内容
+    """
+    encoded_images = {}
+    split_contents = [split_base64_images(content, encoded_images, spooled_images) for content in contents]
+    if not encoded_images:
+        return list(contents)
+    saved_paths = save_base64_images(encoded_images)
+    # 将文章内容中的 img src 替换为图像的 URL
+    return ["".join(IMAGE_REPLACEMENT.format(default_storage.url(saved_paths[part[0]]))
+                    if isinstance(part, tuple) else part for part in parts) for parts in split_contents]
+
+
+def extract_base64_images(content: str, spooled_images: list = None) -> str:
+    """
+    单次扫描提取文章中的base64图片,按内容哈希去重保存为文件并把img标签替换为图片地址
+    引用关系由sync_article_images维护
+    """
+    return extract_base64_images_batch([content], spooled_images)[0]
+
+
+def referenced_image_paths(content: str) -> set:
+    """
+    文章内容中引用的本站图片路径(相对MEDIA_ROOT)
+    """
+    return {unquote(match.group(1)) for match in IMAGE_URL_PATTERN.finditer(content or "")}
+
+
+def sync_article_images(article: models.Model) -> None:
+    """
+    文章内容保存后调用,按内容中实际引用的图片更新关联和引用次数
+    """
+    sync_articles_images([article])
+
+
+def sync_articles_images(articles: list) -> None:
+    """
+    批量同步多篇文章的图片关联,关联记录批量增删,引用次数按变化次数分组更新
+    """
+    referenced = {article.id: referenced_image_paths(article.content) for article in articles}
+    image_ids = dict(ImageModel.objects.filter(path__in=set().union(*referenced.values()))
+                     .values_list("path", "id"))
+    wanted = {(article_id, image_ids[path]) for article_id, paths in referenced.items()
+              for path in paths if path in image_ids}
+    through = ImageModel.articles.through
+    linked = set(through.objects.filter(articlemodel_id__in=referenced).values_list("articlemodel_id", "imagemodel_id"))
+    with transaction.atomic():
+        if added := wanted - linked:
+            through.objects.bulk_create([through(articlemodel_id=article_id, imagemodel_id=image_id)
+                                         for article_id, image_id in added])
+            adjust_ref_counts(Counter(image_id for _, image_id in added))
+        if removed := linked - wanted:
+            removed_by_article = defaultdict(list)
+            for article_id, image_id in removed:
+                removed_by_article[article_id].append(image_id)
+            for article_id, removed_ids in removed_by_article.items():
+                through.objects.filter(articlemodel_id=article_id, imagemodel_id__in=removed_ids).delete()
+            adjust_ref_counts(Counter(image_id for _, image_id in removed), -1)
+            delete_unused_images({image_id for _, image_id in removed})
+
+
+def adjust_ref_counts(counts: Counter, sign: int = 1) -> None:
+    # 按变化次数分组更新引用计数,减少时不低于0
+    grouped = defaultdict(list)
+    for image_id, count in counts.items():
+        grouped[count].append(image_id)
+    for count, image_ids in grouped.items():
+        ImageModel.objects.filter(id__in=image_ids).update(ref_count=Greatest(F("ref_count") + sign * count, 0))
+    # 关联记录的批量增删和引用次数的更新均不触发模型信号
+    bump_generations([IMAGES])
+
+
+def release_article_images(article: models.Model) -> None:
+    """
+    文章删除前调用,释放其引用的全部图片
+    """
+    with transaction.atomic():
+        if linked_ids := set(article.images.values_list("id", flat=True)):
+            unlink_images(article, linked_ids)
+
+
+def release_articles_images(article_ids: list) -> None:
+    """
+    批量删除文章前调用,一次释放多篇文章引用的图片,之后逐篇的删除信号不再有需要释放的图片
+    """
+    links = ImageModel.articles.through.objects.filter(articlemodel_id__in=article_ids)
+    counts = Counter(links.values_list("imagemodel_id", flat=True))
+    if not counts:
+        return
+    with transaction.atomic():
+        links.delete()
+        adjust_ref_counts(counts, -1)
+        delete_unused_images(set(counts))
+
+
+def unlink_images(article: models.Model, image_ids: set) -> None:
+    article.images.remove(*image_ids)
+    ImageModel.objects.filter(id__in=image_ids, ref_count__gt=0).update(ref_count=F("ref_count") - 1)
+    delete_unused_images(image_ids)
+
+
+def delete_unused_images(image_ids: set) -> None:
+    unused = ImageModel.objects.filter(id__in=image_ids, ref_count=0)
+    paths = list(unused.values_list("path", flat=True)) + \
+        list(ImageDerivativeModel.objects.filter(image__in=unused).values_list("path", flat=True))
+    unused.delete()
+    # 不再被引用的图片文件在事务提交后交给后台线程删除,避免回滚后文件已丢失,也不阻塞请求
+    remove_files_on_commit(paths)
+
+
+def build_derivative(image: ImageModel, width: int, fmt: str) -> ImageDerivativeModel:
+    """
+    为已有图片按需生成单个衍生图并保存,用于功能上线前保存的图片
+    """
+    with timed("image"):
+        with default_storage.open(image.path.name) as file:
+            original = Image.open(BytesIO(file.read())).convert("RGB")
+        data = make_derivative(original, width, fmt, runtime_settings.get("IMAGE_COMPRESSIBILITY"))
+    if image.width is None:
+        image.width, image.height = original.size
+        ImageModel.objects.filter(id=image.id).update(width=image.width, height=image.height)
+    path = save_file(derivative_path(image.path.name, width, fmt), data)
+    ImageDerivativeModel.objects.bulk_create([ImageDerivativeModel(image=image, width=width, format=fmt, path=path)],
+                                             ignore_conflicts=True)
+    return ImageDerivativeModel.objects.get(image=image, width=width, format=fmt)
+
+
+def responsive_content(content: str) -> str:
+    """
+    输出文章时把本站图片改写为picture标签,按格式提供多宽度srcset并延迟加载
+    已生成的衍生图直接使用文件地址,未生成的指向按需生成接口
+    """
+    matches = list(IMAGE_TAG_PATTERN.finditer(content or ""))
+    if not matches:
+        return content
+    images = {image.path.name: image for image in ImageModel.objects.filter(
+        path__in={unquote(match.group(2)) for match in matches}).prefetch_related("derivatives")}
+    formats = supported_formats(settings.IMAGE_DERIVATIVE_FORMATS)
+    parts, position = [], 0
+    for match in matches:
+        parts.append(content[position:match.start()])
+        position = match.end()
+        before, path, after = match.groups()
+        image = images.get(unquote(path))
+        if image is None or "srcset" in before + after:
+            parts.append(match.group())
+            continue
+        saved = {(derivative.width, derivative.format): derivative.path.url for derivative in image.derivatives.all()}
+        widths = [width for width in settings.IMAGE_DERIVATIVE_WIDTHS if image.width is None or width < image.width]
+        sources = []
+        for fmt in formats:
+            srcset = ", ".join("{} {}w".format(saved.get((width, fmt)) or DERIVATIVE_LAZY_URL.format(image.id, width, fmt),
+                                               width) for width in widths)
+            if srcset:
+                sources.append('<source type="{}" srcset="{}" sizes="{}" />'.format(
+                    DERIVATIVE_FORMATS[fmt][1], srcset, settings.IMAGE_DERIVATIVE_SIZES))
+        size = ' width="{}" height="{}"'.format(image.width, image.height) if image.width else ""
+        img = '<img{}src="{}"{} loading="lazy" decoding="async"{} />'.format(
+            before, image.path.url, size, after.rstrip())
+        parts.append("<picture>{}{}</picture>".format("".join(sources), img) if sources else img)
+    parts.append(content[position:])
+    return "".join(parts)
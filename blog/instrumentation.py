@@ -0,0 +1,167 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :instrumentation
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 17:30
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, ExitStack, nullcontext
+from contextvars import ContextVar
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from riyueweiyi import settings
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_metrics", default=None)
+_disabled = nullcontext()
+# 同一进程内同时只采样一个请求,cProfile在多个线程同时启用时会相互干扰
+_profile_lock = threading.Lock()
+PATH_SLUG_PATTERN = re.compile(r"[^\w-]+")
+
+
+class RequestMetrics:
+    """
+    单个请求的耗时统计,timings按阶段累计秒数,queries为执行的SQL模板(参数不计入,相同模板视为同一查询)
+    """
+
+    def __init__(self, detect_repeats: bool):
+        self.timings = Counter()
+        self.query_count = 0
+        self.queries = Counter() if detect_repeats else None
+
+    def execute(self, execute, sql, params, many, context):
+        # 注册到数据库连接的execute_wrapper,统计次数和耗时
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timings["db"] += time.perf_counter() - start
+            self.query_count += 1
+            if self.queries is not None:
+                self.queries[sql] += 1
+
+
+def timed(name: str):
+    """
+    在当前请求的统计中累计代码块的耗时,未启用统计时返回空的上下文管理器
+    """
+    if (metrics := _current.get()) is None:
+        return _disabled
+    return _timed(metrics, name)
+
+
+@contextmanager
+def _timed(metrics: RequestMetrics, name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - start
+
+
+class RequestInstrumentationMiddleware:
+    """
+    记录每个请求的SQL次数、数据库/序列化/图片处理耗时和总耗时,写入Server-Timing响应头和结构化日志
+    按比例采样慢请求的cProfile结果,可选检测同一SQL模板的重复执行(N+1查询)
+    未开启INSTRUMENTATION_ENABLED时django不会加载该中间件
+    只支持同步调用,ASGI下开启后异步视图会被转为同步执行,仅用于排查问题
+    """
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_seconds = settings.INSTRUMENTATION_SLOW_MS / 1000
+        self.profile_rate = settings.INSTRUMENTATION_PROFILE_RATE
+        self.detect_repeats = settings.INSTRUMENTATION_N_PLUS_ONE
+
+    def __call__(self, request):
+        metrics = RequestMetrics(self.detect_repeats)
+        token = _current.set(metrics)
+        profiler = self.start_profiler()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics.execute))
+                response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                _profile_lock.release()
+            _current.reset(token)
+        metrics.timings["total"] = total
+        response["Server-Timing"] = self.server_timing(metrics)
+        repeated = self.repeated_queries(metrics)
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": metrics.query_count,
+            **{f"{name}_ms": round(seconds * 1000, 2) for name, seconds in metrics.timings.items()},
+            **({"repeated_queries": repeated} if repeated else {}),
+        }, ensure_ascii=False))
+        if repeated:
+            logger.warning("%s %s 疑似N+1查询: %s", request.method, request.path,
+                           "; ".join(f"{item['count']}次 {item['sql']}" for item in repeated))
+        if profiler is not None and total >= self.slow_seconds:
+            self.save_profile(profiler, request, total)
+        return response
+
+    def start_profiler(self):
+        if not self.profile_rate or random.random() >= self.profile_rate:
+            return None
+        if not _profile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    @staticmethod
+    def server_timing(metrics: RequestMetrics) -> str:
+        entries = []
+        for name, seconds in metrics.timings.items():
+            entry = f"{name};dur={seconds * 1000:.2f}"
+            if name == "db":
+                entry += f';desc="{metrics.query_count} queries"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+    @staticmethod
+    def repeated_queries(metrics: RequestMetrics) -> list:
+        if metrics.queries is None:
+            return []
+        return [{"sql": sql, "count": times} for sql, times in metrics.queries.most_common()
+                if times >= settings.INSTRUMENTATION_N_PLUS_ONE_THRESHOLD]
+
+    @staticmethod
+    def save_profile(profiler: cProfile.Profile, request, total: float) -> None:
+        # 文件名包含时间、请求和耗时,超过保留数量时删除最旧的文件
+        directory = settings.INSTRUMENTATION_PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        name = "{}-{}-{}-{}-{:.0f}ms.prof".format(time.strftime("%Y%m%d%H%M%S"), os.getpid(), request.method,
+                                                  PATH_SLUG_PATTERN.sub("_", request.path).strip("_") or "root",
+                                                  total * 1000)
+        profiler.dump_stats(os.path.join(directory, name))
+        with os.scandir(directory) as iterator:
+            profiles = sorted((entry for entry in iterator if entry.name.endswith(".prof")),
+                              key=lambda entry: entry.stat().st_mtime)
+        for entry in profiles[:max(0, len(profiles) - settings.INSTRUMENTATION_PROFILE_KEEP)]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,61 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :json_backends
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 21:05
+"""
+# 接口响应的json序列化,由settings.JSON_BACKEND选择实现,输出均为紧凑格式的utf-8字节串
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+from riyueweiyi import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # 日期时间交给encoder处理,与标准库输出的格式保持一致(毫秒精度)
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def stdlib_dumps(data, encoder=DjangoJSONEncoder) -> bytes:
+    return json.dumps(data, cls=encoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def orjson_dumps(data, encoder=DjangoJSONEncoder) -> bytes:
+    try:
+        return orjson.dumps(data, default=encoder().default, option=ORJSON_OPTIONS)
+    except TypeError:
+        # 超过64位的整数等orjson不支持的数据交给标准库
+        return stdlib_dumps(data, encoder)
+
+
+JSON_BACKENDS = {
+    "json": stdlib_dumps,
+    "orjson": orjson_dumps if orjson is not None else stdlib_dumps,
+}
+
+
+def dumps(data, encoder=DjangoJSONEncoder) -> bytes:
+    """
+    按settings.JSON_BACKEND序列化,encoder的default方法用于处理日期、Decimal等类型
+    """
+    return JSON_BACKENDS[settings.JSON_BACKEND](data, encoder)
+
+
+class JsonResponse(HttpResponse):
+    """
+    django.http.JsonResponse的替代,参数相同,序列化使用dumps
+    """
+
+    def __init__(self, data, encoder=DjangoJSONEncoder, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data, encoder), **kwargs)
@@ -0,0 +1,39 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :backfill_content_summary
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/18 11:05
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.generations import bump_generations, ARTICLES, CATEGORIES
+from blog.models import ArticleModel, summarize_content
+
+
+class Command(BaseCommand):
+    help = "为已有文章回填内容摘要字段"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50, help="每批更新的文章数量")
+        parser.add_argument("--all", action="store_true", help="重算全部文章,默认只处理摘要为空的文章")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        queryset = ArticleModel.objects.select_related("body").only("id", "body__content").order_by("id")
+        if not options["all"]:
+            queryset = queryset.filter(content_summary="")
+        total, last_id = 0, 0
+        # 按主键分批读取并更新,避免一次性把全部文章内容载入内存,也不在游标未读完时写表
+        while batch := list(queryset.filter(id__gt=last_id)[:batch_size]):
+            for article in batch:
+                article.content_summary = summarize_content(article.content)
+            last_id = batch[-1].id
+            with transaction.atomic():
+                ArticleModel.objects.bulk_update(batch, ["content_summary"])
+                # 批量更新不触发模型信号,摘要出现在全部文章列表中
+                bump_generations([ARTICLES, CATEGORIES])
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"共回填{total}篇文章摘要"))
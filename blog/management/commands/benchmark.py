@@ -0,0 +1,110 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :benchmark
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 16:40
+"""
+import json
+import os
+import platform
+import tempfile
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import setup_databases, teardown_databases, override_settings
+from django.utils import timezone
+
+from blog.benchmark.dataset import DatasetOptions, generate_dataset
+from blog.benchmark.runner import run_benchmark, compare_results, unexpected_results
+from blog.runtime_settings import runtime_settings
+from blog.snapshots import snapshot_publisher
+from blog.view_counts import view_counter
+from riyueweiyi import settings
+
+
+class Command(BaseCommand):
+    help = "生成测试数据并在进程内请求全部接口,输出各接口的延迟分位数、吞吐量、SQL次数和内存峰值"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=1, help="随机种子,相同参数生成相同数据")
+        parser.add_argument("--articles", type=int, default=200, help="文章数量")
+        parser.add_argument("--body-size", type=int, default=3000, help="每篇文章正文字数")
+        parser.add_argument("--images", type=int, default=1, help="每篇文章内嵌图片数量")
+        parser.add_argument("--image-size", type=int, default=640, help="内嵌图片宽度")
+        parser.add_argument("--category-depth", type=int, default=3, help="分类层数")
+        parser.add_argument("--category-width", type=int, default=3, help="每个分类的子分类数量")
+        parser.add_argument("--iterations", type=int, default=50, help="每个接口计时的请求次数")
+        parser.add_argument("--warmup", type=int, default=3, help="每个接口计时前的预热请求次数")
+        parser.add_argument("--only", nargs="*", help="只测试指定名称的场景")
+        parser.add_argument("--output", help="结果json文件路径")
+        parser.add_argument("--baseline", help="基线结果json文件路径,退化超过阈值时命令失败")
+        parser.add_argument("--threshold", type=float, default=0.2, help="p95延迟允许超出基线的比例")
+
+    def handle(self, *args, **options):
+        dataset = DatasetOptions(options["seed"], options["articles"], options["body_size"], options["images"],
+                                 options["image_size"], options["category_depth"], options["category_width"])
+        with tempfile.TemporaryDirectory(prefix="riyueweiyi_benchmark_") as directory:
+            results = self.run_isolated(directory, dataset, options)
+        report = {
+            "meta": {
+                "created": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "iterations": options["iterations"],
+                "dataset": dataset.as_dict(),
+            },
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if unexpected := unexpected_results(results):
+            raise CommandError("以下场景返回了非预期的状态码,延迟结果无效:\n" + "\n".join(unexpected))
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                baseline = json.load(file)["results"]
+            if regressions := compare_results(results, baseline, options["threshold"]):
+                raise CommandError("性能退化:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("与基线相比无退化"))
+
+    def run_isolated(self, directory: str, dataset: DatasetOptions, options: dict) -> dict:
+        """
+        测试数据写入临时目录下的数据库、媒体目录、快照目录和缓存文件,结束后全部删除
+        """
+        media_root, checkpoint = settings.MEDIA_ROOT, settings.MEDIA_GC_CHECKPOINT
+        snapshot_root = settings.SNAPSHOT_ROOT
+        settings.MEDIA_ROOT = os.path.join(directory, "media")
+        settings.MEDIA_GC_CHECKPOINT = os.path.join(directory, "media_gc.checkpoint")
+        settings.SNAPSHOT_ROOT = os.path.join(directory, "snapshots")
+        connections["default"].settings_dict["TEST"]["NAME"] = os.path.join(directory, "db.sqlite3")
+        caches = {"default": dict(settings.CACHES["default"], LOCATION=os.path.join(directory, "cache"))}
+        try:
+            with override_settings(MEDIA_ROOT=settings.MEDIA_ROOT, CACHES=caches):
+                old_config = setup_databases(verbosity=0, interactive=False, aliases=set(connections),
+                                             serialized_aliases=set())
+                try:
+                    runtime_settings.version = None
+                    stats = generate_dataset(dataset)
+                    self.stdout.write("测试数据: 分类{categories}个,文章{created}篇".format(**stats))
+                    return run_benchmark(options["iterations"], options["warmup"], options["only"], self.log)
+                finally:
+                    # 阅读数由进程内的后台线程写入,切换回正式数据库前写入测试数据库并停止
+                    view_counter.stop()
+                    snapshot_publisher.join()
+                    teardown_databases(old_config, verbosity=0)
+                    runtime_settings.version = None
+        finally:
+            settings.MEDIA_ROOT, settings.MEDIA_GC_CHECKPOINT = media_root, checkpoint
+            settings.SNAPSHOT_ROOT = snapshot_root
+            connections["default"].settings_dict["TEST"]["NAME"] = None
+
+    def log(self, name: str, result: dict) -> None:
+        if result["unexpected"]:
+            self.stdout.write(self.style.ERROR(f"{name}: {result['unexpected']}次请求返回非预期状态码 {result['status']}"))
+        self.stdout.write("{:<30} p50 {:>9.2f}ms  p95 {:>9.2f}ms  p99 {:>9.2f}ms  {:>8.1f}/s  SQL {:>3}  "
+                          "内存 {:>9.1f}KB  {}".format(name, result["p50_ms"], result["p95_ms"], result["p99_ms"],
+                                                     result["throughput_rps"] or 0, result["queries"],
+                                                     result["peak_memory_kb"], result["status"]))
@@ -0,0 +1,100 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :benchmark_sqlite
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 10:40
+"""
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction, connections, OperationalError
+from django.utils import timezone
+
+from blog.models import ArticleModel, CategoryModel, ImageModel
+from blog.routers import read_database
+from blog.views import SUMMARY_FIELDS
+
+
+class Command(BaseCommand):
+    help = "sqlite并发基准测试:对比无写入与持续写入时公开读取的吞吐量、延迟及database is locked错误数"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4, help="并发读取线程数")
+        parser.add_argument("--duration", type=float, default=5.0, help="每个阶段的持续秒数")
+        parser.add_argument("--write-hold", type=float, default=0.05,
+                            help="每个写事务持有写锁的秒数,模拟保存文章时的图片处理")
+        parser.add_argument("--write-interval", type=float, default=0.01, help="两次写事务之间的间隔秒数")
+
+    def handle(self, *args, **options):
+        with connections["default"].cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.stdout.write(f"journal_mode: {cursor.fetchone()[0]}")
+        for title, with_writes in (("仅读取", False), ("读取+写入", True)):
+            result = self.run_phase(options, with_writes)
+            latencies = sorted(result["latencies"]) or [0.0]
+            self.stdout.write(
+                f"{title}: 读取 {len(result['latencies']) / options['duration']:.1f} 次/秒, "
+                f"p50 {statistics.median(latencies) * 1000:.2f}ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1 if len(latencies) > 1 else 0] * 1000:.2f}ms, "
+                f"读取错误 {result['read_errors']}, 写入 {result['writes']} 次, 写入错误 {result['write_errors']}")
+
+    def run_phase(self, options, with_writes: bool) -> dict:
+        result = {"latencies": [], "read_errors": 0, "writes": 0, "write_errors": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options["duration"]
+        threads = [threading.Thread(target=self.reader, args=(deadline, result, lock))
+                   for _ in range(options["readers"])]
+        if with_writes:
+            threads.append(threading.Thread(target=self.writer, args=(deadline, result, lock, options)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return result
+
+    @staticmethod
+    def reader(deadline: float, result: dict, lock: threading.Lock) -> None:
+        # 与公开视图相同的查询:文章摘要首页与分类列表,线程内不继承上下文需重新进入只读范围
+        latencies, errors = [], 0
+        with read_database():
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        list(ArticleModel.objects.select_related("type").only(*SUMMARY_FIELDS)
+                             .filter(release_date__lt=timezone.now()).order_by("-release_date", "-id")[:10])
+                        list(CategoryModel.objects.select_related("parent").order_by("id"))
+                    except OperationalError:
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                connections.close_all()
+        with lock:
+            result["latencies"] += latencies
+            result["read_errors"] += errors
+
+    @staticmethod
+    def writer(deadline: float, result: dict, lock: threading.Lock, options: dict) -> None:
+        # 写事务最终回滚,不改变数据库内容,但与真实保存一样持有写锁
+        writes, errors = 0, 0
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    with transaction.atomic():
+                        ImageModel.objects.create(path="benchmark.jpeg")
+                        time.sleep(options["write_hold"])
+                        transaction.set_rollback(True)
+                    writes += 1
+                except OperationalError:
+                    errors += 1
+                time.sleep(options["write_interval"])
+        finally:
+            connections.close_all()
+        with lock:
+            result["writes"] += writes
+            result["write_errors"] += errors
@@ -0,0 +1,38 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :clean_media
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 11:50
+"""
+import os
+
+from django.core.management.base import BaseCommand
+
+from blog.media_gc import collect_orphaned_media, BATCH_SIZE
+from riyueweiyi import settings
+
+
+class Command(BaseCommand):
+    help = "增量清理article_images目录下不再被引用的图片文件,可中断后从检查点继续"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="只列出孤立文件,不删除")
+        parser.add_argument("--min-age", type=float, default=3600, help="只清理修改时间早于该秒数的文件")
+        parser.add_argument("--limit", type=int, default=None, help="本次最多检查的文件数,默认扫描到末尾")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="每批查询数据库的路径数量")
+        parser.add_argument("--restart", action="store_true", help="忽略检查点,从头开始扫描")
+        parser.add_argument("--no-checkpoint", action="store_true", help="不读取也不保存检查点")
+
+    def handle(self, *args, **options):
+        checkpoint_path = None if options["no_checkpoint"] else settings.MEDIA_GC_CHECKPOINT
+        if options["restart"] and checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        log = (lambda path: self.stdout.write(path)) if options["dry_run"] or options["verbosity"] > 1 else None
+        stats = collect_orphaned_media(dry_run=options["dry_run"], min_age=options["min_age"], limit=options["limit"],
+                                       checkpoint_path=checkpoint_path, batch_size=options["batch_size"], log=log)
+        self.stdout.write(self.style.SUCCESS(
+            "检查{scanned}个文件,孤立文件{orphaned}个,删除{deleted}个,释放{freed_bytes}字节".format(**stats)))
+        if not stats["finished"]:
+            self.stdout.write("尚未扫描完毕,再次执行将从检查点继续")
@@ -0,0 +1,36 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :export_articles
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 14:50
+"""
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blog.article_transfer import export_records, IMAGE_MODES
+
+
+class Command(BaseCommand):
+    help = "以NDJSON格式流式导出分类、图片及文章"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", nargs="?", default="-", help="输出文件路径,默认为标准输出")
+        parser.add_argument("--images", choices=IMAGE_MODES, default="inline",
+                            help="inline为图片以base64内嵌到文章内容,hash为只导出图片记录,图片文件需另行迁移")
+        parser.add_argument("--batch-size", type=int, default=100, help="每批读取的文章数量")
+
+    def handle(self, *args, **options):
+        output = sys.stdout if options["output"] == "-" else open(options["output"], "w", encoding="utf-8")
+        total = 0
+        try:
+            for record in export_records(options["images"], options["batch_size"]):
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                total += record["kind"] == "article"
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(self.style.SUCCESS(f"共导出{total}篇文章"))
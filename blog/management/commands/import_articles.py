@@ -0,0 +1,41 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :import_articles
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 14:55
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.article_transfer import ArticleImporter, read_records
+from blog.snapshots import snapshot_publisher
+
+
+class Command(BaseCommand):
+    help = "流式导入export_articles导出的NDJSON文件,按批写入数据库"
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", nargs="?", default="-", help="输入文件路径,默认为标准输入")
+        parser.add_argument("--batch-size", type=int, default=100, help="每个事务写入的文章数量")
+        parser.add_argument("--update", action="store_true", help="更新标题已存在的文章,默认跳过")
+
+    def handle(self, *args, **options):
+        lines = sys.stdin if options["input"] == "-" else open(options["input"], encoding="utf-8")
+        try:
+            importer = ArticleImporter(options["batch_size"], options["update"])
+            stats = importer.run(read_records(lines))
+        except (ValueError, KeyError) as e:
+            raise CommandError(f"导入失败: {e}")
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+            # 快照由后台线程生成,命令退出前等待完成
+            snapshot_publisher.join()
+        for warning in importer.warnings:
+            self.stderr.write(self.style.WARNING(warning))
+        self.stdout.write(self.style.SUCCESS(
+            "新建分类{categories}个,层级不一致{mismatched}个,图片{images}张,新建文章{created}篇,更新{updated}篇,"
+            "跳过{skipped}篇".format(**stats)))
@@ -0,0 +1,29 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :publish_snapshots
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 19:40
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import snapshots
+
+
+class Command(BaseCommand):
+    help = "生成公开接口的静态json快照,--due只发布到达发布时间的定时文章,可由cron每分钟执行"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--due", action="store_true", help="只处理上次执行以来到达发布时间的文章")
+
+    def handle(self, *args, **options):
+        if not snapshots.snapshot_enabled():
+            raise CommandError("未开启SNAPSHOT_ENABLED")
+        if options["due"]:
+            total = snapshots.publish_due()
+            if total or options["verbosity"] > 1:
+                self.stdout.write(self.style.SUCCESS(f"发布定时文章{total}篇"))
+        else:
+            total = snapshots.publish_all()
+            self.stdout.write(self.style.SUCCESS(f"已生成快照,文章{total}篇"))
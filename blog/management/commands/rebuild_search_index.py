@@ -0,0 +1,39 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :rebuild_search_index
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/18 16:02
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction, connection
+
+from blog import search
+from blog.models import ArticleModel
+
+
+class Command(BaseCommand):
+    help = "重建文章全文检索索引"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50, help="每批索引的文章数量")
+
+    def handle(self, *args, **options):
+        if not search.search_enabled():
+            raise CommandError("全文检索仅支持sqlite数据库")
+        batch_size = options["batch_size"]
+        total, last_id = 0, 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.FTS_TABLE}")
+        # 按主键分批读取,避免一次性载入全部文章内容
+        queryset = ArticleModel.objects.select_related("body").only("id", "title", "body__content").order_by("id")
+        while batch := list(queryset.filter(id__gt=last_id)[:batch_size]):
+            with transaction.atomic():
+                for article in batch:
+                    search.index_article(article.id, article.title, article.content)
+            last_id = batch[-1].id
+            total += len(batch)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) VALUES ('optimize')")
+        self.stdout.write(self.style.SUCCESS(f"共索引{total}篇文章"))
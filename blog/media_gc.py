@@ -0,0 +1,114 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :media_gc
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 11:30
+"""
+import os
+import time
+from pathlib import Path
+
+from blog.models import ImageModel, ImageDerivativeModel
+from riyueweiyi import settings
+
+MEDIA_DIRECTORY = "article_images"
+# sqlite单条语句的参数数量有限,IN查询按批执行
+BATCH_SIZE = 500
+
+
+def walk_media(directory: str, parts: tuple = (), checkpoint: tuple = ()):
+    """
+    按文件名顺序逐层遍历目录,返回相对路径的各级名称
+    遍历顺序与元组比较顺序一致,checkpoint及之前的文件直接跳过,已遍历完的子目录不再进入
+    """
+    try:
+        with os.scandir(directory) as iterator:
+            entries = sorted(iterator, key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        entry_parts = parts + (entry.name,)
+        if entry.is_dir(follow_symlinks=False):
+            if entry_parts >= checkpoint[:len(entry_parts)]:
+                yield from walk_media(entry.path, entry_parts, checkpoint)
+        elif entry.is_file(follow_symlinks=False) and entry_parts > checkpoint:
+            yield entry_parts, entry
+
+
+def read_checkpoint(path) -> tuple:
+    try:
+        return tuple(Path(path).read_text(encoding="utf-8").strip().split("/"))
+    except FileNotFoundError:
+        return ()
+
+
+def write_checkpoint(path, parts: tuple) -> None:
+    # 先写临时文件再替换,中途退出不会留下不完整的检查点
+    temporary = f"{path}.tmp"
+    Path(temporary).write_text("/".join(parts), encoding="utf-8")
+    os.replace(temporary, path)
+
+
+def used_paths(paths: list) -> set:
+    return set(ImageModel.objects.filter(path__in=paths).values_list("path", flat=True)) | \
+        set(ImageDerivativeModel.objects.filter(path__in=paths).values_list("path", flat=True))
+
+
+def collect_orphaned_media(dry_run: bool = False, min_age: float = 3600, limit: int = None,
+                           checkpoint_path=None, batch_size: int = BATCH_SIZE, log=None) -> dict:
+    """
+    增量清理MEDIA_ROOT/article_images下不再被图片及衍生图记录引用的文件
+    :param dry_run: 只统计不删除
+    :param min_age: 只处理修改时间早于该秒数的文件,避免误删正在保存、尚未写入数据库的图片
+    :param limit: 本次最多检查的文件数,达到后保存检查点,下次从检查点继续
+    :param checkpoint_path: 检查点文件路径,为None时每次从头扫描,dry_run时只读取不更新
+    :param log: 每个孤立文件的回调,参数为相对路径
+    :return: 统计信息,finished表示已扫描到末尾(检查点随之清除)
+    """
+    checkpoint = read_checkpoint(checkpoint_path) if checkpoint_path else ()
+    stats = {"scanned": 0, "orphaned": 0, "deleted": 0, "freed_bytes": 0, "finished": True}
+    deadline = time.time() - min_age
+    batch = []
+
+    def flush():
+        paths = {"/".join(parts): entry for parts, entry in batch}
+        used = used_paths(list(paths))
+        for path, entry in paths.items():
+            if path in used:
+                continue
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > deadline:
+                continue
+            stats["orphaned"] += 1
+            if log:
+                log(path)
+            if dry_run:
+                continue
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            stats["deleted"] += 1
+            stats["freed_bytes"] += stat.st_size
+        if checkpoint_path and not dry_run:
+            write_checkpoint(checkpoint_path, batch[-1][0])
+        batch.clear()
+
+    for parts, entry in walk_media(os.path.join(settings.MEDIA_ROOT, MEDIA_DIRECTORY), (MEDIA_DIRECTORY,), checkpoint):
+        if limit is not None and stats["scanned"] >= limit:
+            stats["finished"] = False
+            break
+        batch.append((parts, entry))
+        stats["scanned"] += 1
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    if stats["finished"] and checkpoint_path and not dry_run and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return stats
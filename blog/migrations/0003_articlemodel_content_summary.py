@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:01
+
+import datetime
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_articlemodel_type_alter_membermodel_join_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articlemodel',
+            name='content_summary',
+            field=models.CharField(blank=True, default='', max_length=103, verbose_name='内容摘要'),
+        ),
+        migrations.AddField(
+            model_name='articlemodel',
+            name='modification_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='修改时间'),
+        ),
+        migrations.AddField(
+            model_name='articlemodel',
+            name='release_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='发布时间'),
+        ),
+        migrations.AlterField(
+            model_name='articlemodel',
+            name='content',
+            field=models.CharField(max_length=100000000, verbose_name='文章内容'),
+        ),
+        migrations.AlterField(
+            model_name='articlemodel',
+            name='title',
+            field=models.CharField(max_length=50, unique=True, verbose_name='文章标题'),
+        ),
+        migrations.AlterField(
+            model_name='imagemodel',
+            name='path',
+            field=models.ImageField(upload_to='./', verbose_name='路径'),
+        ),
+        migrations.AlterField(
+            model_name='membermodel',
+            name='join_date',
+            field=models.DateField(default=datetime.date.today, verbose_name='加入时间'),
+        ),
+        migrations.CreateModel(
+            name='CategoryModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='blog.categorymodel')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='articlemodel',
+            name='type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='blog.categorymodel', verbose_name='类型'),
+        ),
+    ]
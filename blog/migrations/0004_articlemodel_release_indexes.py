@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_articlemodel_content_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='articlemodel',
+            index=models.Index(fields=['-release_date', '-id'], name='article_release_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='articlemodel',
+            index=models.Index(fields=['type', '-release_date', '-id'], name='article_type_release_id_idx'),
+        ),
+    ]
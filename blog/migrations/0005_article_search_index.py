@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:55
+
+from django.db import migrations
+
+FTS_TABLE = "blog_article_fts"
+
+
+def create_fts_table(apps, schema_editor):
+    # FTS5虚拟表仅sqlite可用,已有文章需执行 manage.py rebuild_search_index 建立索引
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(title, content, tokenize='trigram')"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_articlemodel_release_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+
+def fill_category_path(apps, schema_editor):
+    # 自根分类逐层向下计算已有分类的物化路径
+    CategoryModel = apps.get_model("blog", "CategoryModel")
+    paths = {None: "/"}
+    pending = list(CategoryModel.objects.values_list("id", "parent_id"))
+    while pending:
+        remaining = [(pk, parent_id) for pk, parent_id in pending if parent_id not in paths]
+        for pk, parent_id in pending:
+            if parent_id in paths:
+                paths[pk] = f"{paths[parent_id]}{pk}/"
+        if len(remaining) == len(pending):
+            # 父分类缺失或成环的分类作为根分类处理
+            for pk, _ in remaining:
+                paths[pk] = f"/{pk}/"
+            remaining = []
+        pending = remaining
+    for pk, path in paths.items():
+        if pk is not None:
+            CategoryModel.objects.filter(id=pk).update(path=path)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_article_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorymodel',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255, verbose_name='分类路径'),
+        ),
+        migrations.RunPython(fill_category_path, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_image_articles(apps, schema_editor):
+    # 原有图片每张只属于一篇文章,迁移为多对多关联,引用次数记为1
+    ImageModel = apps.get_model("blog", "ImageModel")
+    through = ImageModel.articles.through
+    links = [through(imagemodel_id=pk, articlemodel_id=article_id)
+             for pk, article_id in ImageModel.objects.exclude(article=None).values_list("id", "article_id")]
+    through.objects.bulk_create(links, batch_size=500)
+    ImageModel.objects.exclude(article=None).update(ref_count=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_categorymodel_path'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imagemodel',
+            name='article',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='legacy_images', to='blog.articlemodel', verbose_name='所属文章'),
+        ),
+        migrations.AddField(
+            model_name='imagemodel',
+            name='articles',
+            field=models.ManyToManyField(blank=True, related_name='images', to='blog.articlemodel', verbose_name='所属文章'),
+        ),
+        migrations.AddField(
+            model_name='imagemodel',
+            name='digest',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='内容哈希'),
+        ),
+        migrations.AddField(
+            model_name='imagemodel',
+            name='ref_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='引用次数'),
+        ),
+        migrations.RunPython(copy_image_articles, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='imagemodel',
+            name='article',
+        ),
+    ]
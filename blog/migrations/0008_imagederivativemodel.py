@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_imagemodel_content_addressed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagemodel',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='高度'),
+        ),
+        migrations.AddField(
+            model_name='imagemodel',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='宽度'),
+        ),
+        migrations.CreateModel(
+            name='ImageDerivativeModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('width', models.PositiveIntegerField(verbose_name='宽度')),
+                ('format', models.CharField(max_length=10, verbose_name='格式')),
+                ('path', models.ImageField(upload_to='./', verbose_name='路径')),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derivatives', to='blog.imagemodel', verbose_name='原图')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('image', 'width', 'format'), name='unique_image_derivative')],
+            },
+        ),
+    ]
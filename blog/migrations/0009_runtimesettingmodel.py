@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_imagederivativemodel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RuntimeSettingModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField(default=dict, verbose_name='配置')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='版本号')),
+            ],
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 100
+
+
+def copy_article_content(apps, schema_editor):
+    # 分批复制已有文章的内容,内存中只保留一批文章
+    ArticleModel = apps.get_model("blog", "ArticleModel")
+    ArticleContentModel = apps.get_model("blog", "ArticleContentModel")
+    batch = []
+    for article_id, content in ArticleModel.objects.values_list("id", "content").iterator(chunk_size=BATCH_SIZE):
+        batch.append(ArticleContentModel(article_id=article_id, content=content))
+        if len(batch) >= BATCH_SIZE:
+            ArticleContentModel.objects.bulk_create(batch)
+            batch = []
+    ArticleContentModel.objects.bulk_create(batch)
+
+
+def restore_article_content(apps, schema_editor):
+    ArticleModel = apps.get_model("blog", "ArticleModel")
+    ArticleContentModel = apps.get_model("blog", "ArticleContentModel")
+    for article_id, content in ArticleContentModel.objects.values_list("article_id", "content") \
+            .iterator(chunk_size=BATCH_SIZE):
+        ArticleModel.objects.filter(id=article_id).update(content=content)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_runtimesettingmodel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleContentModel',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='body', serialize=False, to='blog.articlemodel', verbose_name='文章')),
+                ('content', models.CharField(max_length=100000000, verbose_name='文章内容')),
+            ],
+        ),
+        migrations.RunPython(copy_article_content, restore_article_content),
+        # 回滚时重新添加的content列需要默认值,之后再由restore_article_content写回内容
+        migrations.AlterField(
+            model_name='articlemodel',
+            name='content',
+            field=models.CharField(default='', max_length=100000000, verbose_name='文章内容'),
+        ),
+        migrations.RemoveField(
+            model_name='articlemodel',
+            name='content',
+        ),
+    ]
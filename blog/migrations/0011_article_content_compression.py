@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:36
+
+import blog.fields
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+BATCH_SIZE = 100
+
+
+def compress_article_content(apps, schema_editor):
+    # 已有的未压缩内容读取时原样返回,分批重新写入即完成压缩
+    ArticleContentModel = apps.get_model("blog", "ArticleContentModel")
+    last_id = 0
+    while batch := list(ArticleContentModel.objects.filter(article_id__gt=last_id).order_by("article_id")[:BATCH_SIZE]):
+        ArticleContentModel.objects.bulk_update(batch, ["content"])
+        last_id = batch[-1].article_id
+
+
+def decompress_article_content(apps, schema_editor):
+    # 回滚时以未压缩的文本写回,字段本身会压缩,只能直接执行SQL
+    ArticleContentModel = apps.get_model("blog", "ArticleContentModel")
+    table = schema_editor.quote_name(ArticleContentModel._meta.db_table)
+    last_id = 0
+    while batch := list(ArticleContentModel.objects.filter(article_id__gt=last_id).order_by("article_id")
+                        .values_list("article_id", "content")[:BATCH_SIZE]):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(f"UPDATE {table} SET content = %s WHERE article_id = %s",
+                               [(content, article_id) for article_id, content in batch])
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_article_content'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='articlecontentmodel',
+            name='content',
+            field=blog.fields.CompressedTextField(verbose_name='文章内容'),
+        ),
+        migrations.RunPython(compress_article_content, decompress_article_content),
+        migrations.CreateModel(
+            name='ArticleRevisionModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='修订号')),
+                ('snapshot', models.BooleanField(default=False, verbose_name='完整内容')),
+                ('data', blog.fields.CompressedTextField(verbose_name='修订数据')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='修订时间')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='blog.articlemodel', verbose_name='文章')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('article', 'number'), name='unique_article_revision')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_article_content_compression'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleViewCountModel',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='view_count', serialize=False, to='blog.articlemodel', verbose_name='文章')),
+                ('views', models.PositiveBigIntegerField(default=0, verbose_name='阅读数')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-views', '-article'], name='article_views_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_article_view_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorymodel',
+            name='modification_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='修改时间'),
+        ),
+    ]
@@ -1,12 +1,20 @@
 import datetime
+import re
+from typing import Optional
 
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Value, Max
+from django.db.models.functions import Concat, Substr
 from django.utils import timezone
 
+from blog.fields import CompressedTextField
+from blog.text_codec import make_delta, apply_delta
+from riyueweiyi import settings
+
 
 class MemberModel(AbstractUser):
-    join_date = models.DateField(default=datetime.date.today(), verbose_name="加入时间")
+    join_date = models.DateField(default=datetime.date.today, verbose_name="加入时间")
 
     def __str__(self):
         return self.username
@@ -15,28 +23,246 @@ class MemberModel(AbstractUser):
 class CategoryModel(models.Model):
     name = models.CharField(max_length=100,unique=True)
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE)
+    # 物化路径,如/1/5/12/,子孙分类查询只需一次索引范围扫描
+    path = models.CharField(max_length=255, default="", db_index=True, editable=False, verbose_name="分类路径")
+    # 文章详情中包含分类名称,分类的修改时间参与文章详情的版本(ETag/Last-Modified)
+    modification_date = models.DateTimeField(default=timezone.now, editable=False, verbose_name="修改时间")
 
     def __str__(self):
         return self.name
 
+    def descendants_range(self) -> dict:
+        """
+        包含自身的子孙分类路径范围查询条件,路径只含数字和"/",以"0"结尾的上界恰好覆盖所有该前缀的路径
+        """
+        return {"path__gte": self.path, "path__lt": self.path[:-1] + "0"}
+
+    def save(self, *args, **kwargs):
+        self.modification_date = timezone.now()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            old_path = self.path
+            parent_path = type(self).objects.filter(id=self.parent_id).values_list("path", flat=True).first() \
+                if self.parent_id else None
+            new_path = f"{parent_path or '/'}{self.id}/"
+            if new_path != old_path:
+                type(self).objects.filter(id=self.id).update(path=new_path)
+                if old_path:
+                    # 移动分类时同步替换所有子孙分类的路径前缀
+                    type(self).objects.filter(path__startswith=old_path).exclude(id=self.id).update(
+                        path=Concat(Value(new_path), Substr("path", len(old_path) + 1)))
+                self.path = new_path
+
+
+# 摘要只保留中文及常用标点
+SUMMARY_PATTERN = re.compile(r'[\u4e00-\u9fa5，。、；：！？,.!]+')
+SUMMARY_LENGTH = 100
+
+
+def summarize_content(content: str) -> str:
+    """
+    从html格式的文章内容中提取摘要,逐段匹配,取满摘要长度即停止,不必扫描整篇内容
+    """
+    summary, length = [], 0
+    for match in SUMMARY_PATTERN.finditer(content or ""):
+        summary.append(match.group())
+        length += len(summary[-1])
+        if length >= SUMMARY_LENGTH:
+            break
+    return "".join(summary)[:SUMMARY_LENGTH] + "..."
+
+
+ARTICLE_CONTENT_MAX_LENGTH = 100000000
+
 
 class ArticleModel(models.Model):
     id = models.AutoField(primary_key=True)
     title = models.CharField(max_length=50, verbose_name="文章标题", unique=True)
-    content = models.CharField(max_length=100000000, verbose_name="文章内容")
+    content_summary = models.CharField(max_length=SUMMARY_LENGTH + 3, default="", blank=True, verbose_name="内容摘要")
     author = models.ForeignKey(MemberModel, on_delete=models.SET_NULL, null=True, verbose_name="作者")
     type = models.ForeignKey(CategoryModel, on_delete=models.PROTECT, verbose_name="类型")
-    release_date = models.DateTimeField(default=timezone.now(),verbose_name="发布时间")
-    modification_date = models.DateTimeField(default=timezone.now(),verbose_name="修改时间")
+    release_date = models.DateTimeField(default=timezone.now,verbose_name="发布时间")
+    modification_date = models.DateTimeField(default=timezone.now,verbose_name="修改时间")
+
+    class Meta:
+        # 摘要列表按(发布时间,id)倒序游标分页及按分类筛选
+        indexes = [
+            models.Index(fields=["-release_date", "-id"], name="article_release_id_idx"),
+            models.Index(fields=["type", "-release_date", "-id"], name="article_type_release_id_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def content(self) -> str:
+        """
+        文章内容保存在一对一的ArticleContentModel中,列表等只需元数据的查询不会读取内容
+        需要内容时查询应select_related("body"),否则每篇文章单独查询一次
+        """
+        if (content := self.__dict__.get("_pending_content")) is not None:
+            return content
+        try:
+            return self.body.content
+        except ArticleContentModel.DoesNotExist:
+            return ""
+
+    @content.setter
+    def content(self, value: str) -> None:
+        # 赋值后在save时写入内容表,ArticleModel(content=...)及objects.create(content=...)同样适用
+        self._pending_content = value
+
+    def save(self, *args, **kwargs):
+        # 指定update_fields的保存只更新文章表,content不是该表的列,不能出现在update_fields中
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if kwargs.get("update_fields") is not None:
+                return
+            content = self.__dict__.pop("_pending_content", None)
+            if content is None and not adding:
+                return
+            body = ArticleContentModel(article=self, content=content or "")
+            previous = None if adding else \
+                ArticleContentModel.objects.filter(article_id=self.id).values_list("content", flat=True).first()
+            if previous is None:
+                body.save(force_insert=True)
+            elif previous != body.content:
+                ArticleContentModel.objects.filter(article_id=self.id).update(content=body.content)
+            ArticleRevisionModel.record([(self.id, body.content, previous)])
+            self.body = body
+
+
+class ArticleContentModel(models.Model):
+    # 文章内容单独一张表,文章表只保留元数据,元数据查询不必读取溢出页中的大段内容
+    article = models.OneToOneField(ArticleModel, on_delete=models.CASCADE, primary_key=True, related_name="body",
+                                   verbose_name="文章")
+    # 压缩保存,读写时透明解压/压缩
+    content = CompressedTextField(verbose_name="文章内容")
+
+    def __str__(self):
+        return str(self.article_id)
+
+
+class ArticleRevisionModel(models.Model):
+    """
+    文章内容的修订历史,每次内容变化保存一个修订,内容为相对上一修订的差异
+    每隔REVISION_SNAPSHOT_INTERVAL个修订保存一次完整内容,还原任意修订最多应用该数量减一个差异
+    内容变化过大、差异计算量超出限制时提前保存完整内容
+    """
+    article = models.ForeignKey(ArticleModel, on_delete=models.CASCADE, related_name="revisions", verbose_name="文章")
+    number = models.PositiveIntegerField(verbose_name="修订号")
+    snapshot = models.BooleanField(default=False, verbose_name="完整内容")
+    # 完整内容或text_codec.make_delta生成的差异
+    data = CompressedTextField(verbose_name="修订数据")
+    created = models.DateTimeField(default=timezone.now, verbose_name="修订时间")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["article", "number"], name="unique_article_revision"),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id}#{self.number}"
+
+    @classmethod
+    def record(cls, changes: list) -> None:
+        """
+        批量记录内容变化,changes为[(文章id, 新内容, 修改前内容或None)],内容未变化的跳过
+        修改前内容即该文章最新修订的内容,差异相对它计算
+        """
+        changes = [change for change in changes if change[1] != change[2]]
+        if not changes:
+            return
+        latest = dict(cls.objects.filter(article_id__in=[article_id for article_id, _, _ in changes])
+                      .values("article_id").annotate(number=Max("number")).values_list("article_id", "number"))
+        revisions = []
+        for article_id, content, previous in changes:
+            number = latest.get(article_id, 0)
+            if not number and previous is not None:
+                # 启用修订历史前已有的文章,先以原内容作为第一个修订
+                number += 1
+                revisions.append(cls(article_id=article_id, number=number, snapshot=True, data=previous))
+            number += 1
+            delta = None
+            if previous is not None and (number - 1) % settings.REVISION_SNAPSHOT_INTERVAL:
+                # 变化过大无法在限定的比较量内计算差异时同样保存完整内容
+                delta = make_delta(previous, content)
+            if delta is None:
+                revisions.append(cls(article_id=article_id, number=number, snapshot=True, data=content))
+            else:
+                revisions.append(cls(article_id=article_id, number=number, data=delta))
+        cls.objects.bulk_create(revisions)
+
+    @classmethod
+    def rebuild(cls, article_id: int, number: int) -> Optional[str]:
+        """
+        还原指定修订的内容: 从不晚于该修订的最近一次完整内容开始依次应用差异,修订不存在时返回None
+        """
+        base = cls.objects.filter(article_id=article_id, number__lte=number, snapshot=True) \
+            .aggregate(base=Max("number"))["base"]
+        if base is None:
+            return None
+        revisions = list(cls.objects.filter(article_id=article_id, number__gte=base, number__lte=number)
+                         .order_by("number").values_list("number", "data"))
+        if revisions[-1][0] != number:
+            return None
+        content = revisions[0][1]
+        for _, delta in revisions[1:]:
+            content = apply_delta(content, delta)
+        return content
+
+
+class ArticleViewCountModel(models.Model):
+    # 阅读数单独一张表,由blog.view_counts定期批量累加,后台保存文章时不会用旧值覆盖计数
+    article = models.OneToOneField(ArticleModel, on_delete=models.CASCADE, primary_key=True,
+                                   related_name="view_count", verbose_name="文章")
+    views = models.PositiveBigIntegerField(default=0, verbose_name="阅读数")
+
+    class Meta:
+        # 热门列表按(阅读数,文章id)倒序,沿索引读取一页即可停止
+        indexes = [
+            models.Index(fields=["-views", "-article"], name="article_views_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id}: {self.views}"
+
 
 class ImageModel(models.Model):
     id = models.AutoField(primary_key=True)
-    article = models.ForeignKey(ArticleModel, on_delete=models.CASCADE, related_name='images', verbose_name="所属文章")
+    # 图片按内容哈希存储,同一图片只保存一份,ref_count为引用该图片的文章数
+    articles = models.ManyToManyField(ArticleModel, related_name='images', blank=True, verbose_name="所属文章")
     path = models.ImageField(upload_to='./', verbose_name="路径")
+    digest = models.CharField(max_length=64, unique=True, null=True, blank=True, verbose_name="内容哈希")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="引用次数")
+    width = models.PositiveIntegerField(null=True, blank=True, verbose_name="宽度")
+    height = models.PositiveIntegerField(null=True, blank=True, verbose_name="高度")
+
+    def __str__(self):
+        return self.path.name
+
+
+class ImageDerivativeModel(models.Model):
+    # 响应式衍生图,按宽度和格式(webp/avif)各保存一份
+    image = models.ForeignKey(ImageModel, on_delete=models.CASCADE, related_name='derivatives', verbose_name="原图")
+    width = models.PositiveIntegerField(verbose_name="宽度")
+    format = models.CharField(max_length=10, verbose_name="格式")
+    path = models.ImageField(upload_to='./', verbose_name="路径")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["image", "width", "format"], name="unique_image_derivative"),
+        ]
+
+    def __str__(self):
+        return self.path.name
+
+
+class RuntimeSettingModel(models.Model):
+    # 运行时可修改的配置,只有一行,每次修改版本号加一,各进程据此刷新本地快照
+    data = models.JSONField(default=dict, verbose_name="配置")
+    version = models.PositiveIntegerField(default=0, verbose_name="版本号")
 
     def __str__(self):
-        return self.path
+        return f"v{self.version}"
@@ -0,0 +1,139 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :pagination
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/18 14:20
+"""
+import base64
+import binascii
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    按(release_date, id)倒序的游标分页,翻页只做一次索引范围扫描,不需要COUNT和OFFSET
+    游标为上一页最后一条数据的"发布时间|id"经base64编码,只提供下一页链接,适用于无限滚动
+    """
+    cursor_query_param = "cursor"
+    page_size = PageNumberPagination.page_size
+    invalid_cursor_message = "无效的游标"
+
+    def __init__(self):
+        self.request = None
+        self.next_position = None
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            release_date, article_id = base64.urlsafe_b64decode(encoded.encode()).decode().split("|")
+            release_date, article_id = parse_datetime(release_date), int(article_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if release_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return release_date, article_id
+
+    @staticmethod
+    def encode_cursor(release_date, article_id) -> str:
+        return base64.urlsafe_b64encode(f"{release_date.isoformat()}|{article_id}".encode()).decode()
+
+    def position_queryset(self, queryset, request):
+        queryset = queryset.order_by("-release_date", "-id")
+        if position := self.decode_cursor(request):
+            release_date, article_id = position
+            queryset = queryset.filter(Q(release_date__lt=release_date) |
+                                       Q(release_date=release_date, id__lt=article_id))
+        # 多取一条用于判断是否还有下一页
+        return queryset[:self.page_size + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        return self.set_page(list(self.position_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        return self.set_page([row async for row in self.position_queryset(queryset, request)])
+
+    def set_page(self, page: list) -> list:
+        self.next_position = None
+        if len(page) > self.page_size:
+            page = page[:self.page_size]
+            self.next_position = (page[-1].release_date, page[-1].id)
+        return page
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param,
+                                   self.encode_cursor(*self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    支持异步视图的页码分页
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset的异步版本,先异步COUNT,页码校验和链接仍由父类按总数完成,再异步取当前页数据
+        """
+        positions = super().paginate_queryset(range(await queryset.acount()), request, view)
+        if not positions:
+            return positions
+        self.page.object_list = [row async for row in queryset[positions[0]:positions[-1] + 1]]
+        return list(self.page.object_list)
+
+
+class ArticleSummaryPagination(AsyncPageNumberPagination):
+    """
+    文章摘要分页,默认按页码分页以兼容现有前端,请求携带cursor参数(首页可为空)时切换为游标分页
+    """
+
+    def __init__(self):
+        self.keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+        self.keyset = None
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,157 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :parsers
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/18 19:30
+"""
+import base64
+import binascii
+import hashlib
+import json
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+# 替换base64图片数据的占位mime,占位数据为图片序号
+SPOOLED_MIME = "spooled"
+# json中的"/"可能被转义为"\/",mime类型最长64个字符,超过则视为普通文本
+DATA_URI_PATTERN = re.compile(rb"data:image\\?/([\w.+\\/-]{1,64});base64,")
+MAX_PREFIX_LENGTH = len(b"data:image\\/") + 64 + len(b";base64,")
+CHUNK_SIZE = 64 * 1024
+BASE64_RUN = re.compile(rb"[A-Za-z0-9+/=]*")
+# json字符串中base64数据可能出现的转义,跳过即可
+SKIPPED_ESCAPES = {b"\\/": b"/", b"\\n": b"", b"\\r": b""}
+
+
+class SpooledImage:
+    """
+    从请求体中分离出的图片,解码后的数据写入临时文件,digest与按base64原文计算的哈希一致
+    """
+
+    def __init__(self, directory: str, index: int, mime: str):
+        self.mime = mime
+        self.path = Path(directory) / f"{index}.img"
+        self.file = open(self.path, "wb")
+        self.sha256 = hashlib.sha256()
+        self.pending = b""
+        self.digest = None
+
+    def feed(self, chars: bytes) -> None:
+        self.sha256.update(chars)
+        data = self.pending + chars
+        # base64按4字符一组解码,不足一组的留待下次
+        usable = len(data) - len(data) % 4
+        self.pending = data[usable:]
+        self.file.write(base64.b64decode(data[:usable]))
+
+    def close(self) -> None:
+        if self.pending:
+            self.file.write(base64.b64decode(self.pending + b"=" * (-len(self.pending) % 4)))
+        self.file.close()
+        self.digest = self.sha256.hexdigest()
+
+    def read_base64(self) -> str:
+        return base64.b64encode(self.path.read_bytes()).decode()
+
+
+class SpooledData(dict):
+    """
+    解析后的请求数据,content中的base64图片已替换为占位符,对应图片见images
+    """
+
+    def __init__(self, data: dict, images: list, directory: tempfile.TemporaryDirectory):
+        super().__init__(data)
+        self.images = images
+        self.directory = directory
+
+    def cleanup(self) -> None:
+        self.directory.cleanup()
+
+
+class SpooledJSONParser(JSONParser):
+    """
+    文章保存专用的json解析器,请求体先写入SpooledTemporaryFile(超过阈值落盘)
+    再分块扫描,base64图片边读边解码写入临时文件,内存中只保留去除图片后的文本
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        spool = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        directory = tempfile.TemporaryDirectory(prefix="article_")
+        try:
+            if stream is not None:
+                shutil.copyfileobj(stream, spool, CHUNK_SIZE)
+            spool.seek(0)
+            text, images = self.split_images(spool, directory.name)
+            encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+            data = json.loads(text.decode(encoding)) if text.strip() else {}
+        except (ValueError, binascii.Error) as exc:
+            directory.cleanup()
+            raise ParseError(f"JSON parse error - {exc}")
+        finally:
+            spool.close()
+        if not isinstance(data, dict):
+            directory.cleanup()
+            raise ParseError("JSON parse error - 请求数据必须为对象")
+        return SpooledData(data, images, directory)
+
+    @staticmethod
+    def split_images(spool, directory: str) -> tuple:
+        text, images, buffer, image = bytearray(), [], b"", None
+        while True:
+            chunk = spool.read(CHUNK_SIZE)
+            buffer += chunk
+            position = 0
+            while position < len(buffer):
+                if image is None:
+                    match = DATA_URI_PATTERN.search(buffer, position)
+                    if match is None:
+                        # 保留可能被分块截断的图片前缀留待下一块
+                        keep = max(position, len(buffer) - MAX_PREFIX_LENGTH) if chunk else len(buffer)
+                        text += buffer[position:keep]
+                        position = keep
+                        break
+                    text += buffer[position:match.start()]
+                    text += f"data:image/{SPOOLED_MIME};base64,{len(images)}".encode()
+                    image = SpooledImage(directory, len(images), match.group(1).decode().replace("\\/", "/"))
+                    images.append(image)
+                    position = match.end()
+                else:
+                    end = BASE64_RUN.match(buffer, position).end()
+                    image.feed(buffer[position:end])
+                    position = end
+                    if position >= len(buffer):
+                        break
+                    escape = buffer[position:position + 2]
+                    if escape in SKIPPED_ESCAPES:
+                        image.feed(SKIPPED_ESCAPES[escape])
+                        position += 2
+                    elif escape == b"\\" and chunk:
+                        # 转义符被分块截断
+                        break
+                    else:
+                        image.close()
+                        image = None
+            buffer = buffer[position:]
+            if not chunk:
+                break
+        if image is not None:
+            image.close()
+        return bytes(text), images
+
+
+def inline_spooled_images(content: str, images: list) -> str:
+    """
+    图片以base64保存到数据库时,把占位符还原为原始base64数据
+    """
+    prefix = f"data:image/{SPOOLED_MIME};base64,"
+    return re.sub(re.escape(prefix) + r"(\d+)",
+                  lambda match: "data:image/{};base64,{}".format(images[int(match.group(1))].mime,
+                                                                 images[int(match.group(1))].read_base64()),
+                  content)
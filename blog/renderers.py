@@ -0,0 +1,27 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :renderers
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 17:55
+"""
+from rest_framework.renderers import JSONRenderer
+
+from blog.instrumentation import timed
+from blog.json_backends import dumps
+
+
+class InstrumentedJSONRenderer(JSONRenderer):
+    """
+    使用settings.JSON_BACKEND序列化,耗时计入请求统计的serialize阶段
+    请求指定缩进(如Accept: application/json; indent=4)时交给DRF原有实现
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed("serialize"):
+            if data is None:
+                return b""
+            if self.get_indent(accepted_media_type, renderer_context or {}):
+                return super().render(data, accepted_media_type, renderer_context)
+            return dumps(data, self.encoder_class)
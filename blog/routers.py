@@ -0,0 +1,54 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :routers
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 10:05
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS
+
+from riyueweiyi import settings
+
+# 只读连接的别名,连接建立时开启query_only,误写会直接报错
+READ_DATABASE = "read"
+
+_use_read_database = ContextVar("use_read_database", default=False)
+
+
+@contextmanager
+def read_database():
+    """
+    在此范围内的查询走只读连接,用于公开的GET视图
+    可作为装饰器使用,视图方法上配合method_decorator(read_database())
+    """
+    token = _use_read_database.set(True)
+    try:
+        yield
+    finally:
+        _use_read_database.reset(token)
+
+
+class ReadWriteRouter:
+    """
+    公开GET视图的读取走只读连接,其余读写均走主连接
+    sqlite开启WAL后读连接不会被写事务阻塞
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_read_database.get() and READ_DATABASE in settings.DATABASES:
+            return READ_DATABASE
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 两个别名指向同一个数据库文件
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,100 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :runtime_settings
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 09:20
+"""
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+
+from blog.models import RuntimeSettingModel
+from riyueweiyi import settings
+
+# 可在运行时修改的配置项,未修改过时取settings中的默认值
+RUNTIME_SETTING_NAMES = ("IMAGE_SAVE_IS_FILE", "IMAGE_COMPRESSIBILITY")
+VERSION_CACHE_KEY = "runtime_settings_version"
+SETTING_ID = 1
+
+
+class RuntimeSettings:
+    """
+    持久化在数据库中的运行时配置,各进程持有本地快照
+    每个请求只做一次版本号检查(共享缓存,未命中时查库),版本变化才重新读取配置
+    """
+
+    def __init__(self):
+        self.version = None
+        self.values = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def defaults() -> dict:
+        return {name: getattr(settings, name) for name in RUNTIME_SETTING_NAMES}
+
+    @staticmethod
+    def current_version() -> int:
+        if (version := cache.get(VERSION_CACHE_KEY)) is None:
+            version = RuntimeSettingModel.objects.filter(id=SETTING_ID).values_list("version", flat=True).first() or 0
+            # 只在缓存仍为空时写入,查库期间其他进程已提交并写入的新版本号不会被旧值覆盖
+            cache.add(VERSION_CACHE_KEY, version, None)
+        return version
+
+    def refresh(self) -> None:
+        if (version := self.current_version()) == self.version:
+            return
+        row = RuntimeSettingModel.objects.filter(id=SETTING_ID).values("data", "version").first()
+        with self.lock:
+            self.values = {**self.defaults(), **(row["data"] if row else {})}
+            self.version = row["version"] if row else 0
+
+    async def arefresh(self) -> None:
+        # 版本未变化时只读一次共享缓存,不离开事件循环
+        if self.version is not None and await cache.aget(VERSION_CACHE_KEY) == self.version:
+            return
+        await sync_to_async(self.refresh)()
+
+    def get(self, name: str):
+        if self.version is None:
+            self.refresh()
+        return self.values[name]
+
+    def update(self, **values) -> None:
+        with transaction.atomic():
+            row, _ = RuntimeSettingModel.objects.select_for_update().get_or_create(id=SETTING_ID)
+            row.data = {**row.data, **values}
+            row.version += 1
+            row.save()
+        # 事务提交后更新共享版本号,其他进程下个请求即会刷新
+        cache.set(VERSION_CACHE_KEY, row.version, None)
+        self.refresh()
+
+
+runtime_settings = RuntimeSettings()
+
+
+class RuntimeSettingsMiddleware:
+    """
+    每个请求开始时检查一次运行时配置版本,同时支持WSGI和ASGI
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        runtime_settings.refresh()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        await runtime_settings.arefresh()
+        return await self.get_response(request)
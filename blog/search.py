@@ -0,0 +1,146 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :search
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/18 15:40
+"""
+import datetime
+import html
+import re
+
+from django.db import connection, connections, router
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.html import escape
+
+from blog.models import ArticleModel
+
+# 基于SQLite FTS5的全文检索表,rowid即文章id,trigram分词可直接检索中文
+FTS_TABLE = "blog_article_fts"
+# trigram分词要求检索词至少3个字符,更短的词改用LIKE匹配
+TRIGRAM_LENGTH = 3
+# 高亮标记先用控制字符占位,转义后再替换为html标签,防止正文中的尖括号注入
+HIGHLIGHT_START, HIGHLIGHT_END = "\x02", "\x03"
+SNIPPET_TOKENS = 32
+SNIPPET_LENGTH = 80
+
+TAG_PATTERN = re.compile(r"<[^>]*>")
+SPACE_PATTERN = re.compile(r"\s+")
+
+
+def search_enabled() -> bool:
+    return connection.vendor == "sqlite"
+
+
+def strip_content(content: str) -> str:
+    """
+    去除html标签(包括base64内嵌图片)和实体,得到用于检索的纯文本
+    """
+    return SPACE_PATTERN.sub(" ", html.unescape(TAG_PATTERN.sub(" ", content or ""))).strip()
+
+
+def index_article(article_id: int, title: str, content: str) -> None:
+    if not search_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [article_id])
+        cursor.execute(f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (%s, %s, %s)",
+                       [article_id, title, strip_content(content)])
+
+
+def remove_article(article_id: int) -> None:
+    if not search_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [article_id])
+
+
+def render_highlight(text: str) -> str:
+    return escape(text or "").replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_END, "</mark>")
+
+
+class ArticleSearchResult:
+    """
+    检索结果的惰性序列,提供count()和切片,交给分页器按页执行SQL
+    """
+
+    def __init__(self, query: str):
+        terms = [term for term in query.split() if term]
+        # 长词走FTS5的MATCH(短语匹配,双引号转义),短词走LIKE
+        self.match_terms = [term for term in terms if len(term) >= TRIGRAM_LENGTH]
+        self.like_terms = [term for term in terms if len(term) < TRIGRAM_LENGTH]
+        self.now = timezone.now()
+        self._count = None
+        # 公开检索走路由选择的只读连接
+        self.connection = connections[router.db_for_read(ArticleModel)]
+
+    def where(self):
+        conditions, params = ["a.release_date < %s"], [self.connection.ops.adapt_datetimefield_value(self.now)]
+        if self.match_terms:
+            conditions.append(f"{FTS_TABLE} MATCH %s")
+            params.append(" ".join('"{}"'.format(term.replace('"', '""')) for term in self.match_terms))
+        for term in self.like_terms:
+            conditions.append("(f.title LIKE %s ESCAPE '\\' OR f.content LIKE %s ESCAPE '\\')")
+            pattern = "%{}%".format(term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_"))
+            params += [pattern, pattern]
+        return " AND ".join(conditions), params
+
+    def count(self) -> int:
+        if self._count is None:
+            if not self.match_terms and not self.like_terms:
+                self._count = 0
+                return self._count
+            conditions, params = self.where()
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE} f JOIN blog_articlemodel a ON a.id = f.rowid "
+                               f"WHERE {conditions}", params)
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item: slice) -> list:
+        if not self.count():
+            return []
+        conditions, params = self.where()
+        if self.match_terms:
+            # bm25相关度排序,标题权重高于正文
+            columns = f"highlight({FTS_TABLE}, 0, %s, %s), snippet({FTS_TABLE}, 1, %s, %s, '...', %s)"
+            column_params = [HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, SNIPPET_TOKENS]
+            order = f"bm25({FTS_TABLE}, 10.0, 1.0)"
+        else:
+            # 仅有短词时无法使用FTS5辅助函数,截取首个匹配位置附近的正文
+            columns = "f.title, substr(f.content, max(instr(f.content, %s) - %s, 1), %s)"
+            column_params = [self.like_terms[0], SNIPPET_LENGTH // 4, SNIPPET_LENGTH]
+            order = "a.release_date DESC"
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT a.id, a.release_date, {columns} FROM {FTS_TABLE} f "
+                           f"JOIN blog_articlemodel a ON a.id = f.rowid WHERE {conditions} "
+                           f"ORDER BY {order} LIMIT %s OFFSET %s",
+                           column_params + params + [item.stop - item.start, item.start])
+            rows = cursor.fetchall()
+        results = []
+        for article_id, release_date, title, snippet in rows:
+            if not self.match_terms:
+                title, snippet = self.mark(title), self.mark(snippet)
+            results.append({"id": article_id, "title": render_highlight(title), "snippet": render_highlight(snippet),
+                            "release_date": self.to_datetime(release_date)})
+        return results
+
+    @staticmethod
+    def to_datetime(value):
+        # 原生SQL查询sqlite返回的时间为字符串,转换为本地时区时间与其他接口保持一致
+        if isinstance(value, str):
+            value = parse_datetime(value)
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, datetime.timezone.utc)
+        return timezone.localtime(value)
+
+    def mark(self, text: str) -> str:
+        for term in self.like_terms:
+            text = re.sub(re.escape(term), lambda m: f"{HIGHLIGHT_START}{m.group()}{HIGHLIGHT_END}", text,
+                          flags=re.IGNORECASE)
+        return text
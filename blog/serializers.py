@@ -6,7 +6,6 @@
 @Author  :方正
 @Date    :2023/6/15 11:26 
 """
-import re
 from typing import Optional
 
 from django.core.cache import cache
@@ -14,7 +13,7 @@ from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from blog.models import ArticleModel, MemberModel, ImageModel, CategoryModel
+from blog.models import ArticleModel, MemberModel, ImageModel, CategoryModel, ARTICLE_CONTENT_MAX_LENGTH
 
 
 class LoginVerificationSerializer(TokenObtainPairSerializer):
@@ -49,8 +48,9 @@ class LoginVerificationSerializer(TokenObtainPairSerializer):
             data["check_code"] = self.generate_code(data['access'])
             return data
         except AuthenticationFailed:
-            attempts += 1
-            cache.set(cache_key, attempts, 300)
+            # 先add再incr,多个进程同时失败时计数也不会丢失
+            cache.add(cache_key, 0, 300)
+            cache.incr(cache_key)
             raise serializers.ValidationError("您的用户名或密码错误")
 
     @staticmethod
@@ -60,7 +60,6 @@ class LoginVerificationSerializer(TokenObtainPairSerializer):
         header_numeric = sum([ord(_) for _ in header])
         payload_numeric = sum([ord(_) for _ in payload])
         signature_numeric = sum([ord(_) for _ in signature])
-        print(header_numeric, payload_numeric, signature_numeric)
         # 计算密钥
         return header_numeric ^ payload_numeric * signature_numeric
 
@@ -71,31 +70,53 @@ class MemberSerializer(serializers.ModelSerializer):
         fields = ["id", "username"]
 
 
-class ArticleSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    通过fields参数只输出部分字段,如ArticleSerializer(articles, many=True, fields=["id", "title"])
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ArticleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # 内容保存在ArticleContentModel中,模型上的content为属性,需显式声明为可写字段
+    content = serializers.CharField(max_length=ARTICLE_CONTENT_MAX_LENGTH)
+
     class Meta:
         model = ArticleModel
         fields = ["id", "title", "author", "content", "release_date", "modification_date", "type"]
 
 
+class ArticleDetailSerializer(ArticleSerializer):
+    # 后台文章详情中分类显示为名称
+    type = serializers.CharField(source="type.name", read_only=True)
+
+
 class ArticleSummarySerializer(serializers.ModelSerializer):
     type_name = serializers.CharField(source="type.name", read_only=True)
-    content_summary = serializers.SerializerMethodField()
 
     class Meta:
         model = ArticleModel
         fields = ["id", "title", "author", "release_date", "modification_date", "type_name", "content_summary"]
 
-    def get_content_summary(self, article: ArticleModel):
-        # 正则清洗html格式的内容字段为中文
-        pattern = re.compile(r'[^\u4e00-\u9fa5，。、；：！？,.!]')
-        # sub替换上述字段为空字段
-        return pattern.sub("", article.content)[:100] + "..."
+
+class ArticlePopularSerializer(ArticleSummarySerializer):
+    # 查询时由阅读数表注解
+    views = serializers.IntegerField(read_only=True)
+
+    class Meta(ArticleSummarySerializer.Meta):
+        fields = ArticleSummarySerializer.Meta.fields + ["views"]
 
 
 class ImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ImageModel
-        fields = ["id", "article", "path"]
+        fields = ["id", "articles", "path", "digest", "ref_count"]
+        read_only_fields = ["digest", "ref_count"]
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -106,6 +127,12 @@ class CategorySerializer(serializers.ModelSerializer):
             return obj.parent.name
         return "无"
 
+    def validate_parent(self, parent):
+        # 不允许把分类移动到自身或其子孙分类下,否则物化路径成环
+        if self.instance and parent and parent.path.startswith(self.instance.path):
+            raise serializers.ValidationError("不能将分类移动到自身或其子分类下")
+        return parent
+
     class Meta:
         model = CategoryModel
         fields = ["id", "name", "parent", "parent_name", ]
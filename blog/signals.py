@@ -0,0 +1,105 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :signals
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/18 15:52
+"""
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save, m2m_changed
+from django.dispatch import receiver
+
+from blog import search
+from blog.caches import invalidate_category_tree
+from blog.generations import bump_generations, article_generations, CATEGORIES, IMAGES
+from blog.images import release_article_images
+from blog.models import ArticleModel, CategoryModel, ImageModel
+from blog.routers import READ_DATABASE
+from blog.snapshots import snapshot_publisher, snapshot_enabled
+from riyueweiyi import settings
+
+
+@receiver(post_save, sender=ArticleModel)
+def sync_article_search_index(sender, instance: ArticleModel, update_fields=None, **kwargs):
+    # 指定update_fields的保存不会修改内容,标题未更新时跳过,避免读取内容表
+    if update_fields is not None and "title" not in update_fields:
+        return
+    search.index_article(instance.id, instance.title, instance.content)
+
+
+@receiver(post_delete, sender=ArticleModel)
+def remove_article_search_index(sender, instance: ArticleModel, **kwargs):
+    search.remove_article(instance.id)
+
+
+@receiver(post_save, sender=CategoryModel)
+@receiver(post_delete, sender=CategoryModel)
+@receiver(post_save, sender=ArticleModel)
+@receiver(post_delete, sender=ArticleModel)
+def invalidate_category_tree_cache(sender, **kwargs):
+    # 分类结构或文章归属变化时清除分类树缓存
+    invalidate_category_tree()
+
+
+@receiver(pre_save, sender=ArticleModel)
+def remember_article_type(sender, instance: ArticleModel, update_fields=None, **kwargs):
+    # 修改文章分类时原分类的列表同样需要失效,保存前取出原分类
+    if not instance._state.adding and (update_fields is None or "type" in update_fields):
+        instance._previous_type_id = ArticleModel.objects.filter(id=instance.id) \
+            .values_list("type_id", flat=True).first()
+
+
+@receiver(post_save, sender=ArticleModel)
+@receiver(post_delete, sender=ArticleModel)
+def bump_article_generations(sender, instance: ArticleModel, **kwargs):
+    # 全部文章列表,以及文章所在分类和上级分类的筛选列表失效
+    bump_generations(article_generations([instance.type_id, instance.__dict__.pop("_previous_type_id", None)]))
+
+
+@receiver(post_save, sender=CategoryModel)
+@receiver(post_delete, sender=CategoryModel)
+def bump_category_generations(sender, **kwargs):
+    # 分类名称出现在全部文章列表中,分类结构变化也会改变筛选范围
+    bump_generations([CATEGORIES])
+
+
+@receiver(post_save, sender=ImageModel)
+@receiver(post_delete, sender=ImageModel)
+@receiver(m2m_changed, sender=ImageModel.articles.through)
+def bump_image_generations(sender, **kwargs):
+    bump_generations([IMAGES])
+
+
+@receiver(post_save, sender=ArticleModel)
+@receiver(post_delete, sender=ArticleModel)
+def publish_article_snapshots(sender, instance: ArticleModel, **kwargs):
+    # 文章变化时更新其详情快照及摘要列表快照
+    snapshot_publisher.schedule(article_ids=[instance.id], summaries=True)
+
+
+@receiver(post_save, sender=CategoryModel)
+@receiver(post_delete, sender=CategoryModel)
+def publish_category_snapshots(sender, instance: CategoryModel, **kwargs):
+    # 分类名称出现在分类列表、摘要列表及该分类下的文章详情中
+    if snapshot_enabled():
+        snapshot_publisher.schedule(article_ids=ArticleModel.objects.filter(type_id=instance.id)
+                                    .values_list("id", flat=True), summaries=True, categories=True)
+
+
+@receiver(pre_delete, sender=ArticleModel)
+def release_article_image_refs(sender, instance: ArticleModel, **kwargs):
+    # 删除文章前释放其图片引用,关联记录随后被级联删除
+    release_article_images(instance)
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    # 新建sqlite连接时设置PRAGMA,只读别名额外开启query_only
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if connection.alias == READ_DATABASE:
+            cursor.execute("PRAGMA query_only = ON")
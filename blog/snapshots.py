@@ -0,0 +1,271 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :snapshots
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 19:10
+"""
+# 公开读取接口的静态json快照,写入SNAPSHOT_ROOT后由nginx直接返回,配置见ReadMe.md
+# 目录结构与接口地址一致: api/article_summary/index.json(第一页)、page-{n}.json,
+# api/category_summary/index.json, api/article/{id}.json,每个文件旁有预压缩的.gz(及.br)
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.db import transaction, close_old_connections
+from django.test import RequestFactory
+from django.urls import resolve
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from blog.compression import available_encodings, compress
+from blog.models import ArticleModel
+from riyueweiyi import settings
+
+SUMMARY_DIRECTORY = "api/article_summary"
+CATEGORY_DIRECTORY = "api/category_summary"
+ARTICLE_DIRECTORY = "api/article"
+STATE_FILE = ".state.json"
+# 各压缩格式对应的文件后缀
+ENCODING_SUFFIXES = {"gzip": "gz", "br": "br"}
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_enabled() -> bool:
+    return settings.SNAPSHOT_ENABLED
+
+
+def snapshot_path(relative: str) -> str:
+    return os.path.join(settings.SNAPSHOT_ROOT, relative)
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    # 先写入同目录下的临时文件再改名,nginx读到的始终是完整文件
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def write_snapshot(relative: str, content: bytes) -> None:
+    path = snapshot_path(relative)
+    # 压缩文件先于原文件写入,供nginx的gzip_static/brotli_static使用
+    for encoding in available_encodings():
+        atomic_write(f"{path}.{ENCODING_SUFFIXES[encoding]}", compress(content, encoding))
+    atomic_write(path, content)
+
+
+def remove_snapshot(relative: str) -> None:
+    path = snapshot_path(relative)
+    # 原文件先删除,nginx随即回退到后端
+    for name in (path, *(f"{path}.{suffix}" for suffix in ENCODING_SUFFIXES.values())):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+
+def render(path: str, query: dict = None):
+    """
+    在进程内调用接口视图,返回(状态码, 响应内容),分页链接使用SNAPSHOT_BASE_URL的域名
+    """
+    base = urlsplit(settings.SNAPSHOT_BASE_URL)
+    secure = base.scheme == "https"
+    factory = RequestFactory(HTTP_HOST=base.netloc, SERVER_PORT="443" if secure else "80")
+    request = factory.get(path, query or {}, secure=secure)
+    # 生成快照不是读者访问,不计入阅读数
+    request.is_snapshot = True
+    match = resolve(path)
+    # 公开读取接口为异步视图,在同步代码中经async_to_sync调用
+    view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+    response = view(request, *match.args, **match.kwargs)
+    if hasattr(response, "render"):
+        response.render()
+    return response.status_code, response.content
+
+
+def publish_article(article_id: int) -> None:
+    status, content = render(f"/api/article/{article_id}")
+    relative = f"{ARTICLE_DIRECTORY}/{article_id}.json"
+    if status == 200:
+        write_snapshot(relative, content)
+    else:
+        # 未发布或已删除的文章移除快照,交给后端返回404
+        remove_snapshot(relative)
+
+
+def publish_summaries() -> None:
+    for page in range(1, settings.SNAPSHOT_SUMMARY_PAGES + 1):
+        status, content = render("/api/article_summary/", {"page": page})
+        relative = f"{SUMMARY_DIRECTORY}/page-{page}.json"
+        if status != 200:
+            # 超出最后一页
+            remove_snapshot(relative)
+            continue
+        write_snapshot(relative, content)
+        if page == 1:
+            write_snapshot(f"{SUMMARY_DIRECTORY}/index.json", content)
+
+
+def publish_categories() -> None:
+    status, content = render("/api/category_summary/")
+    if status == 200:
+        write_snapshot(f"{CATEGORY_DIRECTORY}/index.json", content)
+
+
+def read_state() -> dict:
+    try:
+        with open(snapshot_path(STATE_FILE), encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_state(published_until) -> None:
+    atomic_write(snapshot_path(STATE_FILE), json.dumps({"published_until": published_until.isoformat()}).encode())
+
+
+def publish_all() -> int:
+    """
+    全量生成快照并删除已不存在文章的快照,返回生成的文章数
+    """
+    now = timezone.now()
+    publish_categories()
+    publish_summaries()
+    article_ids = list(ArticleModel.objects.filter(release_date__lt=now).order_by("id").values_list("id", flat=True))
+    for article_id in article_ids:
+        publish_article(article_id)
+    published = {f"{article_id}.json" for article_id in article_ids}
+    directory = snapshot_path(ARTICLE_DIRECTORY)
+    if os.path.isdir(directory):
+        with os.scandir(directory) as iterator:
+            stale = [entry.name for entry in iterator if entry.name.endswith(".json") and entry.name not in published]
+        for name in stale:
+            remove_snapshot(f"{ARTICLE_DIRECTORY}/{name}")
+    write_state(now)
+    return len(article_ids)
+
+
+def publish_due() -> int:
+    """
+    发布上次执行以来到达发布时间的定时文章,供cron每分钟调用,没有到期文章时只做一次查询
+    """
+    now = timezone.now()
+    if (published_until := parse_datetime(read_state().get("published_until", ""))) is None:
+        return publish_all()
+    article_ids = list(ArticleModel.objects.filter(release_date__gte=published_until, release_date__lt=now)
+                       .values_list("id", flat=True))
+    if article_ids:
+        for article_id in article_ids:
+            publish_article(article_id)
+        publish_summaries()
+    write_state(now)
+    return len(article_ids)
+
+
+def new_pending() -> dict:
+    return {"articles": set(), "summaries": False, "categories": False}
+
+
+def merge_pending(pending: dict, other: dict) -> None:
+    pending["articles"].update(other["articles"])
+    pending["summaries"] |= other["summaries"]
+    pending["categories"] |= other["categories"]
+
+
+class SnapshotPublisher:
+    """
+    收集同一事务中需要更新的快照,事务提交后交给后台线程统一生成,请求中只登记待更新内容
+    后台线程合并排队中的多次提交,批量删除文章时列表页也只生成一次
+    进程退出时尚未生成的快照由publish_snapshots命令补齐
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+
+    def ensure_started(self) -> None:
+        # uwsgi在主进程加载应用后fork,线程不会被子进程继承,按进程号判断是否需要重新启动
+        with self.lock:
+            if self.thread is None or self.pid != os.getpid() or not self.thread.is_alive():
+                self.queue = queue.Queue()
+                self.thread = threading.Thread(target=self.run, name="snapshot-publish", daemon=True)
+                self.pid = os.getpid()
+                self.thread.start()
+
+    def schedule(self, article_ids=(), summaries: bool = False, categories: bool = False) -> None:
+        if not snapshot_enabled():
+            return
+        if (pending := getattr(self.local, "pending", None)) is None:
+            pending = self.local.pending = new_pending()
+        merge_pending(pending, {"articles": set(article_ids), "summaries": summaries, "categories": categories})
+        # 每次都注册回调,首个执行的回调处理全部待更新内容,其余为空操作;事务回滚时留待下次提交一并处理
+        transaction.on_commit(self.flush)
+
+    def flush(self) -> None:
+        # 事务提交后在请求线程中执行,只把待更新内容交给后台线程
+        if (pending := getattr(self.local, "pending", None)) is None:
+            return
+        self.local.pending = None
+        self.ensure_started()
+        self.queue.put(pending)
+
+    def run(self) -> None:
+        while True:
+            pending, count = self.queue.get(), 1
+            # 生成期间排队的提交合并为一次
+            while True:
+                try:
+                    merge_pending(pending, self.queue.get_nowait())
+                    count += 1
+                except queue.Empty:
+                    break
+            # 后台线程的数据库连接同样遵循CONN_MAX_AGE
+            close_old_connections()
+            try:
+                self.publish(pending)
+            except Exception:
+                logger.exception("生成快照失败,可执行publish_snapshots命令补齐")
+            finally:
+                for _ in range(count):
+                    self.queue.task_done()
+
+    def publish(self, pending: dict) -> None:
+        for article_id in sorted(pending["articles"]):
+            publish_article(article_id)
+        if pending["summaries"]:
+            publish_summaries()
+        if pending["categories"]:
+            publish_categories()
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        等待已提交的快照全部生成完毕,用于管理命令退出前
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+
+snapshot_publisher = SnapshotPublisher()
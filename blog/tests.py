@@ -1,3 +1,704 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import DatabaseError, connections
+from django.db.models import QuerySet
+from django.test import TestCase, SimpleTestCase, override_settings, Client
+from django.utils import timezone
+
+from blog import text_codec
+from blog.cache_backends import SharedMemoryCache
+from blog.caches import CATEGORY_TREE_CACHE_KEY, get_category_tree
+from blog.file_cleanup import file_removal
+from blog.article_transfer import ArticleImporter
+from blog.generations import get_generations, category_generation, ARTICLES, CATEGORIES, IMAGES, VIEWS
+from blog.images import save_base64_images, image_digest, delete_unused_images, sync_article_images, \
+    adjust_ref_counts
+from blog.benchmark.runner import Scenario, run_scenario, unexpected_results
+from blog.management.commands.benchmark import Command as BenchmarkCommand
+from blog.models import ArticleModel, ArticleRevisionModel, CategoryModel, ArticleViewCountModel, ImageModel, \
+    MemberModel, summarize_content
+from blog.pagination import KeysetPagination
+from blog.routers import READ_DATABASE
+from blog.serializers import LoginVerificationSerializer
+from blog.text_codec import make_delta, apply_delta
+from blog.view_counts import ViewCounter, view_counter, flush_view_counts
+from riyueweiyi import settings
+
+# 测试使用进程内缓存,不读写运行中服务的共享缓存文件
+TEST_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def encoded_image(color: str = "red", size: tuple = (40, 30)) -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class ApiTestMixin:
+    """
+    以管理员身份请求接口
+    """
+    databases = {"default", "read"}
+
+    def setUp(self):
+        super().setUp()
+        # 测试库为共享缓存的内存数据库,只读连接按表加锁,读未提交以看到默认连接事务中的数据
+        connections[READ_DATABASE].cursor().execute("PRAGMA read_uncommitted = ON")
+        # 进程内缓存在测试之间共享,清空后分代计数和列表缓存不会沿用上一个测试的数据
+        cache.clear()
+        self.root = MemberModel.objects.create_superuser("root", "root@example.com", "password")
+        token = LoginVerificationSerializer.get_token(self.root).access_token
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def send(self, method: str, path: str, data=None, **headers):
+        return getattr(self.client, method)(path, json.dumps(data), content_type="application/json",
+                                            **self.auth, **headers)
+
+
+class MediaTestMixin:
+    """
+    图片文件写入临时目录
+    """
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=directory)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+class TextDeltaTests(SimpleTestCase):
+    def test_round_trip(self):
+        previous = "<p>第一段</p><p>第二段</p><img src=\"/media/a.jpeg\"/><p>第三段</p>"
+        for current in ("", previous, "<p>开头</p>" + previous, previous + "<p>结尾</p>",
+                        previous.replace("第二段", "修改后的第二段"), "<p>全部替换</p>"):
+            self.assertEqual(apply_delta(previous, make_delta(previous, current)), current)
+
+    def test_unchanged_prefix_and_suffix_are_copied(self):
+        previous = "".join(f"<p>段落{i}</p>" for i in range(1000))
+        current = previous.replace("<p>段落500</p>", "<p>新段落</p>")
+        delta = make_delta(previous, current)
+        self.assertEqual(delta, '[[0,{0}],"新段落",[{1},{2}]]'.format(
+            previous.index("段落500"), previous.index("</p><p>段落501"), len(previous)))
+        self.assertEqual(apply_delta(previous, delta), current)
+
+    def test_large_change_returns_none(self):
+        previous = "".join(f"<p>旧{i}</p>" for i in range(100))
+        current = "".join(f"<p>新{i}</p>" for i in range(100))
+        with mock.patch.object(text_codec, "DELTA_MAX_COMPARISONS", 100):
+            self.assertIsNone(make_delta(previous, current))
+            # 只有少量片段变化时不受影响
+            self.assertIsNotNone(make_delta(previous, previous.replace("旧50", "新50")))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ArticleRevisionTests(TestCase):
+    def setUp(self):
+        self.category = CategoryModel.objects.create(name="测试")
+        self.contents = ["<p>版本0</p>"]
+        self.article = ArticleModel.objects.create(title="修订", content=self.contents[0], type=self.category)
+
+    def edit(self, content: str) -> None:
+        self.contents.append(content)
+        article = ArticleModel.objects.get(id=self.article.id)
+        article.content = content
+        article.save()
+
+    def revisions(self) -> list:
+        return list(ArticleRevisionModel.objects.filter(article=self.article).order_by("number")
+                    .values_list("number", "snapshot"))
+
+    def test_rebuild_across_snapshot_interval(self):
+        interval = settings.REVISION_SNAPSHOT_INTERVAL
+        for i in range(1, interval * 2 + 2):
+            self.edit("".join(f"<p>段落{j}</p>" for j in range(i)) + f"<p>版本{i}</p>")
+        revisions = self.revisions()
+        self.assertEqual(len(revisions), len(self.contents))
+        self.assertEqual([number for number, snapshot in revisions if snapshot], [1, interval + 1, interval * 2 + 1])
+        for number, content in enumerate(self.contents, 1):
+            self.assertEqual(ArticleRevisionModel.rebuild(self.article.id, number), content)
+        self.assertIsNone(ArticleRevisionModel.rebuild(self.article.id, len(self.contents) + 1))
+
+    def test_large_change_saves_snapshot(self):
+        self.edit("<p>版本0</p><p>小改动</p>")
+        with mock.patch.object(text_codec, "DELTA_MAX_COMPARISONS", 0):
+            self.edit("<p>完全不同的内容</p>")
+        self.edit("<p>完全不同的内容</p><p>之后恢复差异</p>")
+        self.assertEqual(self.revisions(), [(1, True), (2, False), (3, True), (4, False)])
+        for number, content in enumerate(self.contents, 1):
+            self.assertEqual(ArticleRevisionModel.rebuild(self.article.id, number), content)
+
+
+class SharedMemoryCacheTests(SimpleTestCase):
+    # 2组×4路的小槽位及一个大槽位,便于触发淘汰
+    OPTIONS = {"SLABS": [(64, 8), (1024, 2)], "WAYS": 4}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "test.cache")
+        self.cache = self.open_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def open_cache(self, options=None) -> SharedMemoryCache:
+        return SharedMemoryCache(self.path, {"OPTIONS": options or self.OPTIONS})
+
+    def fork(self, target) -> int:
+        """
+        在子进程中执行target,返回其退出码
+        """
+        if (pid := os.fork()) == 0:
+            code = 1
+            try:
+                code = target()
+            finally:
+                os._exit(code)
+        return pid
+
+    @staticmethod
+    def wait(pids) -> list:
+        return [os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]) for pid in pids]
+
+    def test_set_get_delete(self):
+        self.cache.set("key", {"value": 1})
+        self.assertEqual(self.cache.get("key"), {"value": 1})
+        self.assertTrue(self.cache.has_key("key"))
+        self.assertTrue(self.cache.delete("key"))
+        self.assertIsNone(self.cache.get("key"))
+        self.assertFalse(self.cache.delete("key"))
+
+    async def test_async_methods_leave_event_loop(self):
+        # 锁被占用时,异步接口在线程池中等待,事件循环不被阻塞
+        with self.cache._lock():
+            pending = asyncio.ensure_future(self.cache.aset("key", 1))
+            await asyncio.sleep(0.05)
+            self.assertFalse(pending.done())
+        await pending
+        self.assertEqual(await self.cache.aget("key"), 1)
+        self.assertEqual(await self.cache.aincr("key"), 2)
+        self.assertTrue(await self.cache.adelete("key"))
+        self.assertFalse(await self.cache.ahas_key("key"))
+
+    def test_value_larger_than_slots_is_not_cached(self):
+        self.cache.set("small", "x" * 10)
+        self.cache.set("large", "x" * 2000)
+        self.assertEqual(self.cache.get("small"), "x" * 10)
+        self.assertIsNone(self.cache.get("large"))
+        self.assertFalse(self.cache.add("large", "x" * 2000))
+
+    def test_incr_is_atomic_across_threads_and_processes(self):
+        self.cache.set("counter", 0, None)
+        threads_count, processes_count, repeat = 4, 3, 200
+
+        def increase():
+            for _ in range(repeat):
+                self.cache.incr("counter")
+            return 0
+
+        pids = [self.fork(increase) for _ in range(processes_count)]
+        threads = [threading.Thread(target=increase) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.wait(pids), [0] * processes_count)
+        self.assertEqual(self.cache.get("counter"), (threads_count + processes_count) * repeat)
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+    def test_add_is_atomic_across_processes(self):
+        barrier = os.path.join(self.directory, "start")
+
+        def add():
+            while not os.path.exists(barrier):
+                time.sleep(0.001)
+            # 退出码0表示本进程写入成功
+            return 0 if self.cache.add("owner", os.getpid()) else 2
+
+        pids = [self.fork(add) for _ in range(6)]
+        open(barrier, "w").close()
+        codes = self.wait(pids)
+        self.assertEqual(codes.count(0), 1)
+        self.assertEqual(self.cache.get("owner"), pids[codes.index(0)])
+        self.assertFalse(self.cache.add("owner", 0))
+
+    def test_timeout_expiry(self):
+        now = time.time()
+        self.cache.set("short", 1, 10)
+        self.cache.set("forever", 2, None)
+        self.cache.set("touched", 3, 10)
+        self.assertTrue(self.cache.touch("touched", 100))
+        with mock.patch("time.time", return_value=now + 11):
+            self.assertIsNone(self.cache.get("short"))
+            self.assertFalse(self.cache.has_key("short"))
+            self.assertEqual(self.cache.get("forever"), 2)
+            self.assertEqual(self.cache.get("touched"), 3)
+            with self.assertRaises(ValueError):
+                self.cache.incr("short")
+            self.assertTrue(self.cache.add("short", 4, 10))
+            self.assertEqual(self.cache.get("short"), 4)
+        # incr保持原有的过期时间
+        self.cache.set("count", 1, 10)
+        self.assertEqual(self.cache.incr("count"), 2)
+        with mock.patch("time.time", return_value=now + 11):
+            self.assertIsNone(self.cache.get("count"))
+
+    def test_eviction_within_memory_budget(self):
+        slab = self.cache.slabs[0]
+        # 找出落在同一组内的key,组满后写入新key时淘汰组内最久未访问的一个
+        first = self.cache.make_and_validate_key("key0")
+        same_set = [f"key{i}" for i in range(1000) if slab.slots(self.cache._hash(
+            self.cache.make_and_validate_key(f"key{i}"))) == slab.slots(self.cache._hash(first))][:slab.ways + 1]
+        clock = iter(range(1, 100))
+        with mock.patch("time.time", side_effect=lambda: float(next(clock))):
+            for key in same_set[:slab.ways]:
+                self.cache.set(key, key, None)
+            self.cache.get(same_set[0])
+            self.cache.set(same_set[-1], same_set[-1], None)
+        self.assertEqual(self.cache.get(same_set[0]), same_set[0])
+        self.assertIsNone(self.cache.get(same_set[1]))
+        self.assertEqual([self.cache.get(key) for key in same_set[2:]], same_set[2:])
+        # 写入远多于槽位数的key,缓存中保留的数量不超过槽位总数
+        for i in range(100):
+            self.cache.set(f"many{i}", i, None)
+        self.assertLessEqual(sum(self.cache.has_key(f"many{i}") for i in range(100)), slab.sets * slab.ways)
+        self.assertEqual(os.path.getsize(self.path), self.cache.file_size)
+
+    def test_reopen_after_fork(self):
+        self.cache.set("parent", 1, None)
+        file = self.cache._file
+
+        def child():
+            # 子进程重新打开文件,使用独立的flock锁,写入对父进程可见
+            self.cache.set("child", self.cache.get("parent") + 1, None)
+            return 0 if self.cache._pid == os.getpid() and self.cache._file is not file else 2
+
+        self.assertEqual(self.wait([self.fork(child)]), [0])
+        self.assertEqual(self.cache.get("child"), 2)
+        self.assertIs(self.cache._file, file)
+
+    def test_layout_change_reinitializes_file(self):
+        self.cache.set("key", 1, None)
+        self.assertEqual(self.open_cache().get("key"), 1)
+        other = self.open_cache({"SLABS": [(128, 8)], "WAYS": 2})
+        self.assertIsNone(other.get("key"))
+        self.assertEqual(os.path.getsize(self.path), other.file_size)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        category = CategoryModel.objects.create(name="阅读数")
+        self.first = ArticleModel.objects.create(title="第一篇", content="<p>一</p>", type=category)
+        self.second = ArticleModel.objects.create(title="第二篇", content="<p>二</p>", type=category)
+        self.counter = ViewCounter(60)
+        self.addCleanup(self.counter.stop)
+
+    def views(self) -> dict:
+        return dict(ArticleViewCountModel.objects.values_list("article_id", "views"))
+
+    def test_flush_merges_counts(self):
+        for article in (self.first, self.first, self.second):
+            self.counter.record(article.id)
+        self.assertEqual(self.counter.pending(self.first.id), 2)
+        self.assertEqual(self.counter.flush(), 2)
+        self.assertEqual(self.views(), {self.first.id: 2, self.second.id: 1})
+        self.counter.record(self.first.id)
+        # 已删除文章的计数跳过
+        self.counter.record(self.second.id + 100)
+        self.assertEqual(self.counter.flush(), 1)
+        self.assertEqual(self.views(), {self.first.id: 3, self.second.id: 1})
+        self.assertEqual(self.counter.pending(self.first.id), 0)
+
+    def test_failed_flush_keeps_counts(self):
+        self.counter.record(self.first.id)
+        with mock.patch("blog.view_counts.flush_view_counts", side_effect=DatabaseError("locked")), \
+                self.assertLogs("blog.view_counts", "WARNING"):
+            self.assertEqual(self.counter.flush(), 0)
+        self.counter.record(self.first.id)
+        self.assertEqual(self.counter.pending(self.first.id), 2)
+        self.counter.flush()
+        self.assertEqual(self.views(), {self.first.id: 2})
+
+    def test_stop_flushes_and_clears(self):
+        self.counter.record(self.first.id)
+        thread = self.counter.thread
+        self.counter.stop()
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.views(), {self.first.id: 1})
+        self.counter.record(self.first.id)
+        self.assertTrue(self.counter.thread.is_alive())
+
+    def test_benchmark_does_not_write_views_to_default_database(self):
+        written = {}
+
+        def run_benchmark(*args, **kwargs):
+            # 基准测试请求文章详情,阅读数在进程内缓冲
+            view_counter.record(self.first.id)
+            view_counter.record(self.first.id)
+            return {}
+
+        def teardown_databases(*args, **kwargs):
+            # 切换回正式数据库前计数已写入测试数据库,之后清空本数据库模拟切换
+            written.update(self.views())
+            ArticleViewCountModel.objects.all().delete()
+
+        command = BenchmarkCommand(stdout=open(os.devnull, "w"))
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch("blog.management.commands.benchmark.setup_databases"), \
+                mock.patch("blog.management.commands.benchmark.teardown_databases", teardown_databases), \
+                mock.patch("blog.management.commands.benchmark.generate_dataset",
+                           return_value={"categories": 0, "created": 0}), \
+                mock.patch("blog.management.commands.benchmark.run_benchmark", run_benchmark):
+            command.run_isolated(directory, None, {"iterations": 1, "warmup": 0, "only": None})
+        self.assertEqual(written, {self.first.id: 2})
+        self.assertIsNone(view_counter.thread)
+        # 进程退出时的写入不再包含基准测试的计数
+        self.assertEqual(view_counter.flush(), 0)
+        self.assertEqual(self.views(), {})
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BenchmarkRunnerTests(TestCase):
+    databases = {"default", "read"}
+
+    def test_unexpected_status_is_flagged(self):
+        client = Client(raise_request_exception=False)
+        missing = run_scenario(client, Scenario("image_derivative", "get", "/api/image_derivative/999/400.webp",
+                                                expected=(302,)), 3, 0, {})
+        summary = run_scenario(client, Scenario("article_summary", "get", "/api/article_summary/"), 3, 0, {})
+        self.assertEqual((missing["status"], missing["unexpected"]), ({"404": 3}, 3))
+        self.assertEqual(summary["unexpected"], 0)
+        self.assertEqual(unexpected_results({"image_derivative": missing, "article_summary": summary}),
+                         ["image_derivative: {'404': 3}"])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ImageStoreTests(MediaTestMixin, TestCase):
+    def save(self, encoded: str) -> str:
+        return save_base64_images({image_digest(encoded): encoded})[image_digest(encoded)]
+
+    def test_resaved_image_survives_queued_removal(self):
+        encoded = encoded_image(size=(450, 300))
+        path = self.save(encoded)
+        self.assertTrue(default_storage.exists(path))
+        # 删除记录后文件排队等待后台线程删除,删除执行前同一图片又被保存
+        with self.captureOnCommitCallbacks() as callbacks:
+            delete_unused_images(set(ImageModel.objects.values_list("id", flat=True)))
+        self.assertTrue(callbacks)
+        self.assertFalse(ImageModel.objects.exists())
+        self.assertEqual(self.save(encoded), path)
+        derivatives = list(ImageModel.objects.get(path=path).derivatives.values_list("path", flat=True))
+        self.assertTrue(derivatives)
+        for removed in (path, *derivatives):
+            file_removal.remove(removed, 0, [])
+        self.assertTrue(all(default_storage.exists(name) for name in (path, *derivatives)))
+        # 没有记录引用时正常删除
+        delete_unused_images(set(ImageModel.objects.values_list("id", flat=True)))
+        file_removal.remove(path, 0, [])
+        self.assertFalse(default_storage.exists(path))
+
+    def test_same_image_saved_once(self):
+        encoded = encoded_image("blue")
+        self.assertEqual(self.save(encoded), self.save(encoded))
+        self.assertEqual(ImageModel.objects.count(), 1)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ArticleImageTransactionTests(ApiTestMixin, MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = CategoryModel.objects.create(name="图片")
+        self.article = ArticleModel.objects.create(title="图片文章", content="<p>原内容</p>", type=self.category)
+        self.content = f'<p>新内容</p><img src="data:image/png;base64,{encoded_image()}">'
+
+    def test_invalid_put_saves_no_images(self):
+        response = self.send("put", f"/api/article_root/{self.article.id}",
+                             {"title": "图片文章", "content": self.content, "type": [self.category.id + 100]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImageModel.objects.exists())
+        self.assertEqual(ArticleModel.objects.get(id=self.article.id).content, "<p>原内容</p>")
+
+    def test_valid_put_saves_referenced_images(self):
+        response = self.send("put", f"/api/article_root/{self.article.id}",
+                             {"title": "图片文章", "content": self.content, "type": [self.category.id]})
+        self.assertEqual(response.status_code, 200)
+        image = ImageModel.objects.get()
+        self.assertEqual(image.ref_count, 1)
+        self.assertIn(image.path.name, ArticleModel.objects.get(id=self.article.id).content)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CategoryTreeCacheTests(TestCase):
+    def test_invalidated_after_commit(self):
+        cache.set(CATEGORY_TREE_CACHE_KEY, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            CategoryModel.objects.create(name="分类树")
+            # 提交前缓存仍在,其他请求不会在提交前以旧数据重建缓存
+            self.assertEqual(cache.get(CATEGORY_TREE_CACHE_KEY), [])
+        self.assertIsNone(cache.get(CATEGORY_TREE_CACHE_KEY))
+        self.assertEqual([node["name"] for node in get_category_tree()], ["分类树"])
+
+
+def published(**kwargs) -> ArticleModel:
+    # 发布时间早于当前时间,公开接口才会返回
+    kwargs.setdefault("release_date", timezone.now() - timedelta(hours=1))
+    kwargs.setdefault("content", f"<p>{kwargs['title']}</p>")
+    return ArticleModel.objects.create(**kwargs)
+
+
+def result_ids(response) -> list:
+    return [article["id"] for article in response.json()["results"]]
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ArticleDetailTests(ApiTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        recorder = mock.patch.object(view_counter, "record")
+        self.record = recorder.start()
+        self.addCleanup(recorder.stop)
+        self.category = CategoryModel.objects.create(name="详情")
+        self.article = published(title="详情文章", type=self.category)
+        self.url = f"/api/article/{self.article.id}"
+
+    def test_conditional_requests(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["content"], "<p>详情文章</p>")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+        # 304响应同样计入阅读数
+        self.assertEqual(self.record.call_count, 4)
+
+    def test_update_invalidates_detail(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.send("put", f"/api/article_root/{self.article.id}",
+                             {"title": "详情文章", "content": "<p>新内容</p>", "type": [self.category.id]})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["content"], "<p>新内容</p>")
+
+    def test_category_rename_invalidates_detail(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.send("put", f"/api/category/{self.category.id}", {"name": "改名"})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["type"], "改名")
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ArticleSummaryTests(ApiTestMixin, TestCase):
+    def summary_ids(self, **params) -> list:
+        return result_ids(self.client.get("/api/article_summary/", params))
+
+    @mock.patch.object(KeysetPagination, "page_size", 2)
+    def test_cursor_pages_through_equal_release_dates(self):
+        category = CategoryModel.objects.create(name="游标")
+        release_date = timezone.now() - timedelta(hours=1)
+        ids = [published(title=f"游标{index}", type=category, release_date=release_date).id for index in range(3)]
+        earlier = published(title="更早", type=category, release_date=release_date - timedelta(minutes=1)).id
+        # 第一页末尾与下一页开头发布时间相同,按id区分,不重复也不遗漏
+        url, pages = "/api/article_summary/?cursor=", []
+        while url:
+            data = self.client.get(url).json()
+            pages.append([article["id"] for article in data["results"]])
+            url = data["next"]
+        self.assertEqual(pages, [[ids[2], ids[1]], [ids[0], earlier]])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get("/api/article_summary/", {"cursor": "无效"}).status_code, 404)
+
+    def test_category_filter_follows_moved_subtree(self):
+        old_parent = CategoryModel.objects.create(name="原上级")
+        new_parent = CategoryModel.objects.create(name="新上级")
+        child = CategoryModel.objects.create(name="子分类", parent=old_parent)
+        grandchild = CategoryModel.objects.create(name="孙分类", parent=child)
+        article = published(title="孙分类文章", type=grandchild)
+        self.assertEqual(self.summary_ids(category=old_parent.id), [article.id])
+        self.assertEqual(self.summary_ids(category=new_parent.id), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.send("put", f"/api/category/{child.id}", {"name": "子分类", "parent": new_parent.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(CategoryModel.objects.get(id=grandchild.id).path,
+                         f"/{new_parent.id}/{child.id}/{grandchild.id}/")
+        self.assertEqual(self.summary_ids(category=old_parent.id), [])
+        self.assertEqual(self.summary_ids(category=new_parent.id), [article.id])
+        self.assertEqual(self.summary_ids(category=child.id), [article.id])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ArticleSearchTests(ApiTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        category = CategoryModel.objects.create(name="检索")
+        self.indexed = published(title="全文检索入门", content="<p>trigram分词支持中文检索</p>", type=category)
+        self.pet = published(title="养猫笔记", content="<p>猫粮的选择</p>", type=category)
+
+    def search(self, query: str):
+        return self.client.get("/api/article_search/", {"q": query})
+
+    def test_long_terms_match_index(self):
+        response = self.search("全文检索")
+        self.assertEqual(result_ids(response), [self.indexed.id])
+        self.assertIn("<mark>", response.json()["results"][0]["title"])
+
+    def test_short_terms_match_like(self):
+        response = self.search("猫")
+        self.assertEqual(result_ids(response), [self.pet.id])
+        self.assertEqual(response.json()["results"][0]["title"], "养<mark>猫</mark>笔记")
+
+    def test_mixed_terms_must_all_match(self):
+        self.assertEqual(result_ids(self.search("trigram 中文")), [self.indexed.id])
+        self.assertEqual(result_ids(self.search("trigram 猫")), [])
+
+    def test_blank_query_rejected(self):
+        self.assertEqual(self.search("  ").status_code, 400)
+
+
+class TokenVerifyTests(ApiTestMixin, TestCase):
+    def test_missing_and_invalid_tokens(self):
+        for path in ("/api/setting_image/", "/api/article_root/"):
+            for headers in ({}, {"HTTP_AUTHORIZATION": "Bearer invalid"}):
+                self.assertEqual(self.client.get(path, **headers).status_code, 401)
+            self.assertEqual(self.client.get(path, **self.auth).status_code, 200)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BulkDeleteTests(ApiTestMixin, MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        category = CategoryModel.objects.create(name="批量删除")
+        encoded = encoded_image()
+        self.path = save_base64_images({image_digest(encoded): encoded})[image_digest(encoded)]
+        self.articles = [published(title=f"批量删除{index}", type=category,
+                                   content=f'<img src="{settings.MEDIA_URL}{self.path}">') for index in range(2)]
+        for article in self.articles:
+            sync_article_images(article)
+
+    def bulk_delete(self):
+        return self.send("post", "/api/article_root/bulk_delete/", {"ids": [article.id for article in self.articles]})
+
+    def test_failure_rolls_back(self):
+        delete = QuerySet.delete
+
+        def failing_delete(queryset):
+            if queryset.model is ArticleModel:
+                raise DatabaseError("删除失败")
+            return delete(queryset)
+
+        with mock.patch.object(file_removal, "submit") as submit, mock.patch.object(QuerySet, "delete", failing_delete):
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(DatabaseError):
+                self.bulk_delete()
+        submit.assert_not_called()
+        self.assertEqual(ArticleModel.objects.count(), 2)
+        self.assertEqual(ImageModel.objects.get().ref_count, 2)
+        self.assertTrue(default_storage.exists(self.path))
+
+    def test_files_removed_after_commit(self):
+        with mock.patch.object(file_removal, "submit") as submit:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.bulk_delete()
+                self.assertEqual(response.json()["deleted"], 2)
+                self.assertFalse(ImageModel.objects.exists())
+            submit.assert_not_called()
+            for callback in callbacks:
+                callback()
+        submit.assert_called_once()
+        self.assertIn(self.path, submit.call_args.args[0])
+
+
+class ArticleImportTests(TestCase):
+    RECORDS = [
+        {"kind": "category", "names": ["技术"]},
+        {"kind": "category", "names": ["技术", "Python"]},
+        # 同名分类位于其他上级下,沿用已有分类
+        {"kind": "category", "names": ["生活", "Python"]},
+        {"kind": "article", "title": "导入文章", "content": "<p>导入</p>", "category": ["生活", "Python"],
+         "author": None, "release_date": "2026-10-01T08:00:00+08:00", "modification_date": "2026-10-01T08:00:00+08:00"},
+    ]
+
+    def test_import_twice(self):
+        first = ArticleImporter().run(self.RECORDS)
+        self.assertEqual((first["categories"], first["mismatched"], first["created"]), (3, 1, 1))
+        importer = ArticleImporter()
+        second = importer.run(self.RECORDS)
+        self.assertEqual((second["categories"], second["mismatched"], second["created"], second["skipped"]),
+                         (0, 1, 0, 1))
+        self.assertEqual(len(importer.warnings), 1)
+        self.assertEqual(CategoryModel.objects.count(), 3)
+        article = ArticleModel.objects.select_related("type__parent").get()
+        self.assertEqual((article.type.name, article.type.parent.name), ("Python", "技术"))
+        self.assertEqual(ArticleImporter(update=True).run(self.RECORDS)["updated"], 1)
+        self.assertEqual(ArticleModel.objects.count(), 1)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class GenerationTests(ApiTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = CategoryModel.objects.create(name="分代")
+        self.article = published(title="分代文章", type=self.category)
+
+    def changed(self, names: list, action) -> list:
+        """
+        执行action并提交后,各分代计数是否变化
+        """
+        before = get_generations(names)
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+        return [old != new for old, new in zip(before, get_generations(names))]
+
+    def summaries(self) -> list:
+        return [article["content_summary"] for article in self.client.get("/api/article_summary/").json()["results"]]
+
+    def test_view_count_flush(self):
+        self.assertEqual(self.changed([VIEWS, ARTICLES], lambda: flush_view_counts({self.article.id: 2})),
+                         [True, False])
+        # 已有计数行时累加
+        self.assertEqual(self.changed([VIEWS], lambda: flush_view_counts({self.article.id: 3})), [True])
+        self.assertEqual(ArticleViewCountModel.objects.get(article=self.article).views, 5)
+
+    def test_ref_count_update(self):
+        image = ImageModel.objects.create(path="article_images/generation.jpeg")
+        self.assertEqual(self.changed([IMAGES, ARTICLES], lambda: adjust_ref_counts(Counter({image.id: 2}))),
+                         [True, False])
+        self.assertEqual(ImageModel.objects.get(id=image.id).ref_count, 2)
+
+    def test_bulk_update_invalidates_list(self):
+        ArticleModel.objects.filter(id=self.article.id).update(content_summary="")
+        self.assertEqual(self.summaries(), [""])
+        changed = self.changed([ARTICLES, category_generation(self.category.id)],
+                               lambda: call_command("backfill_content_summary", stdout=io.StringIO()))
+        self.assertEqual(changed, [True, False])
+        self.assertEqual(self.summaries(), [summarize_content(self.article.content)])
+
+    def test_bulk_create_invalidates_list(self):
+        self.assertEqual(result_ids(self.client.get("/api/article_summary/")), [self.article.id])
+        records = [{"kind": "article", "title": "导入分代", "content": "<p>导入</p>", "category": ["分代"],
+                    "author": None, "release_date": "2026-10-01T08:00:00+08:00",
+                    "modification_date": "2026-10-01T08:00:00+08:00"}]
+        self.assertEqual(self.changed([ARTICLES, CATEGORIES], lambda: ArticleImporter().run(records)), [True, True])
+        self.assertEqual(len(result_ids(self.client.get("/api/article_summary/"))), 2)
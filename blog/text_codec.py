@@ -0,0 +1,100 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :text_codec
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 22:30
+"""
+# 文章内容的压缩及修订差异,本模块不导入django,也可用于迁移脚本
+import json
+import re
+import zlib
+from difflib import SequenceMatcher
+from typing import Optional
+
+# 压缩格式标识,保存在压缩数据的第一个字节,以后更换字典时新增标识,已保存的数据按原标识解压
+ZLIB_DICTIONARY_V1 = 1
+# 预置字典: 文章html中的常用片段,越常见的越靠后(zlib优先匹配距离近的内容)
+# 已保存的数据依赖字典内容解压,字典一经使用不能修改
+DICTIONARIES = {
+    ZLIB_DICTIONARY_V1: "".join([
+        '<table><tbody><tr><th></th></tr><tr><td></td></tr></tbody></table>',
+        '<blockquote></blockquote><hr/><h4></h4><h5></h5><h6></h6><em></em><u></u><s></s><sup></sup><sub></sub>',
+        '<ol><li></li></ol><ul><li></li></ul><a href="https://" target="_blank"></a>',
+        '<pre><code class="language-python"></code></pre><pre><code class="language-javascript"></code></pre>',
+        '<span style="color: rgb(); background-color: rgb();"></span><span style="font-size: px;"></span>',
+        '<p style="text-align: center;"></p><p style="text-indent: 2em;"></p>',
+        '<img src="/media/" alt="" data-href="" style=""/><img src="data:image/jpeg;base64,"/>',
+        '<h1></h1><h2></h2><h3></h3><strong></strong><code></code>&nbsp;&lt;&gt;&amp;&quot;',
+        '，。、；：！？“”‘’（）《》【】……——',
+        '<p><br></p><p></p>',
+    ]).encode(),
+}
+DEFAULT_DICTIONARY = ZLIB_DICTIONARY_V1
+COMPRESS_LEVEL = 9
+
+# 差异计算按html标签边界切分,整篇内容逐字符比较太慢
+CHUNK_PATTERN = re.compile(r"<[^<>]*>|[^<]+|<")
+# SequenceMatcher最坏耗时与两侧片段数之积成正比,去掉首尾相同的片段后仍超过该值时不计算差异,改为保存完整内容
+DELTA_MAX_COMPARISONS = 4000000
+
+
+def compress_text(text: str, dictionary: int = DEFAULT_DICTIONARY) -> bytes:
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zdict=DICTIONARIES[dictionary])
+    return bytes([dictionary]) + compressor.compress(text.encode()) + compressor.flush()
+
+
+def decompress_text(data) -> str:
+    data = bytes(data)
+    decompressor = zlib.decompressobj(zdict=DICTIONARIES[data[0]])
+    return (decompressor.decompress(data[1:]) + decompressor.flush()).decode()
+
+
+def split_chunks(text: str) -> list:
+    return CHUNK_PATTERN.findall(text)
+
+
+def make_delta(previous: str, current: str) -> Optional[str]:
+    """
+    计算current相对previous的差异,结果为json数组:
+    [起始, 结束]表示复制previous中的该区间,字符串表示插入的内容
+    首尾相同的片段直接复制,只比较中间变化的部分,比较量超过DELTA_MAX_COMPARISONS时返回None
+    """
+    old, new = split_chunks(previous), split_chunks(current)
+    prefix, limit = 0, min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    old_end, new_end = len(old) - suffix, len(new) - suffix
+    if (old_end - prefix) * (new_end - prefix) > DELTA_MAX_COMPARISONS:
+        return None
+    # 各片段在previous中的字符偏移
+    offsets = [0]
+    for chunk in old:
+        offsets.append(offsets[-1] + len(chunk))
+    operations = []
+
+    def copy(start: int, end: int) -> None:
+        # 相邻的复制区间合并为一个
+        if operations and isinstance(operations[-1], list) and operations[-1][1] == start:
+            operations[-1][1] = end
+        elif end > start:
+            operations.append([start, end])
+
+    copy(0, offsets[prefix])
+    matcher = SequenceMatcher(None, old[prefix:old_end], new[prefix:new_end])
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            copy(offsets[prefix + i1], offsets[prefix + i2])
+        elif j2 > j1:
+            operations.append("".join(new[prefix + j1:prefix + j2]))
+    copy(offsets[old_end], offsets[-1])
+    return json.dumps(operations, ensure_ascii=False, separators=(",", ":"))
+
+
+def apply_delta(previous: str, delta: str) -> str:
+    return "".join(previous[operation[0]:operation[1]] if isinstance(operation, list) else operation
+                   for operation in json.loads(delta))
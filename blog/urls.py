@@ -12,17 +12,24 @@ from blog.views import *
 
 urlpatterns = [
     path("api/login_verification/", LoginVerificationApi.as_view()),
-    path("api/article/", ArticleViewApi.as_view()),
-    path("api/article/<int:pk>", ArticleViewApi.as_view()),
+    path("api/article/<int:pk>", article_detail),
     path("api/article_root/", ArticleRootViewApi.as_view()),
     path("api/article_root/<int:pk>", ArticleRootViewApi.as_view()),
-    path("api/article_summary/", ArticleSummaryViewApi.as_view()),
+    path("api/article_root/bulk_delete/", bulk_delete_articles),
+    path("api/article_root/<int:pk>/revisions/", article_revisions),
+    path("api/article_root/<int:pk>/revisions/<int:number>", article_revision),
+    path("api/article_summary/", article_summary),
+    path("api/article_popular/", article_popular),
     path("api/article_summary_root/", ArticleSummaryRootViewApi.as_view()),
+    path("api/article_search/", ArticleSearchViewApi.as_view()),
     path("api/image/", ImageViewApi.as_view()),
+    path("api/image_derivative/<int:pk>/<int:width>.<str:fmt>", image_derivative),
     path("api/category/", CategoryViewApi.as_view()),
     path("api/category/<int:pk>", CategoryViewApi.as_view()),
-    path("api/category_summary/", CategorySummaryViewApi.as_view()),
+    path("api/category_summary/", category_summary),
+    path("api/category_tree/", CategoryTreeViewApi.as_view()),
     path("api/setting_image/",get_image_setting),
     path("api/change_image_compressibility/", change_image_compressibility),
     path("api/change_image_save_method/",change_image_save_method),
+    path("api/delete_unused_files/", delete_unused_files),
 ]
@@ -0,0 +1,121 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project :riyueweiyi
+@File    :view_counts
+@IDE     :PyCharm
+@Author  :方正
+@Date    :2026/10/19 23:30
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+
+from django.db import transaction, close_old_connections, connections, DatabaseError
+from django.db.models import Case, When, Value, F
+
+from blog.generations import bump_generations, VIEWS
+from blog.models import ArticleModel, ArticleViewCountModel
+from riyueweiyi import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    文章阅读数的写后缓冲: 请求中只在进程内存中累加,后台线程每隔flush_interval秒在一个事务中批量写入数据库
+    读取文章不会等待写锁,进程崩溃时最多丢失一个间隔内的计数,正常退出时写入剩余计数
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopped = None
+        self.pid = None
+
+    def ensure_started(self) -> None:
+        # uwsgi在主进程加载应用后fork,线程不会被子进程继承,按进程号判断是否需要重新启动
+        if self.pid == os.getpid() and self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or self.pid != os.getpid() or not self.thread.is_alive():
+                if self.pid != os.getpid():
+                    # fork前父进程未写入的计数由父进程负责,子进程从零开始
+                    self.counts = Counter()
+                    atexit.register(self.flush)
+                self.stopped = threading.Event()
+                self.thread = threading.Thread(target=self.run, args=(self.stopped,), name="view-count-flush",
+                                               daemon=True)
+                self.pid = os.getpid()
+                self.thread.start()
+
+    def record(self, article_id: int) -> None:
+        self.ensure_started()
+        with self.lock:
+            self.counts[article_id] += 1
+
+    def pending(self, article_id: int) -> int:
+        """
+        本进程中尚未写入数据库的阅读数
+        """
+        return self.counts.get(article_id, 0)
+
+    def run(self, stopped: threading.Event) -> None:
+        while not stopped.wait(self.flush_interval):
+            # 后台线程的数据库连接同样遵循CONN_MAX_AGE
+            close_old_connections()
+            self.flush()
+        connections.close_all()
+
+    def stop(self) -> None:
+        """
+        停止后台线程,把剩余计数写入当前数据库后清空,之后的record重新启动线程
+        基准测试切换回正式数据库前调用,测试产生的阅读数不会写入正式数据库
+        """
+        with self.lock:
+            thread, stopped, self.thread = self.thread, self.stopped, None
+        if thread is not None and thread.is_alive():
+            stopped.set()
+            thread.join()
+        self.flush()
+        with self.lock:
+            self.counts = Counter()
+
+    def flush(self) -> int:
+        """
+        取出当前累计的阅读数并写入数据库,写入失败时放回,下次一并写入,返回写入的文章数
+        """
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+        if not counts:
+            return 0
+        try:
+            return flush_view_counts(counts)
+        except DatabaseError as e:
+            logger.warning("写入%d篇文章的阅读数失败,下次重试: %s", len(counts), e)
+            with self.lock:
+                self.counts.update(counts)
+            return 0
+
+
+def flush_view_counts(counts: dict) -> int:
+    """
+    在一个事务中累加多篇文章的阅读数: 先补齐缺少的计数行,再用一条UPDATE按文章分别加上增量
+    """
+    with transaction.atomic():
+        # 缓冲期间被删除的文章跳过
+        article_ids = list(ArticleModel.objects.filter(id__in=list(counts)).values_list("id", flat=True))
+        if not article_ids:
+            return 0
+        ArticleViewCountModel.objects.bulk_create([ArticleViewCountModel(article_id=article_id)
+                                                   for article_id in article_ids], ignore_conflicts=True)
+        ArticleViewCountModel.objects.filter(article_id__in=article_ids).update(views=F("views") + Case(
+            *(When(article_id=article_id, then=Value(counts[article_id])) for article_id in article_ids)))
+        bump_generations([VIEWS])
+    return len(article_ids)
+
+
+view_counter = ViewCounter(settings.VIEW_COUNT_FLUSH_INTERVAL)
@@ -1,111 +1,148 @@
-import base64
 import datetime
 import json
-import os
-import re
 from functools import wraps
-from io import BytesIO
+from typing import Optional
 
-import jwt
-from PIL import Image
-from django.db import transaction, models
-from django.http import JsonResponse, HttpResponseNotFound, HttpResponseServerError, HttpResponse, HttpRequest
+from django.db import transaction
+from django.db.models import Prefetch, F
+from django.http import HttpResponseNotFound, HttpResponseServerError, HttpResponse, HttpRequest, \
+    HttpResponseRedirect, HttpResponseNotAllowed
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.http import http_date
+from django.views.decorators.http import require_POST, require_http_methods
 from rest_framework import generics, filters
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.request import Request
+from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from blog.models import ArticleModel, ImageModel, CategoryModel
+from blog.authentication import CachedJWTAuthentication
+from blog.caches import invalidate_article_detail, get_category_tree, invalidate_article_details, \
+    aarticle_version, version_etag, aget_article_detail, article_views, cache_list_response, get_list_data, \
+    arelease_timeout, LIST_CACHE_TIMEOUT
+from blog.compression import preferred_encoding, encoded_response
+from blog.generations import ARTICLES, CATEGORIES, IMAGES, VIEWS, category_generation
+from blog.image_codec import supported_formats
+from blog.images import extract_base64_images, sync_article_images, build_derivative, release_articles_images
+from blog.json_backends import JsonResponse
+from blog.models import ArticleModel, ImageModel, CategoryModel, summarize_content, ImageDerivativeModel, \
+    ArticleRevisionModel
+from blog.media_gc import collect_orphaned_media
+from blog.pagination import ArticleSummaryPagination, AsyncPageNumberPagination
+from blog.routers import read_database
+from blog.runtime_settings import runtime_settings
+from blog.parsers import SpooledJSONParser, SpooledData, inline_spooled_images
+from blog.renderers import InstrumentedJSONRenderer
+from blog.search import ArticleSearchResult
 from blog.serializers import ArticleSerializer, ImageSerializer, LoginVerificationSerializer, CategorySerializer, \
-    ArticleSummarySerializer
+    ArticleSummarySerializer, ArticleDetailSerializer, ArticlePopularSerializer
+from blog.view_counts import view_counter
 from riyueweiyi import settings
 
 
 def token_verify(f):
     @wraps(f)
     def warp(self, *args, **kwargs):
-        # 根据函数和类区分jwt_token验证处理逻辑
-        jwt_token = str(self.request.auth) if not isinstance(self, HttpRequest) else \
-            self.headers.get("Authorization").split(" ")[1]
-        token_data = jwt.decode(jwt_token, key=settings.SIMPLE_JWT["SIGNING_KEY"],
-                                algorithms=["HS256"])
-        kwargs["token_data"] = token_data
+        # 根据函数和类区分jwt_token验证处理逻辑,DRF视图直接使用认证阶段已验证的token,不再重复解码
+        if not isinstance(self, HttpRequest):
+            token = self.request.auth
+        else:
+            authentication = CachedJWTAuthentication()
+            try:
+                raw_token = authentication.get_raw_token(header) \
+                    if (header := authentication.get_header(self)) is not None else None
+                token = authentication.get_validated_token(raw_token) if raw_token is not None else None
+            except AuthenticationFailed:
+                token = None
+        if token is None:
+            return JsonResponse(status=401, data={"错误编码": 401, "原因": "未提供有效的身份凭证", })
+        kwargs["token_data"] = token.payload
         return f(self, *args, **kwargs)
 
     return warp
 
 
-def compress_base64_image(image_data, quality=90):
-    # 将图像数据加载到 Pillow 图像对象
-    image = Image.open(BytesIO(image_data))
-    # 压缩图像
-    image = image.convert("RGB")  # 将图像转换为 RGB 模式
-    output = BytesIO()  # 创建一个字节流对象，用于保存压缩后的图像数据
-    image.save(output, format="JPEG", quality=quality)  # 保存图像到字节流，指定压缩质量
-
-    # 将压缩后的图像数据转换为 Base64 编码
-
-    return output
-
-
-def extract_base64_images(title: str, content: str, article: models.Model):
-    # 匹配正则
-    pattern = '<img.*?src="data:image/[^;]+;base64,([^"]+)".*?>'
-    replacement = r'<img src="{}" />'
-    for index, match in enumerate(re.findall(pattern, content)):
-        image_data = base64.b64decode(match)
-        compressed_data = compress_base64_image(image_data, quality=settings.IMAGE_COMPRESSIBILITY)
-        # 创建 ImageModel 实例
-        image = ImageModel(article=article)
-        # 保存图像文件
-        image_path = 'article_images/{}/{}.jpeg'.format(title, index)  # 假设使用 PNG 格式保存
-        image_file = compressed_data
-        # 原子操作
-        with transaction.atomic():
-            if os.path.exists(abs_path := os.path.join(settings.MEDIA_ROOT, image_path)):
-                os.remove(abs_path)
-            ImageModel.objects.filter(article=article, path=image_path).delete()
-            image.path.save(image_path, image_file)
-        # 将文章内容中的 img src 替换为图像的 URL
-        replacement_string = replacement.format(image.path.url)
-        # 替换 content 中的 img src
-        content = re.sub(pattern, replacement_string, content, count=1)
+def spooled_images(request) -> Optional[list]:
+    return getattr(request.data, "images", None)
+
+
+def restore_spooled_images(request, content: str) -> str:
+    # 图片保存到数据库或不在img标签中的data uri,需要还原解析时分离出的base64数据
+    if images := spooled_images(request):
+        return inline_spooled_images(content, images)
     return content
 
 
-# Create your views here.
+# 摘要列表需要的字段
+SUMMARY_FIELDS = ["id", "title", "author", "release_date", "modification_date", "type__name", "content_summary"]
+# 后台文章接口fields参数可选的字段及其对应的查询列,不含content时不读取文章内容表
+ARTICLE_FIELD_COLUMNS = {"id": "id", "title": "title", "author": "author", "content": "body__content",
+                         "release_date": "release_date", "modification_date": "modification_date", "type": "type"}
 
-class LoginVerificationApi(TokenObtainPairView):
-    serializer_class = LoginVerificationSerializer
 
+def requested_fields(request) -> Optional[list]:
+    """
+    解析fields参数,如fields=id,title,release_date,未提供时返回None表示全部字段
+    """
+    if not (value := request.query_params.get("fields", "").strip()):
+        return None
+    fields = [name.strip() for name in value.split(",") if name.strip()]
+    if unknown := [name for name in fields if name not in ARTICLE_FIELD_COLUMNS]:
+        raise ValidationError({"fields": f"不支持的字段: {','.join(unknown)}"})
+    return fields
 
-class ArticleViewApi(generics.ListAPIView):
-    queryset = ArticleModel.objects.all().order_by("-release_date")
-    serializer_class = ArticleSerializer
-    pagination_class = None
 
-    def get_authenticators(self):
-        # 在GET请求中，如果未提供JWT令牌，则不执行JWT认证
-        if self.request.method == 'GET':
-            return []
-        return super().get_authenticators()
+def sparse_article_queryset(queryset, fields: Optional[list], type_column: str = "type"):
+    """
+    只查询请求字段对应的列,详情中分类显示为名称时type_column为type__name
+    """
+    columns = {**ARTICLE_FIELD_COLUMNS, "type": type_column}
+    fields = fields or list(columns)
+    if "content" in fields:
+        queryset = queryset.select_related("body")
+    if "type" in fields and type_column != "type":
+        queryset = queryset.select_related("type")
+    return queryset.only(*(columns[name] for name in fields))
 
-    def get(self, request, *args, **kwargs):
-        now = timezone.now()
-        self.queryset = self.queryset.filter(release_date__lt=now)
-        article_id = int(kwargs.get("pk", ""))
-        article = self.queryset.get(id=article_id)
-        if article:
-            return JsonResponse(status=200, data={
-                "id": article.id,
-                "title": article.title,
-                "content": article.content,
-                "type": article.type.name if article.type else None,
-                "release_date": article.release_date,
-                "author": article.author,
-                "modification_date": article.modification_date
-            })
-        return JsonResponse(status=404, data={"error": "访问文章不存在或无权访问"})
+
+def category_descendants_filter(queryset, category: Optional[CategoryModel]):
+    if category is None:
+        return queryset.none()
+    return queryset.filter(**{f"type__{key}": value for key, value in category.descendants_range().items()})
+
+
+def filter_category_descendants(queryset, category_id):
+    """
+    按分类筛选文章,包含全部子孙分类,通过物化路径的索引范围查询完成
+    """
+    category = CategoryModel.objects.filter(id=category_id).only("path").first() \
+        if str(category_id).isdigit() else None
+    return category_descendants_filter(queryset, category)
+
+
+async def afilter_category_descendants(queryset, category_id):
+    category = await CategoryModel.objects.filter(id=category_id).only("path").afirst() \
+        if str(category_id).isdigit() else None
+    return category_descendants_filter(queryset, category)
+
+
+# 公开读取接口的异步视图只接受的请求方法
+READ_METHODS = ("GET", "HEAD")
+
+
+def render_json(data) -> HttpResponse:
+    # 与DRF视图使用同一渲染器,异步视图的输出格式与原接口保持一致
+    return HttpResponse(InstrumentedJSONRenderer().render(data), content_type="application/json")
+
+
+# Create your views here.
+
+class LoginVerificationApi(TokenObtainPairView):
+    serializer_class = LoginVerificationSerializer
 
 
 class ArticleRootViewApi(generics.CreateAPIView, generics.ListAPIView, generics.UpdateAPIView,
@@ -113,21 +150,26 @@ class ArticleRootViewApi(generics.CreateAPIView, generics.ListAPIView, generics.
     queryset = ArticleModel.objects.all().order_by("-release_date")
     serializer_class = ArticleSerializer
     pagination_class = None
+    # 文章请求体可能很大,图片数据边解析边解码到临时文件
+    parser_classes = [SpooledJSONParser, FormParser, MultiPartParser]
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # 请求结束后删除解析时生成的临时图片文件
+        if request.method in ("POST", "PUT") and isinstance(getattr(request, "_full_data", None), SpooledData):
+            request.data.cleanup()
+        return super().finalize_response(request, response, *args, **kwargs)
 
     @token_verify
     def get(self, request, *args, **kwargs):
-        if article_id := int(kwargs.get("pk", "")):
-            article = ArticleModel.objects.get(id=article_id)
-            return JsonResponse(status=200, data={
-                "id": article.id,
-                "title": article.title,
-                "content": article.content,
-                "type": article.type.name if article.type else None,
-                "release_date": article.release_date,
-                "author": article.author,
-                "modification_date": article.modification_date
-            })
-        return self.list(request)
+        # fields参数指定返回的字段,如文章管理表格只需fields=id,title,type,release_date,不下载文章内容
+        fields = requested_fields(request)
+        if article_id := kwargs.get("pk"):
+            queryset = sparse_article_queryset(ArticleModel.objects.filter(id=article_id), fields, "type__name")
+            if (article := queryset.first()) is None:
+                return JsonResponse(status=404, data={"error": "文章不存在"})
+            return Response(ArticleDetailSerializer(article, fields=fields).data)
+        queryset = sparse_article_queryset(self.get_queryset(), fields)
+        return Response(self.get_serializer(queryset, many=True, fields=fields).data)
 
     @token_verify
     def post(self, request, *args, **kwargs):
@@ -136,14 +178,17 @@ class ArticleRootViewApi(generics.CreateAPIView, generics.ListAPIView, generics.
             request.data["type"] = int(request.data["type"][-1])
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
-            article = serializer.save()
-            category = CategoryModel.objects.get(id=request.data["type"])  # 获取ID为20的CategoryModel对象
-            article.type = category
-            # 检测是否选择保存为文件或是base64直接存储
-            article.content = extract_base64_images(request.data.get("title", "-1"), request.data.get("content", ""),
-                                                    article) if settings.IMAGE_SAVE_IS_FILE else request.data.get(
-                "content", "")
-            article.save()
+            # 图片记录与文章在同一事务中写入,保存失败时一并回滚
+            with transaction.atomic():
+                # 检测是否选择保存为文件或是base64直接存储,处理后的内容随文章一起保存,修订历史中不含base64图片
+                content = restore_spooled_images(request, extract_base64_images(
+                    request.data.get("content", ""), spooled_images(request)) if runtime_settings.get(
+                    "IMAGE_SAVE_IS_FILE") else request.data.get("content", ""))
+                article = serializer.save(content=content, content_summary=summarize_content(content))
+                category = CategoryModel.objects.get(id=request.data["type"])  # 获取ID为20的CategoryModel对象
+                article.type = category
+                article.save()
+                sync_article_images(article)
             return JsonResponse(status=201, data={'message': '文章上传成功'})
         else:
             return JsonResponse(status=403, data={"错误编码": 403, "原因": "无权执行创建操作", })
@@ -153,67 +198,202 @@ class ArticleRootViewApi(generics.CreateAPIView, generics.ListAPIView, generics.
         if kwargs["token_data"]["is_root"]:
             request.data["type"] = int(request.data.get("type")[-1]) if isinstance(request.data.get("type"),
                                                                                    list) else request.data.get("type")
-            request.data["content"] = extract_base64_images(request.data.get("title", "-1"),
-                                                            request.data.get("content", ""),
-                                                            ArticleModel.objects.get(id=kwargs.get("pk"))) \
-                if settings.IMAGE_SAVE_IS_FILE else request.data["content"]
-            return self.update(request)
+            request.data["modification_date"] = timezone.now()
+            # 先校验请求,校验失败时不保存其中的图片
+            self.get_serializer(self.get_object(), data=request.data).is_valid(raise_exception=True)
+            # 图片记录与文章在同一事务中写入,更新失败时一并回滚,回滚后留下的文件由clean_media清理
+            with transaction.atomic():
+                request.data["content"] = restore_spooled_images(request, extract_base64_images(
+                    request.data.get("content", ""), spooled_images(request)) if runtime_settings.get(
+                    "IMAGE_SAVE_IS_FILE") else request.data["content"])
+                invalidate_article_detail(kwargs.get("pk"))
+                return self.update(request)
         else:
             return JsonResponse(status=403, data={"错误编码": 403, "原因": "无权执行更新操作", })
 
+    def perform_update(self, serializer):
+        # 内容更新时同步重算摘要,列表接口直接读取摘要字段
+        content = serializer.validated_data.get("content", serializer.instance.content)
+        article = serializer.save(content_summary=summarize_content(content))
+        sync_article_images(article)
+
     @token_verify
     def delete(self, request, *args, **kwargs):
         if kwargs["token_data"]["is_root"]:
-            article = ArticleModel.objects.prefetch_related('images').get(id=kwargs.get("pk", ""))
-            image_paths = [image.path.path for image in article.images.all()]
-            for path in image_paths:
-                if os.path.exists(path):
-                    os.remove(path)
+            # 图片引用在删除信号中释放,不再被引用的文件在事务提交后删除
+            invalidate_article_detail(kwargs.get("pk", ""))
             return self.destroy(request)
         return JsonResponse(status=403, data={"错误编码": 403, "原因": "无权执行删除操作", })
 
 
-class ArticleSummaryViewApi(generics.ListAPIView):
-    queryset = ArticleModel.objects.select_related("type").order_by("-release_date")
+@token_verify
+@csrf_exempt
+@require_POST
+def bulk_delete_articles(request: HttpRequest, *args, **kwargs):
+    """
+    批量删除文章,请求体为{"ids": [文章id]},全部记录在同一事务中删除,图片文件在提交后由后台线程删除
+    """
+    if not kwargs["token_data"]["is_root"]:
+        return JsonResponse(status=403, data={"错误编码": 403, "原因": "无权执行删除操作", })
+    try:
+        article_ids = {int(article_id) for article_id in json.loads(request.body)["ids"]}
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse(status=400, data={"error": "ids必须为文章id列表"})
+    with transaction.atomic():
+        invalidate_article_details(article_ids)
+        release_articles_images(list(article_ids))
+        _, deleted = ArticleModel.objects.filter(id__in=article_ids).delete()
+    return JsonResponse(status=200, data={"deleted": deleted.get(ArticleModel._meta.label, 0)})
+
+
+async def article_detail(request: HttpRequest, pk: int):
+    """
+    文章详情的异步视图,按文章版本协商ETag/Last-Modified,缓存命中时整个请求不占用线程
+    """
+    if request.method not in READ_METHODS:
+        return HttpResponseNotAllowed(READ_METHODS)
+    with read_database():
+        if (version := await aarticle_version(request, pk)) is None:
+            return JsonResponse(status=404, data={"error": "访问文章不存在或无权访问"})
+        etag, last_modified = version_etag(pk, version), int(version[0].timestamp())
+        if (response := get_conditional_response(request, etag=etag, last_modified=last_modified)) is None:
+            content, encoding = await aget_article_detail(pk, version[0], preferred_encoding(request))
+            response = encoded_response(content, encoding, etag)
+    if not response.has_header("Last-Modified"):
+        response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers.setdefault("ETag", etag)
+    # 阅读数只在内存中累加,不参与详情缓存和ETag,通过响应头返回,304响应同样计数
+    if request.method == "GET" and not getattr(request, "is_snapshot", False):
+        view_counter.record(pk)
+    response.headers["X-View-Count"] = str(article_views(request, pk))
+    return response
+
+
+def article_summary_generations(request: HttpRequest) -> list:
+    """
+    摘要列表依赖的分代: 无筛选时依赖全部文章,按分类筛选时只依赖筛选的分类,其下文章变化时计数才会变化
+    """
+    names = [category_generation(int(value)) if value.isdigit() else ARTICLES
+             for value in (request.GET.get("type"), request.GET.get("category")) if value]
+    return [CATEGORIES, *(names or [ARTICLES])]
+
+
+@cache_list_response(article_summary_generations)
+async def article_summary(request: HttpRequest):
+    """
+    文章摘要列表的异步视图,支持type、category筛选及页码/游标分页
+    """
+    if request.method not in READ_METHODS:
+        return HttpResponseNotAllowed(READ_METHODS)
+    # 包装为DRF的Request,复用分页类的参数读取和链接生成
+    request = Request(request)
+    # 摘要列表只查询轻量字段,不加载文章内容
+    queryset = ArticleModel.objects.select_related("type").only(*SUMMARY_FIELDS).order_by("-release_date", "-id")
+    now = timezone.now()
+    with read_database():
+        if filter_type := request.query_params.get("type", None):
+            queryset = queryset.filter(type=filter_type)
+        if filter_category := request.query_params.get("category", None):
+            queryset = await afilter_category_descendants(queryset, filter_category)
+        pagination = ArticleSummaryPagination()
+        try:
+            page = await pagination.apaginate_queryset(queryset.filter(release_date__lt=now), request)
+        except NotFound as exc:
+            return JsonResponse(status=404, data={"detail": exc.detail})
+        response = render_json(pagination.get_paginated_response(ArticleSummarySerializer(page, many=True).data).data)
+        # 筛选范围内有定时发布的文章时,缓存在其发布时失效
+        response.cache_timeout = await arelease_timeout(queryset, now, LIST_CACHE_TIMEOUT)
+    return response
+
+
+@cache_list_response(lambda request: [ARTICLES, CATEGORIES, VIEWS])
+async def article_popular(request: HttpRequest):
+    """
+    按阅读数倒序的热门文章列表,页码分页,阅读数为最近一次批量写入后的值,没有阅读记录的文章不在列表中
+    """
+    if request.method not in READ_METHODS:
+        return HttpResponseNotAllowed(READ_METHODS)
+    request = Request(request)
+    queryset = ArticleModel.objects.select_related("type").only(*SUMMARY_FIELDS, "view_count__views") \
+        .filter(release_date__lt=timezone.now(), view_count__views__gt=0) \
+        .annotate(views=F("view_count__views")).order_by("-view_count__views", "-view_count__article")
+    with read_database():
+        pagination = AsyncPageNumberPagination()
+        try:
+            page = await pagination.apaginate_queryset(queryset, request)
+        except NotFound as exc:
+            return JsonResponse(status=404, data={"detail": exc.detail})
+    return render_json(pagination.get_paginated_response(ArticlePopularSerializer(page, many=True).data).data)
+
+
+@token_verify
+def article_revisions(request: HttpRequest, pk: int, *args, **kwargs):
+    """
+    文章的修订列表,按修订号倒序
+    """
+    if not kwargs["token_data"]["is_root"]:
+        return JsonResponse(status=403, data={"错误编码": 403, "原因": "无权查看修订历史", })
+    revisions = list(ArticleRevisionModel.objects.filter(article_id=pk).order_by("-number")
+                     .values("number", "snapshot", "created"))
+    return JsonResponse(status=200, data=revisions, safe=False)
+
+
+@token_verify
+def article_revision(request: HttpRequest, pk: int, number: int, *args, **kwargs):
+    """
+    还原指定修订的文章内容
+    """
+    if not kwargs["token_data"]["is_root"]:
+        return JsonResponse(status=403, data={"错误编码": 403, "原因": "无权查看修订历史", })
+    if (content := ArticleRevisionModel.rebuild(pk, number)) is None:
+        return JsonResponse(status=404, data={"error": "修订不存在"})
+    return JsonResponse(status=200, data={"number": number, "content": content})
+
+
+class ArticleSummaryRootViewApi(generics.ListAPIView):
+    # 摘要列表只查询轻量字段,不加载文章内容
+    queryset = ArticleModel.objects.select_related("type").only(*SUMMARY_FIELDS).order_by("-release_date", "-id")
     serializer_class = ArticleSummarySerializer
+    pagination_class = ArticleSummaryPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ["type"]
 
+    @token_verify
     def get(self, request, *args, **kwargs):
-        now = timezone.now()
-        self.queryset = self.queryset.filter(release_date__lt=now)
         if filter_type := self.request.query_params.get("type", None):
             self.queryset = self.queryset.filter(type=filter_type)
+        if filter_category := self.request.query_params.get("category", None):
+            self.queryset = filter_category_descendants(self.queryset, filter_category)
         return self.list(request)
 
+
+class ArticleSearchViewApi(generics.ListAPIView):
+    queryset = ArticleModel.objects.none()
+
     def get_authenticators(self):
         # 在GET请求中，如果未提供JWT令牌，则不执行JWT认证
         if self.request.method == 'GET':
             return []
         return super().get_authenticators()
 
-
-class ArticleSummaryRootViewApi(generics.ListAPIView):
-    queryset = ArticleModel.objects.select_related("type").order_by("-release_date")
-    serializer_class = ArticleSummarySerializer
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["type"]
-
-    @token_verify
+    @method_decorator(read_database())
     def get(self, request, *args, **kwargs):
-        if filter_type := self.request.query_params.get("type", None):
-            self.queryset = self.queryset.filter(type=filter_type)
-        return self.list(request)
+        if not (query := self.request.query_params.get("q", "").strip()):
+            return JsonResponse(status=400, data={"error": "请输入检索关键词"})
+        # 检索结果按页执行SQL,返回高亮后的标题和正文片段
+        page = self.paginate_queryset(ArticleSearchResult(query))
+        return self.get_paginated_response(page)
 
 
 class ImageViewApi(generics.CreateAPIView, generics.ListAPIView, generics.UpdateAPIView,
                    generics.DestroyAPIView):
-    queryset = ImageModel.objects.all()
+    # 所属文章只需要id,预取时不加载文章内容,避免逐张图片查询
+    queryset = ImageModel.objects.prefetch_related(Prefetch("articles", queryset=ArticleModel.objects.only("id")))
     serializer_class = ImageSerializer
     pagination_class = None
 
     def get(self, request, *args, **kwargs):
-        return self.list(request)
+        return Response(get_list_data(request, [IMAGES], lambda: self.list(request).data))
 
     @token_verify
     def post(self, request, *args, **kwargs):
@@ -238,7 +418,7 @@ class ImageViewApi(generics.CreateAPIView, generics.ListAPIView, generics.Update
 
 
 class CategoryViewApi(generics.CreateAPIView, generics.ListAPIView, generics.DestroyAPIView, generics.UpdateAPIView):
-    queryset = CategoryModel.objects.all()
+    queryset = CategoryModel.objects.select_related("parent").order_by("id")
     serializer_class = CategorySerializer
 
     def get_authenticators(self):
@@ -248,13 +428,12 @@ class CategoryViewApi(generics.CreateAPIView, generics.ListAPIView, generics.Des
         return super().get_authenticators()
 
     def get(self, request, *args, **kwargs):
-        return self.list(request)
+        return Response(get_list_data(request, [CATEGORIES], lambda: self.list(request).data))
 
     @token_verify
     def post(self, request, *args, **kwargs):
         # 创建处理人与处理时间
         if kwargs["token_data"]["is_root"]:
-            print(request.data)
             request.data["parent"] = request.data["parent"][-1] if isinstance(request.data["parent"], list) else None
             return self.create(request)
         else:
@@ -274,10 +453,20 @@ class CategoryViewApi(generics.CreateAPIView, generics.ListAPIView, generics.Des
         return JsonResponse(status=403, data={"错误编码": 403, "原因": "无权执行删除操作", })
 
 
-class CategorySummaryViewApi(generics.ListAPIView):
-    queryset = CategoryModel.objects.all()
-    serializer_class = CategorySerializer
-    # 访问权限类 jwt
+@cache_list_response(lambda request: [CATEGORIES])
+async def category_summary(request: HttpRequest):
+    """
+    分类列表的异步视图
+    """
+    if request.method not in READ_METHODS:
+        return HttpResponseNotAllowed(READ_METHODS)
+    with read_database():
+        categories = [category async for category in CategoryModel.objects.select_related("parent").order_by("id")]
+    return render_json(CategorySerializer(categories, many=True).data)
+
+
+class CategoryTreeViewApi(generics.ListAPIView):
+    queryset = CategoryModel.objects.none()
     pagination_class = None
 
     def get_authenticators(self):
@@ -286,8 +475,9 @@ class CategorySummaryViewApi(generics.ListAPIView):
             return []
         return super().get_authenticators()
 
+    @method_decorator(read_database())
     def get(self, request, *args, **kwargs):
-        return self.list(request)
+        return JsonResponse(status=200, data=get_category_tree(), safe=False)
 
 
 def page_not_found(request, exception):
@@ -300,45 +490,56 @@ def page_error(request):
 
 
 @token_verify
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
 def delete_unused_files(request: HttpRequest, *args, **kwargs):
-    all_image_files_path_set = set()
-    article_images_dirs = os.path.join(settings.MEDIA_ROOT, "article_images")
-    for article_images_dir in os.listdir(article_images_dirs):
-        for image in article_images_dir:
-            all_image_files_path_set.add(os.path.join(article_images_dir, image))
-    used_image_files_path_set = {os.path.join(settings.MEDIA_ROOT, _.path) for _ in ImageModel.objects.all()}
-    unused_files_set = all_image_files_path_set - used_image_files_path_set
-    success = len(unused_files_set)
-    for unused_file_path in unused_files_set:
-        try:
-            os.remove(unused_file_path)
-        except Exception as e:
-            success -= 1
-            print(f"删除文件{unused_file_path}失败,报错如下", e)
-    return HttpResponse(f"删除未使用文件共计{len(unused_files_set)},成功删除{success}个", status=200)
+    """
+    清理不再被引用的图片文件,每次请求只检查有限数量的文件,重复调用从检查点继续直至扫描完毕
+    删除文件只接受POST,GET只能带dry_run参数预览,避免预取或爬虫的请求误删文件
+    """
+    if not kwargs["token_data"]["is_root"]:
+        return JsonResponse(status=403, data={"错误编码": 403, "原因": "无权执行删除操作", })
+    dry_run = request.GET.get("dry_run") in ("1", "true")
+    if request.method == "GET" and not dry_run:
+        return HttpResponseNotAllowed(["POST"])
+    stats = collect_orphaned_media(dry_run=dry_run,
+                                   limit=settings.MEDIA_GC_REQUEST_LIMIT,
+                                   checkpoint_path=settings.MEDIA_GC_CHECKPOINT)
+    return JsonResponse(status=200, data=stats)
+
+
+def image_derivative(request: HttpRequest, pk: int, width: int, fmt: str):
+    """
+    响应式衍生图,首次访问时生成并保存到磁盘,之后重定向到静态文件
+    """
+    if width not in settings.IMAGE_DERIVATIVE_WIDTHS or fmt not in supported_formats(settings.IMAGE_DERIVATIVE_FORMATS):
+        return HttpResponseNotFound("图片不存在")
+    if not (derivative := ImageDerivativeModel.objects.filter(image_id=pk, width=width, format=fmt).first()):
+        if not (image := ImageModel.objects.filter(id=pk).first()):
+            return HttpResponseNotFound("图片不存在")
+        derivative = build_derivative(image, width, fmt)
+    response = HttpResponseRedirect(derivative.path.url)
+    response["Cache-Control"] = "public, max-age=86400"
+    return response
 
 
 @token_verify
 def get_image_setting(request: HttpRequest, *args, **kwargs):
-    print(request.headers)
-    return JsonResponse(status=200, data={"image_save_is_file": settings.IMAGE_SAVE_IS_FILE,
-                                          "image_compressibility": settings.IMAGE_COMPRESSIBILITY})
+    return JsonResponse(status=200, data={"image_save_is_file": runtime_settings.get("IMAGE_SAVE_IS_FILE"),
+                                          "image_compressibility": runtime_settings.get("IMAGE_COMPRESSIBILITY")})
 
 
 @token_verify
 @csrf_exempt
 def change_image_compressibility(request: HttpRequest, *args, **kwargs):
     image_compressibility = int(json.loads(request.body).get("image_compressibility"))
-    # 确保取值在20-100之间
-    settings.IMAGE_COMPRESSIBILITY = max(20, min(image_compressibility, 100))
-    print(settings.IMAGE_COMPRESSIBILITY)
+    # 确保取值在20-100之间,写入共享配置,所有进程在下一个请求时生效
+    runtime_settings.update(IMAGE_COMPRESSIBILITY=max(20, min(image_compressibility, 100)))
     return HttpResponse()
 
 
 @token_verify
 @csrf_exempt
 def change_image_save_method(request: HttpRequest, *args, **kwargs):
-    # 确保取值在20-100之间
-    settings.IMAGE_SAVE_IS_FILE = json.loads(request.body).get("image_save_is_file")
-    print(settings.IMAGE_SAVE_IS_FILE)
+    runtime_settings.update(IMAGE_SAVE_IS_FILE=bool(json.loads(request.body).get("image_save_is_file")))
     return HttpResponse()
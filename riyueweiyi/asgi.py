@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'riyueweiyi.settings')
+# settings据此关闭持久连接,见DATABASES的注释
+os.environ.setdefault('RIYUEWEIYI_ASGI', '1')
 
 application = get_asgi_application()
@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
+import django
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.instrumentation.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -51,6 +55,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'blog.runtime_settings.RuntimeSettingsMiddleware',
 ]
 
 ROOT_URLCONF = 'riyueweiyi.urls'
@@ -77,10 +82,48 @@ WSGI_APPLICATION = 'riyueweiyi.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# 连接保持600秒供同一线程的后续请求复用,复用前检查连接是否可用
+# ASGI下同步的ORM调用在每个请求各自的线程中执行,连接无法跨请求复用,由asgi.py设置环境变量关闭持久连接
+# read为同一数据库文件的只读连接,公开的GET视图经blog.routers.ReadWriteRouter路由到该连接
+DATABASE_CONN_MAX_AGE = 0 if os.environ.get('RIYUEWEIYI_ASGI') else 600
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    },
+    'read': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+if django.VERSION >= (5, 1):
+    # 写事务开始即获取写锁,避免先读后写的事务升级锁时不经等待直接报database is locked
+    DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+DATABASE_ROUTERS = ['blog.routers.ReadWriteRouter']
+# sqlite连接建立时执行的PRAGMA: WAL模式下读写互不阻塞,synchronous=NORMAL在WAL下仍可保证不损坏
+# mmap_size为128MB内存映射读取,cache_size负数单位为KB(每个连接8MB),busy_timeout为等待写锁的毫秒数
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -8000,
+    'busy_timeout': 5000,
+}
+
+# 缓存
+# 使用基于mmap文件的共享缓存,uwsgi多个进程共用同一份缓存数据与登录限流计数,/dev/shm为内存文件系统
+CACHES = {
+    'default': {
+        'BACKEND': 'blog.cache_backends.SharedMemoryCache',
+        'LOCATION': os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                                 'riyueweiyi.cache'),
+        'TIMEOUT': 300,
     }
 }
 
@@ -152,15 +195,61 @@ CORS_ALLOWED_ORIGINS = (
     'https://127.0.0.1:5173',
     'http://127.0.0.1:5173',
 )
+# 允许前端读取的响应头,文章详情的阅读数在X-View-Count中返回
+CORS_EXPOSE_HEADERS = (
+    'x-view-count',
+)
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        # 默认使用jwt鉴权
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # 默认使用jwt鉴权,已验证的token缓存在进程内
+        'blog.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'blog.renderers.InstrumentedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
 
+# 接口json序列化方式: orjson(未安装时自动使用标准库)或json(标准库),见blog.json_backends
+JSON_BACKEND = 'orjson'
+# 文章详情按版本缓存压缩结果,每个版本只压缩一次: gzip压缩级别,brotli质量(需安装brotli),小于该字节数时不压缩
+# 静态json快照的预压缩文件使用相同配置
+COMPRESSION_GZIP_LEVEL = 9
+COMPRESSION_BROTLI_QUALITY = 9
+COMPRESSION_MIN_LENGTH = 200
+
+# 公开读取接口的静态json快照,开启后文章及分类写入时增量生成,由nginx直接返回,配置见ReadMe.md
+SNAPSHOT_ENABLED = False
+SNAPSHOT_ROOT = os.path.join(BASE_DIR, 'snapshots')
+# 分页链接中使用的站点地址,以及生成快照的文章摘要页数
+SNAPSHOT_BASE_URL = 'https://riyueweiyi.cn'
+SNAPSHOT_SUMMARY_PAGES = 5
+
+# 请求耗时统计,关闭时中间件不加载,没有额外开销
+# 开启后每个请求输出Server-Timing响应头及blog.instrumentation日志
+INSTRUMENTATION_ENABLED = False
+# 耗时超过该毫秒数的请求视为慢请求,按INSTRUMENTATION_PROFILE_RATE比例采样cProfile结果
+INSTRUMENTATION_SLOW_MS = 500
+INSTRUMENTATION_PROFILE_RATE = 0.0
+INSTRUMENTATION_PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+INSTRUMENTATION_PROFILE_KEEP = 50
+# 检测N+1查询: 同一SQL模板在单个请求中执行次数达到阈值时输出警告
+INSTRUMENTATION_N_PLUS_ONE = False
+INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'blog': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
 # jwt配置
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1, minutes=30),
@@ -168,10 +257,31 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     "SIGNING_KEY": "!%qmpwti0bta5w!c01da3&t)5&#2xm@d&&(d9^597*zst66mn_",
 }
+# 已验证jwt的进程内LRU缓存条数,0表示不缓存
+JWT_VERIFIED_CACHE_SIZE = 256
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
 # 自定义的文章图片保存方式,默认Ture图片文件保存,反之base64保存数据库
+# 以下两项为默认值,运行时修改保存在RuntimeSettingModel中,见blog.runtime_settings
 IMAGE_SAVE_IS_FILE = True
 IMAGE_COMPRESSIBILITY = 80
+# 删除图片文件由后台线程执行,失败时的重试次数及首次重试间隔秒数(之后按2倍递增)
+FILE_REMOVAL_RETRIES = 5
+FILE_REMOVAL_RETRY_DELAY = 1
+# 孤立图片文件清理的检查点文件,以及管理接口单次请求最多检查的文件数
+MEDIA_GC_CHECKPOINT = os.path.join(BASE_DIR, 'media_gc.checkpoint')
+MEDIA_GC_REQUEST_LIMIT = 2000
+# 文章修订历史每隔多少个修订保存一次完整内容,其余修订只保存相对上一修订的差异
+REVISION_SNAPSHOT_INTERVAL = 10
+# 文章图片解码压缩的进程池大小,0表示在请求线程内处理
+IMAGE_PROCESS_WORKERS = 2
+# 进程池子进程使用的python解释器路径,为空时自动选择(uwsgi下为sys.exec_prefix/bin/python3)
+IMAGE_PROCESS_PYTHON = ''
+# 响应式衍生图的宽度及格式(按优先级排列,Pillow不支持的格式自动跳过)
+IMAGE_DERIVATIVE_WIDTHS = [400, 800, 1200]
+IMAGE_DERIVATIVE_FORMATS = ["avif", "webp"]
+IMAGE_DERIVATIVE_SIZES = "(max-width: 800px) 100vw, 800px"
+# 文章阅读数在各进程内存中累加,每隔该秒数由后台线程在一个事务中批量写入数据库
+VIEW_COUNT_FLUSH_INTERVAL = 10